@@ -0,0 +1,101 @@
+import os
+import tempfile
+import uuid
+import numpy as np
+from audio_io import cached_resample, file_key, read_audio, write_audio_atomic
+
+
+class AudioBuffer:
+    """Decoded audio held in memory.
+
+    Holds float32 samples, the sample rate and a provenance list describing
+    where the audio came from and which steps produced it. Mono samples are
+    shaped ``(n,)``; audio with several channels is ``(channels, n)``, time
+    on the last axis as in librosa. Buffers are treated as immutable (the
+    sample array is read-only); processing steps create a new buffer with
+    ``derive``. Audio only touches the disk through ``export`` or
+    ``materialize``.
+
+    ``key`` identifies the content for caches: buffers loaded from files with
+    the same content, or derived from the same parent by the same step, share
+    a key.
+    """
+
+    def __init__(self, samples, sr, provenance=None, key=None):
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        samples.flags.writeable = False
+        self.samples = samples
+        self.sr = int(sr)
+        self.provenance = list(provenance or [])
+        self.key = key if key is not None else ("buffer", uuid.uuid4().hex)
+        self._materialized_path = None
+
+    def __repr__(self):
+        steps = " -> ".join(self.provenance) or "unknown"
+        layout = f", {self.channels} channels" if self.channels > 1 else ""
+        return f"AudioBuffer({self.duration:.2f}s @ {self.sr} Hz{layout}, {steps})"
+
+    def __len__(self):
+        return self.samples.shape[-1]
+
+    @property
+    def channels(self):
+        return 1 if self.samples.ndim == 1 else self.samples.shape[0]
+
+    @property
+    def duration(self):
+        return len(self) / self.sr if self.sr else 0.0
+
+    @classmethod
+    def from_file(cls, path, mono=True):
+        """Decode an audio file at its native sample rate, downmixed to mono unless ``mono=False``"""
+        y, sr = read_audio(path, mono=mono)
+        return cls(y, sr, provenance=[f"file:{os.path.basename(path)}"], key=file_key(path, mono))
+
+    def to_mono(self):
+        """This audio downmixed to one channel (the buffer itself if it is mono)"""
+        if self.samples.ndim == 1:
+            return self
+        return self.derive(self.samples.mean(axis=0), "mono")
+
+    def derive(self, samples, step, sr=None, inputs=()):
+        """Return a new buffer produced from this one by ``step``.
+
+        ``inputs`` lists any other buffers the step consumed so that their
+        identity is part of the new buffer's key.
+        """
+        return AudioBuffer(samples, self.sr if sr is None else sr,
+                           provenance=self.provenance + [step],
+                           key=self.key + (step,) + tuple(b.key for b in inputs))
+
+    def resample(self, target_sr, quality="hq"):
+        """Return this audio at ``target_sr``, reusing cached resampled copies"""
+        if target_sr == self.sr:
+            return self
+        y = cached_resample(self.key, self.samples, self.sr, target_sr, quality)
+        return self.derive(y, f"resample({target_sr}, {quality})", sr=target_sr)
+
+    def export(self, path, subtype="PCM_16"):
+        """Write the buffer to ``path`` (atomically) and return the path"""
+        return write_audio_atomic(path, self.samples, self.sr, subtype=subtype)
+
+    def materialize(self):
+        """Path of a WAV copy for consumers that need a file (e.g. QMediaPlayer).
+
+        The file is written on first use and reused afterwards; call
+        ``release`` to delete it.
+        """
+        if self._materialized_path is None or not os.path.exists(self._materialized_path):
+            fd, path = tempfile.mkstemp(suffix=".wav", prefix="mimic_")
+            os.close(fd)
+            self._materialized_path = self.export(path)
+        return self._materialized_path
+
+    def release(self):
+        """Delete the file created by ``materialize``, if any"""
+        if self._materialized_path and os.path.exists(self._materialized_path):
+            try:
+                os.remove(self._materialized_path)
+            except OSError:
+                pass
+        self._materialized_path = None
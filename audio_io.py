@@ -0,0 +1,214 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+import numpy as np
+import librosa
+import scipy.signal as sg
+import soundfile as sf
+from memo_cache import StageCache
+
+RESAMPLE_QUALITIES = ("hq", "fast")
+RESAMPLE_CACHE_BYTES = 256 * 1024 * 1024
+# File hashes remembered by ``file_hash`` (least recently used dropped first)
+HASH_MEMO_ENTRIES = 4096
+
+# PCM WAV subtypes that can be memory mapped: numpy dtype, offset, scale
+_MMAP_SUBTYPES = {
+    "PCM_U8": ("u1", 128.0, 1 / 128.0),
+    "PCM_16": ("<i2", 0.0, 1 / 32768.0),
+    "PCM_32": ("<i4", 0.0, 1 / 2147483648.0),
+    "FLOAT": ("<f4", 0.0, 1.0),
+}
+
+_hash_memo = OrderedDict()
+_hash_memo_lock = threading.Lock()
+# Read once: os.umask can only be queried by setting it, which is not
+# thread-safe while writer threads create files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_resample_cache = StageCache(RESAMPLE_CACHE_BYTES)
+
+
+def source_key(path):
+    """Identify an audio file by path, size and modification time"""
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file, memoized (for up to ``HASH_MEMO_ENTRIES`` files) while it is unchanged"""
+    key = source_key(path)
+    with _hash_memo_lock:
+        digest = _hash_memo.get(key)
+        if digest is not None:
+            _hash_memo.move_to_end(key)
+            return digest
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _hash_memo_lock:
+        _hash_memo[key] = digest
+        while len(_hash_memo) > HASH_MEMO_ENTRIES:
+            _hash_memo.popitem(last=False)
+    return digest
+
+
+def _wav_data_chunk(path):
+    """Return ``(offset, size)`` of the data chunk of a RIFF/WAVE file"""
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"data":
+                return f.tell(), size
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+def _read_wav_mmap(path, info):
+    """Memory-map the sample data of a PCM WAV file, or return None"""
+    if info.format not in ("WAV", "WAVEX") or info.subtype not in _MMAP_SUBTYPES:
+        return None
+    chunk = _wav_data_chunk(path)
+    if chunk is None:
+        return None
+    offset, size = chunk
+    dtype, zero, scale = _MMAP_SUBTYPES[info.subtype]
+    frame_bytes = np.dtype(dtype).itemsize * info.channels
+    # Streamed writers may leave the data size unset; trust the file length
+    size = min(size, os.path.getsize(path) - offset)
+    n_frames = size // frame_bytes
+    if n_frames == 0:
+        return np.zeros((0, info.channels), dtype=np.float32)
+    data = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(n_frames, info.channels))
+    if info.subtype == "FLOAT":
+        return data
+    return (data.astype(np.float32) - np.float32(zero)) * np.float32(scale)
+
+
+def file_key(path, mono=True):
+    """Content key of an audio file decoded downmixed (``mono``) or with all its channels"""
+    return ("file", file_hash(path)) if mono else ("file", file_hash(path), "channels")
+
+
+def read_audio(path, mono=True, mmap=True):
+    """Decode an audio file to float32 at its native sample rate.
+
+    PCM WAV files are memory mapped (a mono float WAV is not copied at all);
+    other formats are decoded with ``soundfile`` and, if libsndfile cannot
+    read them, with librosa's generic loader. With ``mono=False`` files with
+    several channels keep them, channels first as in librosa; single-channel
+    files are returned 1-D either way.
+
+    Returns
+    -------
+    y : numpy.ndarray [shape=(n,) or (channels, n)]
+    sr : int
+    """
+    try:
+        info = sf.info(path)
+    except RuntimeError:
+        y, sr = librosa.load(path, sr=None, mono=mono)
+        if y.ndim == 2 and y.shape[0] == 1:
+            y = y[0]
+        return y.astype(np.float32, copy=False), sr
+
+    data = _read_wav_mmap(path, info) if mmap else None
+    if data is None:
+        data, _ = sf.read(path, dtype="float32", always_2d=True)
+    if data.shape[1] == 1:
+        return data[:, 0], info.samplerate
+    if mono:
+        return data.mean(axis=1, dtype=np.float32), info.samplerate
+    return data.T, info.samplerate
+
+
+def _target_mode(path):
+    """Permission bits for the file written to ``path``: those of the file it
+    replaces, or the usual ``0o666`` less the umask for a new file"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_audio_atomic(path, y, sr, subtype="PCM_16", format=None):
+    """Write audio so that ``path`` either keeps its old content or holds the complete new file.
+
+    The data goes to a temporary file in the same directory, is flushed to
+    disk and then renamed over ``path``. ``y`` is shaped ``(n,)`` or
+    ``(channels, n)`` as returned by ``read_audio``.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fmt = format or (os.path.splitext(path)[1][1:].upper() or "WAV")
+    fd, tmp = tempfile.mkstemp(prefix=".tmp_", suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            sf.write(f, np.asarray(y).T, sr, subtype=subtype, format=fmt)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0o600; give it the permissions a
+        # plain write would have before it takes the target's place
+        os.chmod(tmp, _target_mode(path))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+def resample(y, orig_sr, target_sr, quality="hq"):
+    """Resample along the last axis.
+
+    ``quality="fast"`` uses a polyphase filter (``scipy.signal.resample_poly``)
+    with the exact rational ratio ``target_sr / orig_sr``; ``"hq"`` uses
+    librosa's default high-quality soxr resampler.
+    """
+    if orig_sr == target_sr:
+        return y
+    if quality == "fast":
+        ratio = Fraction(int(target_sr), int(orig_sr))
+        out = sg.resample_poly(y, ratio.numerator, ratio.denominator, axis=-1)
+        return out.astype(np.float32, copy=False)
+    if quality == "hq":
+        return librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr)
+    raise ValueError(f"Unknown resample quality: {quality}")
+
+
+def cached_resample(source_id, y, orig_sr, target_sr, quality="hq"):
+    """``resample`` memoized under ``(source_id, target_sr, quality)``.
+
+    ``source_id`` must identify the content of ``y``, e.g. a file hash or an
+    ``AudioBuffer`` key.
+    """
+    if orig_sr == target_sr:
+        return y
+    key = (source_id, target_sr, quality)
+    out = _resample_cache.get(key)
+    if out is None:
+        out = resample(y, orig_sr, target_sr, quality)
+        _resample_cache.put(key, out)
+    return out
+
+
+def load(path, sr=None, quality="hq"):
+    """Drop-in for ``librosa.load(path, sr=sr)`` with cached resampling.
+
+    Resampled signals are cached by (file hash, target rate, quality), so
+    loading the same file at the same rate again skips the resampler.
+    """
+    y, native_sr = read_audio(path)
+    if sr is None or sr == native_sr:
+        return y, native_sr
+    return cached_resample(file_key(path), y, native_sr, sr, quality), sr
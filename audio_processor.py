@@ -1,85 +1,89 @@
+import os
 from PyQt5.QtCore import QThread, pyqtSignal
-import librosa
-import numpy as np
-import soundfile as sf
-from audio_utils import extract_lpc, lpc_residual, resynthesize_from_residual, overlap_add
+from audio_utils import load_audio
+from memory_profile import MemoryProfiler
+from pipeline import ConversionPipeline
+from streaming import stream_script
+from tts_utils import text_to_speech
 
 class AudioProcessor(QThread):
     progress = pyqtSignal(int)
-    finished = pyqtSignal(str)
+    finished = pyqtSignal(object)  # Emits the converted AudioBuffer
     error = pyqtSignal(str)
 
-    def __init__(self, ref_path, tts_path, lpc_order, frame_length, hop_length):
+    def __init__(self, ref_audio, tts_audio, lpc_order, frame_length, hop_length, pipeline=None,
+                 memory_report=None, preview=False, preview_seconds=None):
         super().__init__()
-        self.ref_path = ref_path
-        self.tts_path = tts_path
+        self.ref_audio = load_audio(ref_audio)
+        self.tts_audio = load_audio(tts_audio)
         self.lpc_order = lpc_order
         self.frame_length = frame_length
         self.hop_length = hop_length
+        # Reusing the caller's pipeline lets re-runs skip unchanged stages
+        self.pipeline = pipeline if pipeline is not None else ConversionPipeline()
+        # Path for an opt-in JSON memory summary of the run (see memory_profile)
+        self.memory_report = memory_report or os.environ.get("MIMIC_MEMORY_PROFILE")
+        self.memory_summary = None
+        # Preview renders at a low internal rate (see ConversionPipeline.preview)
+        self.preview = preview
+        self.preview_seconds = preview_seconds
+
+    def convert(self):
+        if self.preview:
+            return self.pipeline.preview(
+                self.ref_audio, self.tts_audio, self.lpc_order,
+                self.frame_length, self.hop_length,
+                max_seconds=self.preview_seconds, progress=self.progress.emit)
+        return self.pipeline.run(
+            self.ref_audio, self.tts_audio, self.lpc_order,
+            self.frame_length, self.hop_length,
+            progress=self.progress.emit)
 
     def run(self):
         try:
-            self.progress.emit(5)
-            y_ref, sr = librosa.load(self.ref_path, sr=None)
-            y_tts, _ = librosa.load(self.tts_path, sr=sr)
-            self.progress.emit(15)
-
-            # Frame the signals
-            frames_ref = librosa.util.frame(y_ref, frame_length=self.frame_length, hop_length=self.hop_length).T
-            frames_tts = librosa.util.frame(y_tts, frame_length=self.frame_length, hop_length=self.hop_length).T
-            n_frames = min(len(frames_ref), len(frames_tts))
-
-            # --- Pitch contour extraction ---
-            fmin_pitch = librosa.note_to_hz('C2')
-            fmax_pitch = librosa.note_to_hz('C7')
-            f0_ref, _, _ = librosa.pyin(
-                y_ref, fmin=fmin_pitch, fmax=fmax_pitch,
-                frame_length=self.frame_length, hop_length=self.hop_length)
-            f0_tts, _, _ = librosa.pyin(
-                y_tts, fmin=fmin_pitch, fmax=fmax_pitch,
-                frame_length=self.frame_length, hop_length=self.hop_length)
-
-            processed_frames = []
-            for i in range(n_frames):
-                frame_r = frames_ref[i] * np.hamming(self.frame_length)
-                frame_t = frames_tts[i] * np.hamming(self.frame_length)
-                a_ref = extract_lpc(frame_r, self.lpc_order)
-                a_tts = extract_lpc(frame_t, self.lpc_order)
-                residual_ref = lpc_residual(frame_r, a_ref)
-                synth_frame = resynthesize_from_residual(residual_ref, a_tts)
-
-                # --- PITCH MATCHING ---
-                ref_pitch = f0_ref[i] if (i < len(f0_ref) and not np.isnan(f0_ref[i])) else None
-                tts_pitch = f0_tts[i] if (i < len(f0_tts) and not np.isnan(f0_tts[i])) else None
-                if ref_pitch and tts_pitch and tts_pitch > 0:
-                    n_steps = 12 * np.log2(ref_pitch / tts_pitch)
-                    synth_frame = librosa.effects.pitch_shift(synth_frame, sr, n_steps)
-                # else: keep as is if unvoiced
+            if self.memory_report:
+                with MemoryProfiler() as profiler:
+                    y_out, sr = self.convert()
+                self.memory_summary = profiler.summary()
+                profiler.write_json(self.memory_report)
+            else:
+                y_out, sr = self.convert()
 
-                # --- ENERGY NORMALIZATION ---
-                energy_r = np.sqrt(np.mean(frame_r**2)) + 1e-7
-                energy_synth = np.sqrt(np.mean(synth_frame**2)) + 1e-7
-                if energy_synth > 0:
-                    synth_frame = synth_frame * (energy_r / energy_synth)
-
-                processed_frames.append(synth_frame)
+            self.progress.emit(95)
+            step = (f"{'lpc_preview' if self.preview else 'lpc_conversion'}(lpc_order={self.lpc_order}, "
+                    f"frame_length={self.frame_length}, hop_length={self.hop_length})")
+            output = self.tts_audio.derive(y_out, step, sr=sr, inputs=[self.ref_audio])
+            self.progress.emit(100)
+            self.finished.emit(output)
+        except Exception as e:
+            self.error.emit(str(e))
 
-                if i % max(1, n_frames // 20) == 0:
-                    self.progress.emit(15 + int(70 * i / n_frames))
 
-            self.progress.emit(90)
-            processed_frames = np.array(processed_frames)
-            y_out = overlap_add(processed_frames, self.hop_length)
+class StreamingProcessor(QThread):
+    """Runs ``streaming.stream_script``, emitting converted chunks as they are ready"""
+    chunk = pyqtSignal(object, int)  # Converted samples and their sample rate
+    finished = pyqtSignal(object, object, object)  # TTS AudioBuffer, output AudioBuffer, report
+    error = pyqtSignal(str)
 
-            # Normalize output to avoid clipping
-            maxv = np.max(np.abs(y_out))
-            if maxv > 0:
-                y_out = y_out / maxv * 0.95
+    def __init__(self, text, ref_audio, lpc_order, frame_length, hop_length, pipeline=None,
+                 rate=200, gender=None):
+        super().__init__()
+        self.text = text
+        self.ref_audio = load_audio(ref_audio)
+        self.lpc_order = lpc_order
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.pipeline = pipeline if pipeline is not None else ConversionPipeline()
+        self.rate = rate
+        self.gender = gender
 
-            self.progress.emit(95)
-            output_path = self.tts_path.replace(".wav", "_converted.wav")
-            sf.write(output_path, y_out, sr, subtype="PCM_16")
-            self.progress.emit(100)
-            self.finished.emit(output_path)
+    def run(self):
+        try:
+            tts, output, report = stream_script(
+                self.text, self.ref_audio, self.lpc_order, self.frame_length, self.hop_length,
+                pipeline=self.pipeline,
+                synthesize=lambda sentence: text_to_speech(sentence, self.rate, self.gender),
+                on_audio=self.chunk.emit)
+            self.finished.emit(tts, output, report)
         except Exception as e:
             self.error.emit(str(e))
@@ -1,28 +1,38 @@
 import numpy as np
 import librosa
-import soundfile as sf
 import scipy.signal as sg
-import tempfile
-from scipy.ndimage import median_filter
+from audio_buffer import AudioBuffer
+from kernels import running_median_2d
+from memory_profile import profile_stage, record_array
+from noise_profile import LEADING_NOISE_SECONDS
 
 N_FFT = 2048  # For plots and LPC
 
+# Floating point precision -> real sample dtype. STFTs of float32 signals are
+# complex64, so "float32" keeps the whole chain in single precision.
+PRECISIONS = {"float32": np.float32, "float64": np.float64}
+
 def extract_lpc_env(y, sr, order, frame_length=1024, hop_length=512, n_fft=N_FFT):
     frames = librosa.util.frame(y, frame_length=frame_length, hop_length=hop_length).T
+    record_array("lpc_env_frames", frames)
     envs = []
     for frame in frames:
-        wframe = frame * np.hamming(len(frame))
+        wframe = frame.astype(np.float64) * np.hamming(len(frame))
         a = librosa.lpc(wframe, order=order)
         w_freq, h_freq = sg.freqz([1], a, worN=n_fft, fs=sr)
         envs.append(np.abs(h_freq))
     mean_env = np.mean(np.array(envs), axis=0)
     return w_freq, mean_env
 
-def convert_to_pcm_wav(input_path):
-    y, sr = librosa.load(input_path, sr=None)
-    tmp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    sf.write(tmp_wav.name, y, sr, subtype="PCM_16")
-    return tmp_wav.name
+def load_audio(source, mono=True):
+    """Return ``source`` as an AudioBuffer, decoding it if it is a file path.
+
+    ``mono=False`` keeps the channels of a decoded file; buffers are
+    returned as they are.
+    """
+    if isinstance(source, AudioBuffer):
+        return source
+    return AudioBuffer.from_file(source, mono=mono)
 
 def extract_lpc(y_frame, order):
     return librosa.lpc(y_frame, order=order)
@@ -33,23 +43,80 @@ def lpc_residual(frame, a):
 def resynthesize_from_residual(residual, a):
     return sg.lfilter([1.0], a, residual)
 
-def overlap_add(frames, hop_length):
-    n_frames, frame_len = frames.shape
+def overlap_add(frames, hop_length, dtype=None):
+    """Overlap-add ``(..., n_frames, frame_length)`` frames into ``(..., n)`` signals"""
+    n_frames, frame_len = frames.shape[-2:]
     sig_len = frame_len + hop_length * (n_frames - 1)
-    out = np.zeros(sig_len)
+    out = np.zeros(frames.shape[:-2] + (sig_len,), dtype=dtype or frames.dtype)
     for i in range(n_frames):
         start = i * hop_length
-        out[start : start + frame_len] += frames[i]
+        out[..., start : start + frame_len] += frames[..., i, :]
     return out
 
-def reduce_noise_spectral_subtraction(y, sr, n_fft=2048, hop_length=512, noise_factor=1.0):
+def stft_frames(frames, n_fft=None):
+    """One-sided spectra of already windowed frames, shaped ``(..., n_frames, n_fft // 2 + 1)``"""
+    return np.fft.rfft(frames, n=n_fft, axis=-1)
+
+def istft_frames(spec, hop_length, window, length=None):
+    """Inverse of ``stft_frames`` with window-sum normalized overlap-add (``librosa.istft``)"""
+    n_fft = len(window)
+    return librosa.istft(np.swapaxes(spec, -1, -2), hop_length=hop_length, n_fft=n_fft, window=window,
+                         center=False, length=length)
+
+def lpc_frequency_response(a, n_fft):
+    """Complex response ``A(e^jw)`` of every LPC polynomial row on the rfft grid.
+
+    The LPC envelope of a frame is ``1 / |A|``, so multiplying a spectrum by
+    ``A`` whitens it and dividing by another ``A`` recolours it.
+    """
+    return np.fft.rfft(a, n=n_fft, axis=-1)
+
+def lpc_whiten(spec, a, n_fft):
+    """Remove the LPC envelope ``a`` from every spectrum row (the residual's spectrum)"""
+    return spec * lpc_frequency_response(a, n_fft)
+
+def lpc_color(spec, a, n_fft, eps=1e-8):
+    """Apply the LPC envelope ``a`` to every spectrum row"""
+    A = lpc_frequency_response(a, n_fft)
+    A[np.abs(A) < eps] = eps
+    return spec / A
+
+def scale_frequency_frames(spec, ratios):
+    """Scale the frequency axis of every spectrum row by its own ratio.
+
+    Bin ``k`` of row ``i`` takes the (linearly interpolated) value of bin
+    ``k / ratios[i]`` of the input; bins mapped past Nyquist become zero.
+    A ratio of 2 moves every partial up an octave.
+    """
+    n_bins = spec.shape[-1]
+    src = np.arange(n_bins) / np.asarray(ratios, dtype=np.float64)[:, None]
+    lo = np.floor(src).astype(np.intp)
+    frac = (src - lo).astype(spec.real.dtype)
+    valid = lo < n_bins - 1
+    lo = np.minimum(lo, n_bins - 2)
+    out = (np.take_along_axis(spec, lo, axis=-1) * (1 - frac)
+           + np.take_along_axis(spec, lo + 1, axis=-1) * frac)
+    out[~valid] = 0
+    return out
+
+def spectral_energy(spec, n_fft):
+    """Per-row energy of one-sided ``n_fft``-point spectra (proportional to the time-domain energy)"""
+    power = np.abs(spec) ** 2
+    energy = 2 * np.sum(power, axis=-1) - power[..., 0]
+    # The last bin is the unpaired Nyquist bin only for even n_fft
+    if n_fft % 2 == 0:
+        energy -= power[..., -1]
+    return energy
+
+def reduce_noise_spectral_subtraction(y, sr, n_fft=2048, hop_length=512, noise_factor=1.0, dtype=None,
+                                      noise_profile=None):
     """
     Reduce noise using spectral subtraction
     
     Parameters:
     -----------
     y : numpy.ndarray
-        Audio signal
+        Audio signal, ``(n,)`` or ``(channels, n)``
     sr : int
         Sample rate
     n_fft : int
@@ -58,104 +125,217 @@ def reduce_noise_spectral_subtraction(y, sr, n_fft=2048, hop_length=512, noise_f
         Hop length for STFT
     noise_factor : float
         Factor to multiply the noise profile (higher = more aggressive)
+    dtype : numpy dtype or None
+        Working precision; defaults to the dtype of ``y`` (float32 audio is
+        processed with complex64 spectra)
+    noise_profile : NoiseProfile or None
+        Saved noise spectrum to subtract; by default the noise is estimated
+        from the first 0.5 seconds of ``y``
     
     Returns:
     --------
     y_clean : numpy.ndarray
         Noise-reduced audio signal
     """
+    y = np.asarray(y, dtype=dtype)
+
     # Compute STFT
     D = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+    record_array("stft", D)
     
     # Compute magnitude spectrogram
     mag = np.abs(D)
     
-    # Estimate noise profile from the first 0.5 seconds (assumed to be noise)
-    noise_length = min(int(0.5 * sr / hop_length), mag.shape[1] // 4)
-    noise_profile = np.mean(mag[:, :noise_length], axis=1).reshape(-1, 1)
+    if noise_profile is not None:
+        noise_mag = noise_profile.for_stft(sr, n_fft)[0].astype(mag.dtype)
+    else:
+        # Estimate noise profile from the first 0.5 seconds (assumed to be noise)
+        noise_mag = np.mean(mag[..., :_leading_noise_frames(mag, sr, hop_length)], axis=-1, keepdims=True)
     
     # Spectral subtraction
-    mag_clean = np.maximum(mag - noise_factor * noise_profile, 0)
+    mag_clean = np.maximum(mag - noise_factor * noise_mag, 0)
     
     # Recover phase
     phase = np.angle(D)
     
     # Reconstruct signal
     D_clean = mag_clean * np.exp(1j * phase)
-    y_clean = librosa.istft(D_clean, hop_length=hop_length)
+    y_clean = librosa.istft(D_clean, hop_length=hop_length, dtype=y.dtype)
     
     return y_clean
 
-def reduce_noise_median_filter(y, sr, filter_size=3):
+def _leading_noise_frames(spec, sr, hop_length):
+    """STFT frames in the leading stretch assumed to be noise (at most a quarter of them)"""
+    return max(min(int(LEADING_NOISE_SECONDS * sr / hop_length), spec.shape[-1] // 4), 1)
+
+def reduce_noise_wiener(y, sr, n_fft=2048, hop_length=512, noise_profile=None, alpha=0.98,
+                        min_prior_snr_db=-25.0, dtype=None):
+    """
+    Reduce noise with a decision-directed Wiener filter
+    
+    The a priori SNR of every STFT bin follows the decision-directed rule
+    ``xi(t) = alpha * |S(t-1)|^2 / N + (1 - alpha) * max(gamma(t) - 1, 0)``
+    with gain ``xi / (1 + xi)``. Its exact form is a frame-by-frame
+    recursion through the previous gain; here the previous frame's clean
+    power comes from a first pass that smooths ``max(gamma - 1, 0)`` over
+    time with one IIR filter, so both passes are whole-spectrogram NumPy
+    operations.
+    
+    Parameters:
+    -----------
+    y : numpy.ndarray
+        Audio signal, ``(n,)`` or ``(channels, n)``
+    sr : int
+        Sample rate
+    n_fft : int
+        FFT window size
+    hop_length : int
+        Hop length for STFT
+    noise_profile : NoiseProfile or None
+        Saved noise spectrum; by default the noise is estimated from the
+        first 0.5 seconds of ``y``
+    alpha : float
+        Weight of the previous frame's estimate (closer to 1 = smoother,
+        less musical noise)
+    min_prior_snr_db : float
+        Floor of the a priori SNR, which limits the attenuation
+    dtype : numpy dtype or None
+        Working precision; defaults to the dtype of ``y``
+    
+    Returns:
+    --------
+    y_clean : numpy.ndarray
+        Noise-reduced audio signal, as long as ``y``
+    """
+    y = np.asarray(y, dtype=dtype)
+
+    D = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+    record_array("stft", D)
+    power = np.square(np.abs(D))
+
+    if noise_profile is not None:
+        noise_power = noise_profile.for_stft(sr, n_fft)[1]
+    else:
+        noise_power = np.mean(power[..., :_leading_noise_frames(power, sr, hop_length)], axis=-1, keepdims=True)
+    noise_power = np.maximum(noise_power, np.finfo(power.dtype).tiny).astype(power.dtype)
+
+    # A posteriori SNR and its maximum-likelihood a priori estimate
+    post = power / noise_power
+    ml = np.maximum(post - 1, 0)
+
+    # First pass: recursive averaging of the ML estimate along time
+    xi = sg.lfilter([1 - alpha], [1, -alpha], ml, axis=-1).astype(power.dtype)
+    gain = xi / (1 + xi)
+
+    # Decision-directed pass with the previous frame's clean power from above
+    prev_clean = np.zeros_like(post)
+    prev_clean[..., 1:] = np.square(gain[..., :-1]) * post[..., :-1]
+    xi = np.maximum(alpha * prev_clean + (1 - alpha) * ml, 10 ** (min_prior_snr_db / 10))
+    gain = xi / (1 + xi)
+
+    return librosa.istft(D * gain, hop_length=hop_length, n_fft=n_fft, dtype=y.dtype, length=y.shape[-1])
+
+def reduce_noise_median_filter(y, sr, filter_size=3, n_fft=2048, hop_length=512, separable=False,
+                               dtype=None):
     """
     Reduce noise using median filtering in the spectral domain
     
+    The magnitude spectrogram is median filtered with
+    ``kernels.running_median_2d``, which gives the same result as
+    ``scipy.ndimage.median_filter`` and is much faster for the default
+    3x3 window. The phase is kept by rescaling the STFT in place.
+    
     Parameters:
     -----------
     y : numpy.ndarray
-        Audio signal
+        Audio signal, ``(n,)`` or ``(channels, n)``
     sr : int
         Sample rate
-    filter_size : int
-        Size of the median filter
+    filter_size : int or (int, int)
+        Odd size of the median filter, or ``(frequency bins, frames)``
+    n_fft : int
+        FFT window size
+    hop_length : int
+        Hop length for STFT
+    separable : bool
+        Filter along frequency and then along time instead of over the
+        2-D window; an approximation of the 2-D median that is cheaper
+        for large windows
+    dtype : numpy dtype or None
+        Working precision; defaults to the dtype of ``y``
     
     Returns:
     --------
     y_clean : numpy.ndarray
         Noise-reduced audio signal
     """
+    y = np.asarray(y, dtype=dtype)
+    size_f, size_t = (filter_size, filter_size) if np.isscalar(filter_size) else filter_size
+
     # Compute STFT
-    D = librosa.stft(y)
+    D = librosa.stft(y, n_fft=n_fft, hop_length=hop_length)
+    record_array("stft", D)
     
-    # Apply median filter along frequency axis
+    # Apply median filtering to magnitude
     mag = np.abs(D)
-    phase = np.angle(D)
+    if separable:
+        mag_filtered = running_median_2d(running_median_2d(mag, (size_f, 1)), (1, size_t))
+    else:
+        mag_filtered = running_median_2d(mag, (size_f, size_t))
     
-    # Apply median filtering to magnitude
-    mag_filtered = median_filter(mag, size=(filter_size, filter_size))
+    # Same as mag_filtered * exp(1j * angle(D)); silent bins have phase 0
+    silent = mag == 0
+    D *= np.divide(mag_filtered, mag, out=np.zeros_like(mag), where=~silent)
+    D[silent] = mag_filtered[silent]
     
     # Reconstruct signal
-    D_filtered = mag_filtered * np.exp(1j * phase)
-    y_clean = librosa.istft(D_filtered)
+    y_clean = librosa.istft(D, hop_length=hop_length, n_fft=n_fft, dtype=y.dtype)
     
     return y_clean
 
-def reduce_noise(input_path, output_path=None, method='spectral_subtraction', **kwargs):
+def reduce_noise(audio, output_path=None, method='spectral_subtraction', precision=None, **kwargs):
     """
-    Reduce noise in an audio file and save the result
+    Reduce noise in audio held in memory
     
     Parameters:
     -----------
-    input_path : str
-        Path to input audio file
+    audio : AudioBuffer or str
+        Input audio, or a path to an audio file to decode
     output_path : str or None
-        Path to save output audio file. If None, creates a temporary file.
+        If given, the result is also exported to this path
     method : str
-        Noise reduction method: 'spectral_subtraction' or 'median_filter'
+        Noise reduction method: 'spectral_subtraction', 'wiener' or 'median_filter'
+    precision : str or None
+        'float32' or 'float64' working precision for the STFT; by default
+        the precision of the input samples
     **kwargs : dict
         Additional parameters for the specific noise reduction method
     
     Returns:
     --------
-    output_path : str
-        Path to the noise-reduced audio file
+    denoised : AudioBuffer
+        Noise-reduced audio, with the method recorded in its provenance
     """
-    # Load audio
-    y, sr = librosa.load(input_path, sr=None)
+    audio = load_audio(audio)
+    y, sr = audio.samples, audio.sr
+    
+    dtype = PRECISIONS[precision] if precision is not None else None
     
     # Choose noise reduction method
-    if method == 'spectral_subtraction':
-        y_clean = reduce_noise_spectral_subtraction(y, sr, **kwargs)
-    elif method == 'median_filter':
-        y_clean = reduce_noise_median_filter(y, sr, **kwargs)
-    else:
-        raise ValueError(f"Unknown noise reduction method: {method}")
+    with profile_stage(f"noise_reduction:{method}"):
+        if method == 'spectral_subtraction':
+            y_clean = reduce_noise_spectral_subtraction(y, sr, dtype=dtype, **kwargs)
+        elif method == 'wiener':
+            y_clean = reduce_noise_wiener(y, sr, dtype=dtype, **kwargs)
+        elif method == 'median_filter':
+            y_clean = reduce_noise_median_filter(y, sr, dtype=dtype, **kwargs)
+        else:
+            raise ValueError(f"Unknown noise reduction method: {method}")
     
-    # Create output path if not provided
-    if output_path is None:
-        output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".wav").name
+    params = ", ".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+    denoised = audio.derive(y_clean, f"noise_reduction:{method}({params})")
     
-    # Save the result
-    sf.write(output_path, y_clean, sr, subtype="PCM_16")
+    if output_path is not None:
+        denoised.export(output_path)
     
-    return output_path
+    return denoised
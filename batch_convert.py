@@ -0,0 +1,249 @@
+"""Manifest-driven batch conversion with a durable progress journal.
+
+The manifest lists one conversion per row with explicit paths, either as CSV
+with a header or as JSON lines::
+
+    ref,tts,output,lpc_order
+    voices/alice.wav,prompts/0001.wav,out/alice_0001.wav,16
+
+``ref``, ``tts`` and ``output`` are required (relative paths are resolved
+against the manifest's directory); ``id``, ``lpc_order``, ``frame_length``
+and ``hop_length`` are optional. Outputs are written atomically (temporary
+file, fsync, rename), so a file at an output path is always complete.
+
+Every finished or failed item is appended to the journal (by default
+``<manifest>.journal.jsonl``) and flushed to disk before the next one is
+recorded. With ``--resume`` items whose last journal entry is ``done`` are
+skipped when the output still exists, its hash matches the journal and the
+inputs, parameters and run settings (engine, precision, channel handling)
+are unchanged; everything else (failed, interrupted, modified) is converted
+again.
+
+Example::
+
+    python batch_convert.py jobs.csv --workers 4
+    python batch_convert.py jobs.csv --workers 4 --resume
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from audio_io import file_hash, write_audio_atomic
+from pipeline import ConversionPipeline
+
+DEFAULT_PARAMS = {"lpc_order": 16, "frame_length": 1024, "hop_length": 512}
+REQUIRED_FIELDS = ("ref", "tts", "output")
+
+_worker_pipeline = None
+
+
+class ManifestError(ValueError):
+    pass
+
+
+def read_manifest(path, defaults=None):
+    """Parse a CSV or JSON-lines manifest into a list of item dicts"""
+    defaults = dict(DEFAULT_PARAMS, **(defaults or {}))
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    items, seen = [], set()
+    for n, row in enumerate(rows, start=1):
+        missing = [k for k in REQUIRED_FIELDS if not row.get(k)]
+        if missing:
+            raise ManifestError(f"{path}: row {n} is missing {', '.join(missing)}")
+        item = {k: os.path.join(base, row[k]) for k in REQUIRED_FIELDS}
+        item["id"] = str(row.get("id") or row["output"])
+        if item["id"] in seen:
+            raise ManifestError(f"{path}: duplicate item id {item['id']!r} (row {n})")
+        seen.add(item["id"])
+        item["params"] = {k: int(row.get(k) or defaults[k]) for k in DEFAULT_PARAMS}
+        items.append(item)
+    return items
+
+
+# --- Journal ---
+
+def journal_path(manifest_path):
+    return manifest_path + ".journal.jsonl"
+
+
+def read_journal(path):
+    """Last journal record per item id; a torn final line is ignored"""
+    state = {}
+    if not os.path.exists(path):
+        return state
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            state[record["id"]] = record
+    return state
+
+
+class Journal:
+    """Append-only JSON-lines log, synced to disk after every record"""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "a")
+
+    def append(self, record):
+        self._f.write(json.dumps(record, sort_keys=True) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def conversion_settings(engine, precision, mono):
+    """Run-wide settings that change the output, as stored in journal records"""
+    return {"engine": engine, "precision": precision, "mono": mono}
+
+
+def is_complete(item, record, settings):
+    """Whether ``record`` proves ``item`` was converted from its current inputs
+    with the same ``settings`` (see ``conversion_settings``)"""
+    if not record or record.get("status") != "done":
+        return False
+    if record.get("params") != item["params"] or record.get("settings") != settings:
+        return False
+    if not os.path.exists(item["output"]):
+        return False
+    try:
+        return (record.get("output_hash") == file_hash(item["output"])
+                and record.get("inputs") == {"ref": file_hash(item["ref"]),
+                                             "tts": file_hash(item["tts"])})
+    except OSError:
+        return False
+
+
+# --- Conversion ---
+
+def _init_worker(engine, precision, mono=True):
+    global _worker_pipeline
+    # Items already run in parallel processes; keep each conversion serial
+    _worker_pipeline = ConversionPipeline(engine=engine, precision=precision, workers=1, mono=mono)
+
+
+def _convert_item(item):
+    """Convert one item inside a worker and return its journal record"""
+    pipeline = _worker_pipeline
+    record = {"id": item["id"], "output": item["output"], "params": item["params"],
+              "settings": conversion_settings(pipeline.engine, pipeline.precision, pipeline.mono)}
+    start = time.perf_counter()
+    try:
+        record["inputs"] = {"ref": file_hash(item["ref"]), "tts": file_hash(item["tts"])}
+        params = item["params"]
+        y_out, sr = _worker_pipeline.run(item["ref"], item["tts"], params["lpc_order"],
+                                         params["frame_length"], params["hop_length"])
+        os.makedirs(os.path.dirname(item["output"]) or ".", exist_ok=True)
+        write_audio_atomic(item["output"], y_out, sr)
+        record["output_hash"] = file_hash(item["output"])
+        record["status"] = "done"
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    # Stage results are not shared between items; keep worker memory flat
+    _worker_pipeline.cache.clear()
+    record["seconds"] = time.perf_counter() - start
+    record["finished_at"] = time.time()
+    return record
+
+
+def run_batch(manifest_path, journal=None, resume=False, workers=None, engine="time",
+              precision="float64", defaults=None, progress=None, mono=True):
+    """Convert every manifest item and return ``{"done", "failed", "skipped"}`` id lists.
+
+    ``progress`` is an optional callable receiving each journal record.
+    With ``mono=False`` multi-channel references are converted (and
+    written) with all their channels.
+    """
+    items = read_manifest(manifest_path, defaults)
+    journal = journal or journal_path(manifest_path)
+    summary = {"done": [], "failed": [], "skipped": []}
+
+    if resume:
+        # Outputs made with another engine, precision or channel handling
+        # are converted again
+        settings = conversion_settings(engine, precision, mono)
+        state = read_journal(journal)
+        pending = []
+        for item in items:
+            if is_complete(item, state.get(item["id"]), settings):
+                summary["skipped"].append(item["id"])
+            else:
+                pending.append(item)
+    else:
+        pending = items
+
+    with Journal(journal) as log, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(engine, precision, mono)) as pool:
+        futures = [pool.submit(_convert_item, item) for item in pending]
+        try:
+            for future in as_completed(futures):
+                record = future.result()
+                log.append(record)
+                summary[record["status"]].append(record["id"])
+                if progress:
+                    progress(record)
+        except BaseException:
+            # Ctrl-C, a failing progress callback or a broken pool: do not
+            # wait for every queued item before the error surfaces
+            pool.shutdown(cancel_futures=True)
+            raise
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the items of a manifest, resumably")
+    parser.add_argument("manifest", help="CSV or JSON-lines manifest (ref, tts, output, ...)")
+    parser.add_argument("--journal", default=None, help="Progress journal (default: <manifest>.journal.jsonl)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip items already converted and verified by the journal")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--engine", choices=("time", "stft"), default="time")
+    parser.add_argument("--precision", choices=("float64", "float32"), default="float64")
+    parser.add_argument("--keep-channels", action="store_true",
+                        help="Convert every channel of multi-channel references instead of a mono downmix")
+    for name, value in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value,
+                            help=f"Default {name} for rows that do not set it")
+    args = parser.parse_args(argv)
+
+    def report(record):
+        status = record["status"] if record["status"] == "done" else f"FAILED ({record['error']})"
+        print(f"{record['id']}: {status} in {record['seconds']:.1f} s", flush=True)
+
+    try:
+        summary = run_batch(
+            args.manifest, args.journal, args.resume, args.workers, args.engine, args.precision,
+            defaults={name: getattr(args, name) for name in DEFAULT_PARAMS}, progress=report,
+            mono=not args.keep_channels)
+    except ManifestError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(f"{len(summary['done'])} converted, {len(summary['skipped'])} already done, "
+          f"{len(summary['failed'])} failed")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
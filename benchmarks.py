@@ -0,0 +1,214 @@
+"""Benchmark suite for the hot audio functions, with a regression gate.
+
+Every benchmark runs on each signal of a deterministic synthetic corpus
+(``synthetic_corpus.corpus``) and records the best wall time of a few
+repeats together with the realtime factor (processing time / audio
+duration, so lower is faster). Results are written as JSON.
+
+When a baseline JSON from an earlier run is given (by default
+``benchmark_baseline.json`` if it exists), every result is compared with
+the baseline entry for the same benchmark and signal; the run fails if any
+is more than ``--threshold`` slower. Baselines are machine specific, so
+record one per machine with ``--update-baseline``.
+
+Example::
+
+    python benchmarks.py --update-baseline
+    python benchmarks.py --threshold 0.2 --output results.json
+    python benchmarks.py --only overlap_add extract_lpc --lengths 5
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import OrderedDict
+import numpy as np
+import librosa
+from audio_buffer import AudioBuffer
+from audio_utils import (extract_lpc, extract_lpc_env, lpc_residual, overlap_add,
+                         reduce_noise_median_filter, reduce_noise_spectral_subtraction,
+                         reduce_noise_wiener)
+from pipeline import ConversionPipeline
+from synthetic_corpus import corpus, synthetic_speech
+
+RESULTS_VERSION = 1
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Differences below this many seconds are timer noise, never a regression
+MIN_REGRESSION_SECONDS = 0.005
+LPC_ORDER = 16
+FRAME_LENGTH = 1024
+HOP_LENGTH = 512
+
+
+def _frames(y):
+    frames = librosa.util.frame(y, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH).T
+    return frames * np.hamming(FRAME_LENGTH)
+
+
+def _bench_extract_lpc(y, sr):
+    frames = _frames(y)
+    return lambda: [extract_lpc(frame, LPC_ORDER) for frame in frames]
+
+
+def _bench_lpc_residual(y, sr):
+    frames = _frames(y)
+    coeffs = librosa.lpc(frames, order=LPC_ORDER, axis=-1)
+    return lambda: [lpc_residual(frame, a) for frame, a in zip(frames, coeffs)]
+
+
+def _bench_overlap_add(y, sr):
+    frames = _frames(y)
+    return lambda: overlap_add(frames, HOP_LENGTH)
+
+
+def _bench_extract_lpc_env(y, sr):
+    return lambda: extract_lpc_env(y, sr, LPC_ORDER)
+
+
+def _bench_spectral_subtraction(y, sr):
+    return lambda: reduce_noise_spectral_subtraction(y, sr)
+
+
+def _bench_wiener(y, sr):
+    return lambda: reduce_noise_wiener(y, sr)
+
+
+def _bench_median_filter(y, sr):
+    return lambda: reduce_noise_median_filter(y, sr)
+
+
+def _bench_conversion(y, sr):
+    # What AudioProcessor.run does, on a fresh pipeline so nothing is cached
+    ref = AudioBuffer(y, sr)
+    tts = AudioBuffer(synthetic_speech(len(y) / sr, sr, f0=180.0, seed=1), sr)
+    return lambda: ConversionPipeline().run(ref, tts, LPC_ORDER, FRAME_LENGTH, HOP_LENGTH)
+
+
+def _bench_conversion_stereo(y, sr):
+    # Two reference channels in one pass; compare with twice "conversion"
+    second = synthetic_speech(len(y) / sr, sr, f0=140.0, seed=2)
+    ref = AudioBuffer(np.stack([y, 0.6 * second]), sr)
+    tts = AudioBuffer(synthetic_speech(len(y) / sr, sr, f0=180.0, seed=1), sr)
+    return lambda: ConversionPipeline().run(ref, tts, LPC_ORDER, FRAME_LENGTH, HOP_LENGTH)
+
+
+# name -> setup(y, sr) returning the callable to time
+BENCHMARKS = OrderedDict([
+    ("extract_lpc", _bench_extract_lpc),
+    ("lpc_residual", _bench_lpc_residual),
+    ("overlap_add", _bench_overlap_add),
+    ("extract_lpc_env", _bench_extract_lpc_env),
+    ("reduce_noise_spectral_subtraction", _bench_spectral_subtraction),
+    ("reduce_noise_wiener", _bench_wiener),
+    ("reduce_noise_median_filter", _bench_median_filter),
+    ("conversion", _bench_conversion),
+    ("conversion_stereo", _bench_conversion_stereo),
+])
+
+
+def time_call(fn, min_seconds=0.5, max_repeats=5):
+    """Best wall time of ``fn`` over repeats totalling about ``min_seconds``"""
+    times = []
+    while len(times) < max_repeats and (not times or sum(times) < min_seconds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), len(times)
+
+
+def run_benchmarks(names=None, lengths=(5.0, 20.0), sample_rates=(16000, 44100), progress=None):
+    """Run the selected benchmarks on the corpus and return the results dict"""
+    names = list(names or BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    results = []
+    for signal, (y, sr) in corpus(lengths, sample_rates).items():
+        duration = len(y) / sr
+        for name in names:
+            seconds, repeats = time_call(BENCHMARKS[name](y, sr))
+            result = {"name": name, "signal": signal, "sr": sr, "audio_seconds": duration,
+                      "seconds": seconds, "repeats": repeats, "realtime_factor": seconds / duration}
+            results.append(result)
+            if progress:
+                progress(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {"python": platform.python_version(), "machine": platform.machine(),
+                        "processor": platform.processor(), "numpy": np.__version__,
+                        "librosa": librosa.__version__},
+        "results": results,
+    }
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Results slower than their baseline entry by more than ``threshold`` (a fraction)"""
+    reference = {(r["name"], r["signal"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in results["results"]:
+        base = reference.get((r["name"], r["signal"]))
+        if base is None:
+            continue
+        if r["seconds"] > base * (1 + threshold) and r["seconds"] - base > MIN_REGRESSION_SECONDS:
+            regressions.append(dict(r, baseline_seconds=base, slowdown=r["seconds"] / base - 1))
+    return regressions
+
+
+def format_table(results):
+    lines = [f"{'benchmark':<36}{'signal':<20}{'seconds':>10}{'x realtime':>12}"]
+    for r in results["results"]:
+        lines.append(f"{r['name']:<36}{r['signal']:<20}{r['seconds']:>10.4f}{r['realtime_factor']:>12.4f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the hot audio functions on synthetic speech")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("--lengths", type=float, nargs="+", default=[5.0, 20.0], help="Signal lengths (s)")
+    parser.add_argument("--rates", type=int, nargs="+", default=[16000, 44100], help="Sample rates")
+    parser.add_argument("--output", default=None, help="Write the results JSON here")
+    parser.add_argument("--baseline", default=None,
+                        help=f"Baseline results JSON (default: {DEFAULT_BASELINE} if present)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown against the baseline as a fraction (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.only, args.lengths, args.rates,
+        progress=lambda r: print(f"{r['name']} on {r['signal']}: {r['seconds']:.4f} s", flush=True))
+    print(format_table(results))
+
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    status = 0
+    if args.update_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        results["baseline"] = baseline_path
+        results["threshold"] = args.threshold
+        results["regressions"] = find_regressions(results, baseline, args.threshold)
+        for r in results["regressions"]:
+            print(f"REGRESSION {r['name']} on {r['signal']}: {r['seconds']:.4f} s vs "
+                  f"{r['baseline_seconds']:.4f} s (+{100 * r['slowdown']:.0f}%)", file=sys.stderr)
+        status = 1 if results["regressions"] else 0
+    elif args.baseline:
+        print(f"No baseline at {baseline_path}", file=sys.stderr)
+        status = 2
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
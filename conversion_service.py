@@ -0,0 +1,307 @@
+"""Local HTTP service around the Qt-free conversion pipeline.
+
+Endpoints
+---------
+POST /profiles
+    Body is reference audio. Stores it and returns ``{"profile_id": ...}``.
+POST /convert?profile=<id>[&lpc_order=16&frame_length=1024&hop_length=512]
+    Body is the TTS WAV. Alternatively send ``multipart/form-data`` with
+    ``reference`` and ``tts`` file fields instead of a profile ID. The
+    converted 16-bit WAV is sent with chunked transfer encoding once the
+    whole conversion has finished (the pipeline does not emit partial
+    output).
+GET /metrics
+    Queue depth, in-flight jobs and latency percentiles as JSON.
+GET /health
+    Liveness check.
+
+Conversions run in a process pool whose workers are warmed up at start-up
+(librosa's numba kernels compiled) and keep their own ``ConversionPipeline``,
+so repeated requests against the same profile reuse its cached analysis.
+If a worker dies (crash, OOM kill) the pool is rebuilt and the request that
+hit the broken pool is retried once.
+
+Run with ``python conversion_service.py --port 8765 --workers 4``.
+"""
+import argparse
+import email.parser
+import email.policy
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import soundfile as sf
+from pipeline import ConversionPipeline
+
+DEFAULT_PARAMS = {"lpc_order": 16, "frame_length": 1024, "hop_length": 512}
+STREAM_CHUNK = 64 * 1024
+LATENCY_WINDOW = 1000
+
+_worker_pipeline = None
+
+
+def _warm_worker():
+    """Process-pool initializer: build the pipeline and compile librosa's kernels"""
+    global _worker_pipeline
+    # Requests already run in parallel processes; keep each conversion serial
+    _worker_pipeline = ConversionPipeline(workers=1)
+    sr = 16000
+    t = np.arange(sr // 2) / sr
+    y = (0.3 * np.sin(2 * np.pi * 150 * t)).astype(np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "warmup.wav")
+        sf.write(path, y, sr)
+        _worker_pipeline.run(path, path, DEFAULT_PARAMS["lpc_order"], 1024, 512)
+    _worker_pipeline.cache.clear()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _convert_job(ref_path, tts_bytes, lpc_order, frame_length, hop_length):
+    """Run one conversion inside a worker and return the output as WAV bytes"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp.write(tts_bytes)
+    try:
+        y_out, sr = _worker_pipeline.run(ref_path, tmp.name, lpc_order, frame_length, hop_length)
+    finally:
+        os.remove(tmp.name)
+    buf = io.BytesIO()
+    sf.write(buf, y_out, sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+class ConversionService:
+    """Worker pool, reference profile store and request metrics"""
+
+    def __init__(self, workers=2, profile_dir=None):
+        self.workers = workers
+        self.profile_dir = profile_dir or tempfile.mkdtemp(prefix="mimic_profiles_")
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.pool = self._new_pool()
+        self._lock = threading.Lock()
+        self.outstanding = 0
+        self.completed = 0
+        self.failed = 0
+        self.pool_restarts = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+
+    def _replace_broken_pool(self, broken):
+        """Swap in a fresh pool for ``broken`` unless another request already did"""
+        with self._lock:
+            if self.pool is broken:
+                self.pool = self._new_pool()
+                self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def warm_up(self):
+        """Start every worker process now instead of on the first request"""
+        futures = [self.pool.submit(_ping) for _ in range(self.workers * 2)]
+        return sorted({f.result() for f in futures})
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+    def add_profile(self, data):
+        profile_id = hashlib.sha1(data).hexdigest()[:16]
+        path = self.profile_path(profile_id)
+        if not os.path.exists(path):
+            tmp_path = path + ".part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return profile_id
+
+    def profile_path(self, profile_id):
+        if not profile_id.isalnum():
+            raise KeyError(profile_id)
+        return os.path.join(self.profile_dir, f"{profile_id}.audio")
+
+    def convert(self, ref_path, tts_bytes, lpc_order, frame_length, hop_length):
+        start = time.perf_counter()
+        args = (ref_path, tts_bytes, lpc_order, frame_length, hop_length)
+        with self._lock:
+            self.outstanding += 1
+        try:
+            pool = self.pool
+            try:
+                result = pool.submit(_convert_job, *args).result()
+            except BrokenProcessPool:
+                # A dead worker breaks the whole pool for every later request
+                self._replace_broken_pool(pool)
+                result = self.pool.submit(_convert_job, *args).result()
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.outstanding -= 1
+        with self._lock:
+            self.completed += 1
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self.latencies)
+            outstanding = self.outstanding
+            snapshot = {
+                "workers": self.workers,
+                "queue_depth": max(0, outstanding - self.workers),
+                "in_flight": min(outstanding, self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "pool_restarts": self.pool_restarts,
+            }
+        if len(latencies):
+            snapshot["latency_s"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(latencies.max()),
+                "mean": float(latencies.mean()),
+            }
+        return snapshot
+
+
+def _parse_multipart(content_type, body):
+    """Return ``{field name: bytes}`` for a multipart/form-data body"""
+    parser = email.parser.BytesParser(policy=email.policy.HTTP)
+    msg = parser.parsebytes(b"Content-Type: " + content_type.encode() + b"\r\n\r\n" + body)
+    fields = {}
+    for part in msg.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        if name:
+            fields[name] = part.get_payload(decode=True)
+    return fields
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    service = None  # set by make_server
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/metrics":
+            self._send_json(200, self.service.metrics())
+        elif path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._read_body()
+        if url.path == "/profiles":
+            if not body:
+                self._send_json(400, {"error": "empty reference upload"})
+                return
+            self._send_json(200, {"profile_id": self.service.add_profile(body)})
+        elif url.path == "/convert":
+            self._handle_convert(parse_qs(url.query), body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _handle_convert(self, query, body):
+        try:
+            params = {k: int(query.get(k, [v])[0]) for k, v in DEFAULT_PARAMS.items()}
+        except ValueError as e:
+            self._send_json(400, {"error": f"invalid parameter: {e}"})
+            return
+
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            fields = _parse_multipart(content_type, body)
+            if "tts" not in fields or ("reference" not in fields and "profile" not in query):
+                self._send_json(400, {"error": "multipart upload needs 'tts' and 'reference' fields"})
+                return
+            tts_bytes = fields["tts"]
+            profile_id = (self.service.add_profile(fields["reference"]) if "reference" in fields
+                          else query["profile"][0])
+        else:
+            tts_bytes = body
+            profile_id = query.get("profile", [None])[0]
+        if not profile_id:
+            self._send_json(400, {"error": "missing 'profile' query parameter"})
+            return
+        try:
+            ref_path = self.service.profile_path(profile_id)
+        except KeyError:
+            ref_path = None
+        if not ref_path or not os.path.exists(ref_path):
+            self._send_json(404, {"error": f"unknown profile: {profile_id}"})
+            return
+
+        try:
+            wav = self.service.convert(ref_path, tts_bytes, **params)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(wav), STREAM_CHUNK):
+            chunk = wav[start:start + STREAM_CHUNK]
+            self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=8765, workers=2, profile_dir=None):
+    """Create the HTTP server and a warmed-up ``ConversionService``"""
+    service = ConversionService(workers=workers, profile_dir=profile_dir)
+    service.warm_up()
+    handler = type("BoundHandler", (ConversionRequestHandler,), {"service": service})
+    return ThreadingHTTPServer((host, port), handler), service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local voice conversion HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--profile-dir", default=None, help="Where uploaded reference profiles are kept")
+    args = parser.parse_args(argv)
+
+    server, service = make_server(args.host, args.port, args.workers, args.profile_dir)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} warm workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
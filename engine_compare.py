@@ -0,0 +1,106 @@
+"""Speed and quality comparison of the conversion engines.
+
+For each engine in ``pipeline.ENGINES`` this times a full conversion on a
+fresh pipeline, noting how much of it the resynthesis stage took, and scores
+the output:
+
+- ``env_lsd_db``: log-spectral distance between the output's mean LPC
+  envelope and the TTS envelope it should take on (lower is better)
+- ``f0_rmse_cents``: pitch error of the output against the reference
+- ``vs_time_*``: MCD, LSD and segmental SNR against the time-domain
+  engine's output, showing how far the engines disagree
+
+Without input files a synthetic voice is used for both signals.
+
+Example::
+
+    python engine_compare.py ref.wav tts.wav --lpc-order 16
+"""
+import argparse
+import math
+import sys
+import time
+from audio_buffer import AudioBuffer
+from audio_utils import extract_lpc_env
+from metrics import compare_signals, log_spectral_distance
+from pipeline import ENGINES, ConversionPipeline
+from precision_check import synthetic_voice
+
+SCORE_LPC_ORDER = 16
+TABLE_COLUMNS = ["engine", "seconds", "resynthesis_seconds", "realtime_factor", "env_lsd_db",
+                 "f0_rmse_cents", "vs_time_mcd_db", "vs_time_lsd_db", "vs_time_segsnr_db"]
+
+
+def compare_engines(ref, tts, lpc_order=16, frame_length=1024, hop_length=512, engines=ENGINES):
+    """Return one result dict per engine (see module docstring)"""
+    _, env_tts = extract_lpc_env(tts.resample(ref.sr).samples, ref.sr, SCORE_LPC_ORDER)
+    duration = len(ref.samples) / ref.sr
+
+    rows, outputs = [], {}
+    for engine in engines:
+        pipeline = ConversionPipeline(engine=engine)
+        start = time.perf_counter()
+        y_out, sr = pipeline.run(ref, tts, lpc_order, frame_length, hop_length)
+        seconds = time.perf_counter() - start
+        _, env_out = extract_lpc_env(y_out, sr, SCORE_LPC_ORDER)
+        outputs[engine] = y_out
+        rows.append({
+            "engine": engine,
+            "seconds": seconds,
+            "resynthesis_seconds": pipeline.stats["resynthesis"]["seconds"],
+            "realtime_factor": seconds / duration,
+            "env_lsd_db": float(log_spectral_distance(env_tts, env_out)),
+            "f0_rmse_cents": compare_signals(ref.samples, y_out, sr)["f0_rmse_cents"],
+        })
+
+    baseline = outputs.get("time")
+    for row in rows:
+        if baseline is not None and row["engine"] != "time":
+            agreement = compare_signals(baseline, outputs[row["engine"]], ref.sr)
+            for name in ("mcd_db", "lsd_db", "segsnr_db"):
+                row[f"vs_time_{name}"] = agreement[name]
+    return rows
+
+
+def format_table(rows):
+    header = "  ".join(f"{c:>{max(len(c), 8)}}" for c in TABLE_COLUMNS)
+    lines = [header]
+    for row in rows:
+        cells = []
+        for c in TABLE_COLUMNS:
+            value = row.get(c, "-")
+            text = f"{value:.3f}" if isinstance(value, float) else str(value)
+            cells.append(f"{text:>{max(len(c), 8)}}")
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("ref", nargs="?", help="Reference voice file")
+    parser.add_argument("tts", nargs="?", help="TTS file to convert")
+    parser.add_argument("--seconds", type=float, default=20.0,
+                        help="Length of the synthetic input when no files are given")
+    parser.add_argument("--lpc-order", type=int, default=16)
+    parser.add_argument("--frame-length", type=int, default=1024)
+    parser.add_argument("--hop-length", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    if args.ref and args.tts:
+        ref, tts = AudioBuffer.from_file(args.ref), AudioBuffer.from_file(args.tts)
+    else:
+        ref = synthetic_voice(args.seconds, f0=110.0, seed=0)
+        tts = synthetic_voice(args.seconds, f0=180.0, seed=1)
+    rows = compare_engines(ref, tts, args.lpc_order, args.frame_length, args.hop_length)
+    print(format_table(rows))
+    # A NaN score means an engine produced unusable output, not a close call
+    broken = [f"{row['engine']} {c}" for row in rows for c in TABLE_COLUMNS
+              if isinstance(row.get(c), float) and math.isnan(row[c])]
+    if broken:
+        print(f"Non-finite scores: {', '.join(broken)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""Batched filtering, LPC and median kernels for the matrices used in processing.
+
+The filtering and LPC functions work on a whole ``(n_frames,
+frame_length)`` matrix with one coefficient row per frame, and
+``running_median_2d`` filters a whole spectrogram. Leading axes (e.g. the
+channels of a multi-channel signal) are a batch: they are flattened into
+the frame axis, so every channel goes through the same single kernel
+call. When numba is importable (librosa already depends on it) the
+recursive and sliding parts run as compiled loops; otherwise they fall
+back to NumPy/SciPy, giving the same results. Set ``MIMIC_KERNELS=numpy``
+in the environment to force the fallback.
+"""
+import os
+import numpy as np
+import scipy.signal as sg
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import numba
+    HAVE_NUMBA = True
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+    HAVE_NUMBA = False
+
+BACKEND = "numba" if HAVE_NUMBA and os.environ.get("MIMIC_KERNELS", "").lower() != "numpy" else "numpy"
+
+
+def _resolve(backend):
+    backend = backend or BACKEND
+    if backend == "numba" and not HAVE_NUMBA:
+        raise ValueError("numba backend requested but numba is not installed")
+    if backend not in ("numba", "numpy"):
+        raise ValueError(f"Unknown kernel backend: {backend}")
+    return backend
+
+
+if HAVE_NUMBA:
+    @numba.njit(cache=True, nogil=True)
+    def _allpole_numba(x, a, out):
+        n_frames, n = x.shape
+        order = a.shape[1] - 1
+        for f in range(n_frames):
+            a0 = a[f, 0]
+            for i in range(n):
+                acc = x[f, i]
+                for k in range(1, min(order, i) + 1):
+                    acc -= a[f, k] * out[f, i - k]
+                out[f, i] = acc / a0
+        return out
+
+    @numba.njit(cache=True, nogil=True)
+    def _allzero_numba(x, b, out):
+        n_frames, n = x.shape
+        order = b.shape[1] - 1
+        for f in range(n_frames):
+            for i in range(n):
+                acc = 0.0
+                for k in range(0, min(order, i) + 1):
+                    acc += b[f, k] * x[f, i - k]
+                out[f, i] = acc
+        return out
+
+    @numba.njit(cache=True, nogil=True)
+    def _levinson_numba(r, order, a, err):
+        n_frames = r.shape[0]
+        tmp = np.empty(order + 1, dtype=a.dtype)
+        for f in range(n_frames):
+            a[f, 0] = 1.0
+            e = r[f, 0]
+            for i in range(1, order + 1):
+                if e <= 0.0:
+                    break
+                acc = r[f, i]
+                for j in range(1, i):
+                    acc += a[f, j] * r[f, i - j]
+                k = -acc / e
+                for j in range(1, i):
+                    tmp[j] = a[f, j] + k * a[f, i - j]
+                for j in range(1, i):
+                    a[f, j] = tmp[j]
+                a[f, i] = k
+                e *= 1.0 - k * k
+            err[f] = e
+        return a, err
+
+    @numba.njit(cache=True, nogil=True)
+    def _running_median_numba(padded, size_r, size_c, out):
+        n_rows, n_cols = out.shape
+        k = size_r * size_c
+        window = np.empty(k, dtype=padded.dtype)
+        for r in range(n_rows):
+            # Sorted window at column 0, then slide it one column at a time:
+            # each row of the leaving column is swapped for the entering one
+            # and moved to its sorted place
+            i = 0
+            for c in range(size_c):
+                for j in range(size_r):
+                    window[i] = padded[r + j, c]
+                    i += 1
+            window.sort()
+            out[r, 0] = window[k // 2]
+            for c in range(1, n_cols):
+                for j in range(size_r):
+                    old = padded[r + j, c - 1]
+                    new = padded[r + j, c + size_c - 1]
+                    lo, hi = 0, k - 1
+                    while lo < hi:
+                        mid = (lo + hi) // 2
+                        if window[mid] < old:
+                            lo = mid + 1
+                        else:
+                            hi = mid
+                    i = lo
+                    if new > old:
+                        while i + 1 < k and window[i + 1] < new:
+                            window[i] = window[i + 1]
+                            i += 1
+                    else:
+                        while i > 0 and window[i - 1] > new:
+                            window[i] = window[i - 1]
+                            i -= 1
+                    window[i] = new
+                out[r, c] = window[k // 2]
+        return out
+
+    @numba.njit(cache=True, nogil=True)
+    def _median3x3_numba(padded, out):
+        n_rows, n_cols = out.shape
+        for r in range(n_rows):
+            for c in range(n_cols):
+                p0, p1, p2 = padded[r, c], padded[r, c + 1], padded[r, c + 2]
+                p3, p4, p5 = padded[r + 1, c], padded[r + 1, c + 1], padded[r + 1, c + 2]
+                p6, p7, p8 = padded[r + 2, c], padded[r + 2, c + 1], padded[r + 2, c + 2]
+                # Same network as MEDIAN9_NETWORK, written out so it stays in registers
+                p1, p2 = min(p1, p2), max(p1, p2)
+                p4, p5 = min(p4, p5), max(p4, p5)
+                p7, p8 = min(p7, p8), max(p7, p8)
+                p0, p1 = min(p0, p1), max(p0, p1)
+                p3, p4 = min(p3, p4), max(p3, p4)
+                p6, p7 = min(p6, p7), max(p6, p7)
+                p1, p2 = min(p1, p2), max(p1, p2)
+                p4, p5 = min(p4, p5), max(p4, p5)
+                p7, p8 = min(p7, p8), max(p7, p8)
+                p3 = max(p0, p3)
+                p5 = min(p5, p8)
+                p4, p7 = min(p4, p7), max(p4, p7)
+                p6 = max(p3, p6)
+                p4 = max(p1, p4)
+                p2 = min(p2, p5)
+                p4 = min(p4, p7)
+                p4, p2 = min(p4, p2), max(p4, p2)
+                p4 = max(p6, p4)
+                out[r, c] = min(p4, p2)
+        return out
+
+
+def _flatten_batch(x, coefs):
+    """Broadcast the leading axes of frames and per-frame coefficients and flatten them.
+
+    Returns the broadcast leading shape and both arrays as 2-D matrices.
+    """
+    lead = np.broadcast_shapes(x.shape[:-1], coefs.shape[:-1])
+    if x.shape[:-1] != lead:
+        x = np.broadcast_to(x, lead + x.shape[-1:])
+    if coefs.shape[:-1] != lead:
+        coefs = np.broadcast_to(coefs, lead + coefs.shape[-1:])
+    return lead, x.reshape(-1, x.shape[-1]), coefs.reshape(-1, coefs.shape[-1])
+
+
+def allzero_filter_frames(x, b, backend=None):
+    """FIR-filter every frame with its own coefficients (``lfilter(b[i], [1], x[i])``).
+
+    Parameters
+    ----------
+    x : numpy.ndarray [shape=(..., n_frames, n)]
+        Frames to filter, each starting from zero state
+    b : numpy.ndarray [shape=(..., n_frames, order + 1)]
+        Numerator coefficients per frame (e.g. LPC ``a`` for the residual),
+        broadcast against the leading axes of ``x``
+    """
+    x = np.asarray(x)
+    b = np.asarray(b, dtype=np.result_type(x, b))
+    lead, x, b = _flatten_batch(x, b)
+    out = np.empty(x.shape, dtype=np.result_type(x, b))
+    if _resolve(backend) == "numba":
+        return _allzero_numba(x, b, out).reshape(lead + x.shape[-1:])
+    # A tapped delay line is already vectorized over frames and samples
+    out[:] = b[:, :1] * x
+    for k in range(1, b.shape[1]):
+        out[:, k:] += b[:, k:k + 1] * x[:, :-k]
+    return out.reshape(lead + x.shape[-1:])
+
+
+def allpole_filter_frames(x, a, backend=None):
+    """IIR-filter every frame with its own all-pole filter (``lfilter([1], a[i], x[i])``).
+
+    Parameters
+    ----------
+    x : numpy.ndarray [shape=(..., n_frames, n)]
+        Excitation frames, each starting from zero state
+    a : numpy.ndarray [shape=(..., n_frames, order + 1)]
+        Denominator coefficients per frame, broadcast against the leading
+        axes of ``x``
+    """
+    x = np.asarray(x)
+    a = np.asarray(a, dtype=np.result_type(x, a))
+    lead, x, a = _flatten_batch(x, a)
+    out = np.empty(x.shape, dtype=np.result_type(x, a))
+    if _resolve(backend) == "numba":
+        return _allpole_numba(x, a, out).reshape(lead + x.shape[-1:])
+    for i in range(len(x)):
+        out[i] = sg.lfilter([1.0], a[i], x[i])
+    return out.reshape(lead + x.shape[-1:])
+
+
+def autocorrelation_frames(frames, order):
+    """First ``order + 1`` autocorrelation lags of every frame, via one batched FFT"""
+    frames = np.asarray(frames)
+    n_fft = 1 << int(np.ceil(np.log2(2 * frames.shape[-1] - 1)))
+    spec = np.fft.rfft(frames, n=n_fft, axis=-1)
+    r = np.fft.irfft(spec.real**2 + spec.imag**2, n=n_fft, axis=-1)
+    return r[..., :order + 1]
+
+
+def levinson_frames(r, order, backend=None):
+    """Batched Levinson-Durbin recursion.
+
+    Parameters
+    ----------
+    r : numpy.ndarray [shape=(..., n_frames, >= order + 1)]
+        Autocorrelation lags per frame
+    order : int
+        LPC order
+
+    Returns
+    -------
+    a : numpy.ndarray [shape=(..., n_frames, order + 1)]
+        Prediction error filter coefficients, ``a[..., 0] == 1``
+    err : numpy.ndarray [shape=(..., n_frames)]
+        Final prediction error power
+    """
+    r = np.asarray(r, dtype=np.result_type(r, np.float32))
+    if r.ndim > 2:
+        a, err = levinson_frames(r.reshape(-1, r.shape[-1]), order, backend)
+        return a.reshape(r.shape[:-1] + a.shape[-1:]), err.reshape(r.shape[:-1])
+    n_frames = r.shape[0]
+    a = np.zeros((n_frames, order + 1), dtype=r.dtype)
+    err = np.empty(n_frames, dtype=r.dtype)
+    if _resolve(backend) == "numba":
+        return _levinson_numba(np.ascontiguousarray(r), order, a, err)
+    # The recursion runs over the order; every step is vectorized over frames
+    a[:, 0] = 1.0
+    e = r[:, 0].copy()
+    for i in range(1, order + 1):
+        active = e > 0
+        acc = r[:, i] + np.sum(a[:, 1:i] * r[:, i - 1:0:-1], axis=1)
+        k = np.where(active, -acc / np.where(active, e, 1.0), 0.0)
+        a[:, 1:i] = a[:, 1:i] + k[:, None] * a[:, i - 1:0:-1]
+        a[:, i] = k
+        e = np.where(active, e * (1.0 - k * k), e)
+    err[:] = e
+    return a, err
+
+
+def lpc_autocorrelation(frames, order, backend=None):
+    """LPC coefficients of every frame by the autocorrelation method"""
+    return levinson_frames(autocorrelation_frames(frames, order), order, backend)[0]
+
+
+# Columns per block in the NumPy median, bounding its window copy
+MEDIAN_BLOCK = 256
+# Compare-exchange pairs (Paeth's median of 9) of a 3x3 window read row by
+# row; element 4 ends up as the median. Pairs whose other output is never
+# used again are still listed in full.
+MEDIAN9_NETWORK = ((1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+                   (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4), (4, 2))
+
+
+def _median3x3_numpy(padded, shape):
+    rows, cols = shape[-2:]
+    p = [padded[..., i:i + rows, j:j + cols] for i in range(3) for j in range(3)]
+    for a, b in MEDIAN9_NETWORK:
+        p[a], p[b] = np.minimum(p[a], p[b]), np.maximum(p[a], p[b])
+    return p[4]
+
+
+def _stacked_rows(kernel, padded, size_r, out_cols, *args):
+    """Run a median kernel once over the leading axes of ``padded`` stacked along its rows.
+
+    Output rows whose ``size_r``-row window straddles two stacked slices
+    are computed and dropped.
+    """
+    flat = padded.reshape(-1, padded.shape[-1])
+    out = np.empty((len(flat), out_cols), dtype=padded.dtype)
+    kernel(flat, *args, out[:len(flat) - size_r + 1])
+    rows = padded.shape[-2] - size_r + 1
+    return out.reshape(padded.shape[:-1] + (out_cols,))[..., :rows, :]
+
+
+def running_median_2d(x, size, backend=None, block=MEDIAN_BLOCK):
+    """Median filter over the last two axes, identical to ``scipy.ndimage.median_filter``.
+
+    Equals ``median_filter(x, size)`` for a 2-D ``x``; leading axes (e.g.
+    the channels of a multi-channel spectrogram) are filtered
+    independently, in the same pass. Borders are reflected as in ndimage's
+    default ``mode="reflect"``. A 3x3 window goes through a 19-comparator
+    median-of-9 network. With numba, a single-row or single-column window
+    is a sorted window slid along the array and updated one sample per
+    step. Other windows take ``np.partition`` medians of ``block`` columns
+    at a time, which bounds the memory of the window copies.
+
+    Parameters
+    ----------
+    x : numpy.ndarray [shape=(..., n_rows, n_cols)]
+    size : int or (int, int)
+        Odd window size, or per-axis sizes ``(rows, cols)``
+    """
+    x = np.asarray(x)
+    size_r, size_c = (size, size) if np.isscalar(size) else size
+    if size_r % 2 == 0 or size_c % 2 == 0 or size_r < 1 or size_c < 1:
+        raise ValueError(f"Median sizes must be odd and positive, got {size}")
+    if size_r == size_c == 1:
+        return x.copy()
+    rows, cols = x.shape[-2:]
+    # ndimage's "reflect" repeats the edge sample, which is NumPy's "symmetric"
+    pad = ((0, 0),) * (x.ndim - 2) + ((size_r // 2, size_r // 2), (size_c // 2, size_c // 2))
+    padded = np.pad(x, pad, mode="symmetric")
+    numba_backend = _resolve(backend) == "numba"
+    if size_r == size_c == 3:
+        if numba_backend:
+            return _stacked_rows(_median3x3_numba, padded, 3, cols)
+        return _median3x3_numpy(padded, x.shape)
+    if numba_backend and size_r == 1:
+        return _stacked_rows(_running_median_numba, padded, 1, cols, 1, size_c)
+    if numba_backend and size_c == 1:
+        columns = np.ascontiguousarray(np.swapaxes(padded, -1, -2))
+        return np.swapaxes(_stacked_rows(_running_median_numba, columns, 1, rows, 1, size_r), -1, -2)
+    out = np.empty(x.shape, dtype=x.dtype)
+    k = size_r * size_c
+    for start in range(0, cols, block):
+        stop = min(start + block, cols)
+        windows = sliding_window_view(padded[..., start:stop + size_c - 1], (size_r, size_c),
+                                      axis=(-2, -1))
+        windows = windows.reshape(x.shape[:-1] + (stop - start, k))
+        out[..., start:stop] = np.partition(windows, k // 2, axis=-1)[..., k // 2]
+    return out
@@ -0,0 +1,125 @@
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import numpy as np
+
+METER_FLOOR_DB = -60.0
+
+
+def chunk_levels(chunk):
+    """RMS and peak level of a chunk in dBFS (floored at ``METER_FLOOR_DB``)"""
+    if len(chunk) == 0:
+        return METER_FLOOR_DB, METER_FLOOR_DB
+    rms = np.sqrt(np.mean(np.square(chunk, dtype=np.float64)))
+    peak = np.max(np.abs(chunk))
+    to_db = lambda v: max(20 * np.log10(v + 1e-12), METER_FLOOR_DB)
+    return to_db(rms), to_db(peak)
+
+
+def meter_percent(level_db):
+    """Map a dBFS level to 0-100 for a QProgressBar meter"""
+    return int(round(100 * (level_db - METER_FLOOR_DB) / -METER_FLOOR_DB))
+
+
+class RollingSpectrogram:
+    """Incremental STFT over a stream of audio chunks.
+
+    Chunks of any size are pushed as they arrive; every complete hop yields a
+    new column (computed for all available frames in one FFT call) that is
+    written into a preallocated ring buffer of ``n_cols`` columns. Memory and
+    per-update cost are constant regardless of recording length.
+    """
+
+    def __init__(self, sr, n_fft=1024, hop_length=512, seconds=5.0, floor_db=-100.0):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.floor_db = floor_db
+        self.n_bins = n_fft // 2 + 1
+        self.n_cols = max(1, int(seconds * sr / hop_length))
+        self.window = np.hanning(n_fft).astype(np.float32)
+        # 0 dB corresponds to a full-scale sine
+        self._ref = np.sum(self.window) / 2
+        self._ring = np.full((self.n_bins, self.n_cols), floor_db, dtype=np.float32)
+        self._pos = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+
+    @property
+    def duration(self):
+        return self.n_cols * self.hop_length / self.sr
+
+    def push(self, chunk):
+        """Add samples and return the number of new spectrogram columns"""
+        self._pending = np.concatenate([self._pending, np.asarray(chunk, dtype=np.float32)])
+        if len(self._pending) < self.n_fft:
+            return 0
+        n_new = (len(self._pending) - self.n_fft) // self.hop_length + 1
+        frames = np.lib.stride_tricks.sliding_window_view(self._pending, self.n_fft)
+        frames = frames[::self.hop_length][:n_new]
+        # Only the newest n_cols columns can be shown
+        frames = frames[-self.n_cols:]
+        mag = np.abs(np.fft.rfft(frames * self.window, axis=1)) / self._ref
+        cols = np.maximum(20 * np.log10(mag + 1e-12), self.floor_db).T
+        idx = (self._pos + np.arange(cols.shape[1])) % self.n_cols
+        self._ring[:, idx] = cols
+        self._pos = (self._pos + cols.shape[1]) % self.n_cols
+        self._pending = self._pending[n_new * self.hop_length:]
+        return n_new
+
+    def image(self):
+        """Ring buffer contents in time order, oldest column first"""
+        return np.concatenate((self._ring[:, self._pos:], self._ring[:, :self._pos]), axis=1)
+
+    def reset(self):
+        self._ring.fill(self.floor_db)
+        self._pos = 0
+        self._pending = np.zeros(0, dtype=np.float32)
+
+
+class LiveSpectrogramView(FigureCanvas):
+    """Scrolling spectrogram drawn with blitting so redraw cost stays constant"""
+
+    def __init__(self, parent=None, sr=44100, n_fft=1024, hop_length=512, seconds=5.0):
+        self.fig = Figure(figsize=(5, 2))
+        super().__init__(self.fig)
+        self.setParent(parent)
+        self.ax = self.fig.add_subplot(111)
+        self.fig.subplots_adjust(top=0.95, bottom=0.22, left=0.14, right=0.98)
+        self._background = None
+        self.configure(sr, n_fft, hop_length, seconds)
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def configure(self, sr, n_fft=1024, hop_length=512, seconds=5.0):
+        """(Re)create the analysis for a stream at ``sr`` and clear the display"""
+        self.spectrogram = RollingSpectrogram(sr, n_fft, hop_length, seconds)
+        self.ax.clear()
+        self.image = self.ax.imshow(
+            self.spectrogram.image(), origin='lower', aspect='auto', cmap='viridis',
+            vmin=-90, vmax=0, animated=True, interpolation='nearest',
+            extent=(-self.spectrogram.duration, 0, 0, sr / 2000))
+        self.ax.set_xlabel("Time (s)", fontsize=8)
+        self.ax.set_ylabel("kHz", fontsize=8)
+        self.ax.tick_params(labelsize=7)
+        self._background = None
+        self.draw_idle()
+
+    def _on_draw(self, event):
+        # Any full redraw (first show, resize) invalidates the cached background
+        self._background = self.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.image)
+
+    def push(self, chunk):
+        return self.spectrogram.push(chunk)
+
+    def refresh(self):
+        """Blit the latest columns; falls back to a full draw until a background exists"""
+        self.image.set_data(self.spectrogram.image())
+        if self._background is None:
+            self.draw_idle()
+            return
+        self.restore_region(self._background)
+        self.ax.draw_artist(self.image)
+        self.blit(self.ax.bbox)
+
+    def reset(self):
+        self.spectrogram.reset()
+        self.refresh()
@@ -0,0 +1,108 @@
+"""Drive a running conversion_service instance and report latency/throughput.
+
+Uploads the reference once as a profile, then sends ``--requests`` conversions
+with ``--concurrency`` parallel clients. Without audio arguments a synthetic
+reference and TTS clip are generated.
+
+    python conversion_service.py --workers 4 &
+    python load_test.py --requests 40 --concurrency 8
+"""
+import argparse
+import io
+import json
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+from scipy.signal import lfilter
+
+
+def synthetic_wav(f0, seconds=2.0, sr=22050, seed=0):
+    """Pulse train through a couple of resonances, encoded as WAV bytes"""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    phase = np.cumsum(np.full(n, f0 / sr))
+    pulses = (np.diff(np.floor(phase), prepend=0) > 0).astype(float)
+    y = pulses
+    for freq, bw in ((700, 130), (1200, 70)):
+        r = np.exp(-np.pi * bw / sr)
+        y = lfilter([1.0], [1.0, -2 * r * np.cos(2 * np.pi * freq / sr), r * r], y)
+    y = y / np.max(np.abs(y)) * 0.5 + 0.005 * rng.standard_normal(n)
+    buf = io.BytesIO()
+    sf.write(buf, y.astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+def _post(url, data, content_type="audio/wav"):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(req) as resp:
+        return resp.read()
+
+
+def run_load_test(base_url, ref_bytes, tts_bytes, n_requests, concurrency, params):
+    profile_id = json.loads(_post(f"{base_url}/profiles", ref_bytes))["profile_id"]
+    query = "&".join(f"{k}={v}" for k, v in params.items())
+    url = f"{base_url}/convert?profile={profile_id}&{query}"
+
+    def one_request(_):
+        start = time.perf_counter()
+        try:
+            size = len(_post(url, tts_bytes))
+            return time.perf_counter() - start, size, None
+        except Exception as e:
+            return time.perf_counter() - start, 0, str(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_request, range(n_requests)))
+    wall = time.perf_counter() - start
+
+    latencies = np.array([r[0] for r in results if r[2] is None])
+    errors = [r[2] for r in results if r[2] is not None]
+    with urllib.request.urlopen(f"{base_url}/metrics") as resp:
+        server_metrics = json.loads(resp.read())
+    report = {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "wall_s": wall,
+        "throughput_rps": len(latencies) / wall if wall > 0 else 0.0,
+        "server": server_metrics,
+    }
+    if len(latencies):
+        report["latency_s"] = {
+            "p50": float(np.percentile(latencies, 50)),
+            "p95": float(np.percentile(latencies, 95)),
+            "max": float(latencies.max()),
+        }
+    if errors:
+        report["first_error"] = errors[0]
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for conversion_service.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--reference", default=None, help="Reference audio file (default: synthetic)")
+    parser.add_argument("--tts", default=None, help="TTS WAV file (default: synthetic)")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--lpc-order", type=int, default=16)
+    parser.add_argument("--frame-length", type=int, default=1024)
+    parser.add_argument("--hop-length", type=int, default=512)
+    args = parser.parse_args(argv)
+
+    ref_bytes = open(args.reference, "rb").read() if args.reference else synthetic_wav(120, seed=1)
+    tts_bytes = open(args.tts, "rb").read() if args.tts else synthetic_wav(180, seed=2)
+    params = {"lpc_order": args.lpc_order, "frame_length": args.frame_length,
+              "hop_length": args.hop_length}
+    report = run_load_test(args.url.rstrip("/"), ref_bytes, tts_bytes,
+                           args.requests, args.concurrency, params)
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import multiprocessing
 import sys
 from PyQt5.QtWidgets import QApplication, QMessageBox
 from main_window import VoiceConversionApp
@@ -21,4 +22,6 @@ def main():
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    # Frozen Windows builds re-run this module in spawned pitch-tracking workers
+    multiprocessing.freeze_support()
     main()
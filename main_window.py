@@ -5,26 +5,43 @@ from PyQt5.QtWidgets import (
     QLabel, QFileDialog, QProgressBar, QTextEdit, QGroupBox, QSpinBox,
     QMessageBox, QCheckBox, QComboBox,
 )
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtCore import QUrl, Qt
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
-import librosa
-import numpy as np
-from audio_utils import convert_to_pcm_wav, extract_lpc_env, N_FFT
+from audio_utils import load_audio
 from spectral_plot import SpectralPlot
-from audio_processor import AudioProcessor
+from audio_processor import AudioProcessor, StreamingProcessor
+from noise_profile import NoiseProfile
+from pipeline import ConversionPipeline
+from playback import NullOutput, PlaybackEngine, PyAudioOutput
+from plot_worker import PlotDataWorker
 from tts_dialog import TTSDialog
 from voice_recorder_dialog import VoiceRecorderDialog
 
 class VoiceConversionApp(QMainWindow):
+    # Held buffer attribute -> playback source name
+    PLAYBACK_SOURCES = {"ref_audio": "reference", "tts_audio": "original",
+                        "output_audio": "processed", "preview_audio": "preview"}
+
     def __init__(self):
         super().__init__()
-        self.ref_path = None
-        self.tts_path = None
-        self.temp_tts_path = None
-        self.output_path = None
+        # In-memory AudioBuffers; files are only written on export
+        self.ref_audio = None
+        self.tts_audio = None
+        self.output_audio = None
+        self.preview_audio = None
+        # Saved room noise used by the denoisers instead of the leading-silence guess
+        self.noise_profile = None
+        # Shared across runs so parameter tweaks only recompute affected stages
+        self.pipeline = ConversionPipeline()
+        # Per-view plot data for the current output, filled by PlotDataWorkers
+        self.plot_data = {}
+        self._plot_generation = 0
+        self._pending_plot_views = set()
+        self._plot_workers = []
         self.init_ui()
-        self.player = QMediaPlayer()
+        # Every buffer is also a playback source so A/B switches are instant
+        self.playback = PlaybackEngine()
+        self.audio_output = self._open_audio_output()
 
     def init_ui(self):
         self.setWindowTitle("LPC Residual Substitution Voice Conversion")
@@ -48,9 +65,13 @@ class VoiceConversionApp(QMainWindow):
         self.ref_btn.clicked.connect(self.load_reference_audio)
         self.record_ref_btn = QPushButton("Record Your Voice")
         self.record_ref_btn.clicked.connect(self.record_reference_audio)
+        self.keep_channels_cb = QCheckBox("Keep channels")
+        self.keep_channels_cb.setToolTip(
+            "Convert every channel of a stereo or multi-mic reference instead of a mono downmix")
         ref_layout.addWidget(self.ref_label)
         ref_layout.addWidget(self.ref_btn)
         ref_layout.addWidget(self.record_ref_btn)
+        ref_layout.addWidget(self.keep_channels_cb)
         file_layout.addLayout(ref_layout)
         
         # Noise reduction options
@@ -59,14 +80,24 @@ class VoiceConversionApp(QMainWindow):
         self.noise_reduction_cb.setChecked(True)
         self.noise_method_combo = QComboBox()
         self.noise_method_combo.addItem("Spectral Subtraction", "spectral_subtraction")
+        self.noise_method_combo.addItem("Wiener (decision-directed)", "wiener")
         self.noise_method_combo.addItem("Median Filter", "median_filter")
         self.denoise_btn = QPushButton("Apply Noise Reduction")
         self.denoise_btn.clicked.connect(self.apply_noise_reduction)
         self.denoise_btn.setEnabled(False)
+        self.noise_profile_label = QLabel("Noise: first 0.5 s")
+        self.capture_profile_btn = QPushButton("Capture Noise Profile...")
+        self.capture_profile_btn.setToolTip("Measure a room-tone recording and save it for reuse")
+        self.capture_profile_btn.clicked.connect(self.capture_noise_profile)
+        self.load_profile_btn = QPushButton("Load Noise Profile...")
+        self.load_profile_btn.clicked.connect(self.load_noise_profile)
         
         noise_reduction_layout.addWidget(self.noise_reduction_cb)
         noise_reduction_layout.addWidget(self.noise_method_combo)
         noise_reduction_layout.addWidget(self.denoise_btn)
+        noise_reduction_layout.addWidget(self.noise_profile_label)
+        noise_reduction_layout.addWidget(self.capture_profile_btn)
+        noise_reduction_layout.addWidget(self.load_profile_btn)
         file_layout.addLayout(noise_reduction_layout)
 
         tts_layout = QHBoxLayout()
@@ -108,12 +139,57 @@ class VoiceConversionApp(QMainWindow):
         lpc_order_layout.addWidget(self.lpc_spin)
         params_layout.addLayout(lpc_order_layout)
 
+        resample_layout = QVBoxLayout()
+        resample_layout.addWidget(QLabel("Resampler:"))
+        self.resample_combo = QComboBox()
+        self.resample_combo.addItem("High Quality (soxr)", "hq")
+        self.resample_combo.addItem("Polyphase (scipy)", "fast")
+        resample_layout.addWidget(self.resample_combo)
+        params_layout.addLayout(resample_layout)
+
+        precision_layout = QVBoxLayout()
+        precision_layout.addWidget(QLabel("Precision:"))
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItem("Double (float64)", "float64")
+        self.precision_combo.addItem("Single (float32)", "float32")
+        precision_layout.addWidget(self.precision_combo)
+        params_layout.addLayout(precision_layout)
+
+        engine_layout = QVBoxLayout()
+        engine_layout.addWidget(QLabel("Engine:"))
+        self.engine_combo = QComboBox()
+        self.engine_combo.addItem("Time domain (per frame)", "time")
+        self.engine_combo.addItem("Spectral (STFT)", "stft")
+        engine_layout.addWidget(self.engine_combo)
+        params_layout.addLayout(engine_layout)
+
+        silence_layout = QVBoxLayout()
+        self.vad_cb = QCheckBox("Skip silent frames")
+        self.trim_cb = QCheckBox("Trim leading/trailing silence")
+        silence_layout.addWidget(self.vad_cb)
+        silence_layout.addWidget(self.trim_cb)
+        params_layout.addLayout(silence_layout)
+
         layout.addWidget(params_group)
 
         controls_layout = QHBoxLayout()
-        self.process_btn = QPushButton("Process Audio")
+        self.preview_btn = QPushButton("Preview")
+        self.preview_btn.setToolTip("Quick 16 kHz render for judging settings; plays when done")
+        self.preview_btn.setEnabled(False)
+        self.preview_btn.clicked.connect(lambda: self.start_processing(preview=True))
+        controls_layout.addWidget(self.preview_btn)
+
+        controls_layout.addWidget(QLabel("First"))
+        self.preview_seconds_spin = QSpinBox()
+        self.preview_seconds_spin.setRange(0, 600)
+        self.preview_seconds_spin.setValue(10)
+        self.preview_seconds_spin.setSuffix(" s")
+        self.preview_seconds_spin.setSpecialValueText("All")
+        controls_layout.addWidget(self.preview_seconds_spin)
+
+        self.process_btn = QPushButton("Final Render")
         self.process_btn.setEnabled(False)
-        self.process_btn.clicked.connect(self.start_processing)
+        self.process_btn.clicked.connect(lambda: self.start_processing())
         controls_layout.addWidget(self.process_btn)
 
         self.progress_bar = QProgressBar()
@@ -167,6 +243,11 @@ class VoiceConversionApp(QMainWindow):
         self.stop_btn.clicked.connect(self.stop_audio)
         playback_layout.addWidget(self.stop_btn)
 
+        self.export_btn = QPushButton("Export Processed...")
+        self.export_btn.setEnabled(False)
+        self.export_btn.clicked.connect(self.export_processed)
+        playback_layout.addWidget(self.export_btn)
+
         layout.addWidget(playback_group)
 
         self.status_log = QTextEdit()
@@ -184,9 +265,14 @@ class VoiceConversionApp(QMainWindow):
             self, "Select Reference Speaker Audio", "", "Audio Files (*.wav *.mp3 *.flac)"
         )
         if path:
-            self.ref_path = path
+            try:
+                self._set_audio("ref_audio", load_audio(path, mono=not self.keep_channels_cb.isChecked()))
+            except Exception as e:
+                QMessageBox.critical(self, "Load Error", f"Failed to load reference audio:\n{e}")
+                return
             self.ref_label.setText(f"Reference: {os.path.basename(path)}")
-            self.log(f"Reference audio selected: {os.path.basename(path)}")
+            channels = f" ({self.ref_audio.channels} channels)" if self.ref_audio.channels > 1 else ""
+            self.log(f"Reference audio selected: {os.path.basename(path)}{channels}")
             self.play_ref_btn.setEnabled(True)
             self.denoise_btn.setEnabled(True)
             self.check_ready()
@@ -197,10 +283,10 @@ class VoiceConversionApp(QMainWindow):
         dialog.recording_complete.connect(self.handle_recording_completed)
         dialog.exec_()
         
-    def handle_recording_completed(self, recorded_path):
+    def handle_recording_completed(self, recorded_audio):
         """Handle when voice recording is successfully completed"""
-        if recorded_path and os.path.exists(recorded_path):
-            self.ref_path = recorded_path
+        if recorded_audio is not None:
+            self._set_audio("ref_audio", recorded_audio)
             self.ref_label.setText(f"Reference: Recorded Voice")
             self.log(f"Reference voice recorded and loaded")
             self.play_ref_btn.setEnabled(True)
@@ -217,27 +303,19 @@ class VoiceConversionApp(QMainWindow):
             self, "Select TTS Audio", "", "Audio Files (*.wav *.mp3 *.flac)"
         )
         if path:
-            self.log("Converting TTS audio to standard PCM WAV for compatibility...")
             try:
-                converted_path = convert_to_pcm_wav(path)
-                if self.temp_tts_path and os.path.exists(self.temp_tts_path):
-                    try:
-                        os.remove(self.temp_tts_path)
-                    except Exception:
-                        pass
-                self.temp_tts_path = converted_path
+                self._set_audio("tts_audio", load_audio(path))
             except Exception as e:
-                QMessageBox.critical(self, "Conversion Error", f"Failed to convert TTS audio:\n{e}")
+                QMessageBox.critical(self, "Load Error", f"Failed to load TTS audio:\n{e}")
                 return
-            self.tts_path = self.temp_tts_path
-            self.tts_label.setText(f"TTS: {os.path.basename(path)} (converted)")
-            self.log(f"TTS audio converted and loaded: {os.path.basename(path)}")
+            self.tts_label.setText(f"TTS: {os.path.basename(path)}")
+            self.log(f"TTS audio loaded: {os.path.basename(path)}")
             self.play_orig_btn.setEnabled(True)
             self.check_ready()
 
     def apply_noise_reduction(self):
         """Apply noise reduction to reference audio"""
-        if not self.ref_path or not os.path.exists(self.ref_path):
+        if self.ref_audio is None:
             return
             
         self.log("Applying noise reduction to reference audio...")
@@ -246,7 +324,6 @@ class VoiceConversionApp(QMainWindow):
             # Get selected method
             method = self.noise_method_combo.currentData()
             
-            # Create a temporary file for the denoised audio
             from audio_utils import reduce_noise
             
             # Apply noise reduction
@@ -255,15 +332,18 @@ class VoiceConversionApp(QMainWindow):
                 params = {'noise_factor': 1.5}  # Adjust based on testing
             elif method == "median_filter":
                 params = {'filter_size': 3}
+            if method in ("spectral_subtraction", "wiener") and self.noise_profile is not None:
+                params['noise_profile'] = self.noise_profile
                 
-            denoised_path = reduce_noise(
-                self.ref_path, 
+            denoised = reduce_noise(
+                self.ref_audio, 
                 method=method,
+                precision=self.precision_combo.currentData(),
                 **params
             )
             
-            # Update reference path
-            self.ref_path = denoised_path
+            # Update reference audio
+            self._set_audio("ref_audio", denoised)
             self.log(f"Noise reduction applied successfully using {method}")
             
             # Update UI
@@ -275,66 +355,205 @@ class VoiceConversionApp(QMainWindow):
         
         self.check_ready()
             
+    def capture_noise_profile(self):
+        """Measure a noise-only recording and save the profile for later sessions"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Room Tone Recording", "", "Audio Files (*.wav *.mp3 *.flac *.ogg)")
+        if not path:
+            return
+        save_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Noise Profile", "noise_profile.npz", "Noise Profiles (*.npz)")
+        if not save_path:
+            return
+        try:
+            profile = NoiseProfile.capture(load_audio(path), name=os.path.basename(path))
+            profile.save(save_path)
+        except Exception as e:
+            QMessageBox.critical(self, "Noise Profile Error", f"Failed to capture noise profile:\n{e}")
+            return
+        self._use_noise_profile(profile)
+        self.log(f"Noise profile captured from {os.path.basename(path)} and saved to {os.path.basename(save_path)}")
+
+    def load_noise_profile(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Noise Profile", "", "Noise Profiles (*.npz)")
+        if not path:
+            return
+        try:
+            profile = NoiseProfile.load(path)
+        except Exception as e:
+            QMessageBox.critical(self, "Noise Profile Error", f"Failed to load noise profile:\n{e}")
+            return
+        self._use_noise_profile(profile)
+        self.log(f"Noise profile loaded: {profile}")
+
+    def _use_noise_profile(self, profile):
+        self.noise_profile = profile
+        self.noise_profile_label.setText(f"Noise: {profile.name}")
+
     def check_ready(self):
-        if self.ref_path and self.tts_path:
+        if self.ref_audio is not None and self.tts_audio is not None:
             self.process_btn.setEnabled(True)
+            self.preview_btn.setEnabled(True)
             self.log("Ready to process audio.")
 
-    def start_processing(self):
-        self.log("Starting voice conversion processing...")
+    def start_processing(self, preview=False):
+        self.log("Rendering preview..." if preview else "Starting voice conversion processing...")
         self.stop_audio()
-        self.player.setMedia(QMediaContent())
         self.process_btn.setEnabled(False)
+        self.preview_btn.setEnabled(False)
         self.progress_bar.setValue(0)
         self.processor = AudioProcessor(
-            self.ref_path,
-            self.tts_path,
+            self.ref_audio,
+            self.tts_audio,
             self.lpc_spin.value(),
             self.frame_len_spin.value(),
             self.hop_len_spin.value(),
+            pipeline=self.pipeline,
+            preview=preview,
+            preview_seconds=self.preview_seconds_spin.value() or None,
         )
+        self._configure_pipeline()
         self.processor.progress.connect(self.progress_bar.setValue)
-        self.processor.finished.connect(self.finished_processing)
+        self.processor.finished.connect(self.finished_preview if preview else self.finished_processing)
         self.processor.error.connect(self.processing_error)
         self.processor.start()
 
-    def finished_processing(self, output_file):
-        self.output_path = output_file
-        self.log(f"Processing completed. Output saved to: {os.path.basename(output_file)}")
+    def _configure_pipeline(self):
+        self.pipeline.resample_quality = self.resample_combo.currentData()
+        self.pipeline.precision = self.precision_combo.currentData()
+        self.pipeline.engine = self.engine_combo.currentData()
+        self.pipeline.vad = self.vad_cb.isChecked()
+        self.pipeline.trim_silence = self.trim_cb.isChecked()
+        self.pipeline.reset_stats()
+
+    def start_streaming(self, text, rate, gender):
+        """Synthesize, convert and play ``text`` sentence by sentence"""
+        if self.ref_audio is None:
+            QMessageBox.warning(self, "No Reference", "Load or record a reference voice first.")
+            return
+        self.log("Streaming script through TTS and conversion...")
+        self.stop_audio()
+        self.process_btn.setEnabled(False)
+        self.preview_btn.setEnabled(False)
+        self.playback.remove_source("processed")
+        self._configure_pipeline()
+        self.processor = StreamingProcessor(
+            text, self.ref_audio, self.lpc_spin.value(), self.frame_len_spin.value(),
+            self.hop_len_spin.value(), pipeline=self.pipeline, rate=rate, gender=gender)
+        self.processor.chunk.connect(self.streamed_chunk)
+        self.processor.finished.connect(self.finished_streaming)
+        self.processor.error.connect(self.processing_error)
+        self.processor.start()
+
+    def streamed_chunk(self, samples, sr):
+        first = not self.playback.has_source("processed")
+        self.playback.extend_source("processed", samples, sr)
+        if first:
+            self.playback.play("processed")
+
+    def finished_streaming(self, tts_audio, output_audio, report):
+        self.playback.finish_source("processed")
+        self.log(f"Streamed {report['sentences']} sentences; first converted audio after "
+                 f"{report['time_to_first_audio']:.2f} s, all done after {report['total_seconds']:.2f} s")
+        self._set_audio("tts_audio", tts_audio)
+        self.tts_label.setText("TTS: Streamed script")
+        self.play_orig_btn.setEnabled(True)
+        self.finished_processing(output_audio)
+
+    def finished_preview(self, preview_audio):
+        self._set_audio("preview_audio", preview_audio)
+        self.log(f"Preview ready ({preview_audio.duration:.1f} s at {preview_audio.sr} Hz); "
+                 "use Final Render for the full-quality result.")
+        self.process_btn.setEnabled(True)
+        self.preview_btn.setEnabled(True)
+        self.play_audio("preview")
+
+    def finished_processing(self, output_audio):
+        self._set_audio("output_audio", output_audio)
+        self.log(f"Processing completed ({output_audio.duration:.1f} s of audio).")
+        reused = [name for name, counts in self.pipeline.stats.items() if counts["hits"] and not counts["misses"]]
+        if reused:
+            self.log(f"Reused cached stages: {', '.join(reused)}")
         self.process_btn.setEnabled(True)
+        self.preview_btn.setEnabled(True)
         self.play_proc_btn.setEnabled(True)
+        self.export_btn.setEnabled(True)
         
         # Enable graph switching buttons
         self.graph_envelopes_btn.setEnabled(True)
         self.graph_waveforms_btn.setEnabled(True)
         self.graph_spectrograms_btn.setEnabled(True)
         
-        try:
-            y_ref, sr = librosa.load(self.ref_path, sr=None)
-            y_tts, _ = librosa.load(self.tts_path, sr=sr)
-            y_proc, _ = librosa.load(self.output_path, sr=sr)
-            
-            # Store audio data in the plot canvas for switching between views
-            self.plot_canvas.store_audio_data(y_ref, y_tts, y_proc, sr)
-            
-            # Calculate and plot LPC envelopes (default view)
-            freq_grid = np.linspace(0, sr / 2, N_FFT // 2 + 1)
-            w_ref, env_ref = extract_lpc_env(y_ref, sr, self.lpc_spin.value())
-            w_tts, env_tts = extract_lpc_env(y_tts, sr, self.lpc_spin.value())
-            w_proc, env_proc = extract_lpc_env(y_proc, sr, self.lpc_spin.value())
-            freq_grid_ref = np.clip(freq_grid, w_ref.min(), w_ref.max())
-            freq_grid_tts = np.clip(freq_grid, w_tts.min(), w_tts.max())
-            freq_grid_proc = np.clip(freq_grid, w_proc.min(), w_proc.max())
-            env_ref_interp = np.interp(freq_grid_ref, w_ref, env_ref)
-            env_tts_interp = np.interp(freq_grid_tts, w_tts, env_tts)
-            env_proc_interp = np.interp(freq_grid_proc, w_proc, env_proc)
-            self.plot_canvas.plot_envelopes(freq_grid, env_ref_interp, env_tts_interp, env_proc_interp)
-        except Exception as e:
-            self.log(f"Plot update failed: {e}")
+        # Plot data for the new output is computed lazily, per view, in
+        # background workers; results from older runs are discarded
+        self._plot_generation += 1
+        self.plot_data = {}
+        self._pending_plot_views = set()
+        self.request_plot_view(self.plot_canvas.current_plot_type)
+
+    def request_plot_view(self, view):
+        """Show ``view``, starting a background worker if its data is not ready yet"""
+        if view in self.plot_data:
+            self.show_plot_view(view)
+            return
+        self.plot_canvas.show_message(f"Preparing {view}...")
+        if view in self._pending_plot_views:
+            return
+        cached = {}
+        if view == "waveforms":
+            cached = dict(self.plot_canvas.pyramid_cache)
+        elif view == "spectrograms":
+            cached = dict(self.plot_canvas.spec_cache)
+        worker = PlotDataWorker(
+            view, self.ref_audio, self.tts_audio, self.output_audio,
+            self.lpc_spin.value(), self.pipeline.resample_quality, cached, self)
+        generation = self._plot_generation
+        worker.finished.connect(lambda v, data, g=generation: self.plot_data_ready(g, v, data))
+        worker.error.connect(lambda v, err, g=generation: self.plot_data_failed(g, v, err))
+        self._pending_plot_views.add(view)
+        self._plot_workers.append(worker)
+        worker.start()
+
+    def plot_data_ready(self, generation, view, data):
+        self._plot_worker_done(generation, view)
+        if generation != self._plot_generation:
+            return
+        self.plot_data[view] = data
+        if view == self.plot_canvas.current_plot_type:
+            self.show_plot_view(view)
+
+    def plot_data_failed(self, generation, view, err):
+        self._plot_worker_done(generation, view)
+        if generation != self._plot_generation:
+            return
+        self.log(f"Plot update failed: {err}")
+        # Replace the "Preparing..." message; switching back to the view
+        # starts a new worker since it is no longer pending
+        if view == self.plot_canvas.current_plot_type:
+            self.plot_canvas.show_message(f"Could not prepare {view}:\n{err}")
+
+    def _plot_worker_done(self, generation, view):
+        self._plot_workers = [w for w in self._plot_workers if not w.isFinished()]
+        if generation == self._plot_generation:
+            self._pending_plot_views.discard(view)
+
+    def show_plot_view(self, view):
+        """Hand prepared data to the plot canvas and draw ``view``"""
+        data = self.plot_data[view]
+        y_ref, y_tts, y_proc = data["signals"]
+        self.plot_canvas.store_audio_data(y_ref, y_tts, y_proc, data["sr"], keys=data["keys"])
+        if view == "envelopes":
+            self.plot_canvas.plot_envelopes(data["freqs"], *data["envelopes"])
+            return
+        if view == "waveforms":
+            self.plot_canvas.add_pyramids(data["pyramids"])
+        elif view == "spectrograms":
+            self.plot_canvas.add_spectrograms(data["spectrograms"])
+        self.plot_canvas.switch_plot_type(view)
 
     def switch_graph(self, graph_type):
         """Switch between different graph types"""
-        if not hasattr(self, 'output_path') or not self.output_path:
+        if self.output_audio is None:
             return
             
         # Update button styles to show current selection
@@ -350,12 +569,14 @@ class VoiceConversionApp(QMainWindow):
             else:
                 btn.setStyleSheet("")
         
-        # Switch the plot type
-        self.plot_canvas.switch_plot_type(graph_type)
+        # Switch the plot type, preparing its data in the background on first use
+        self.plot_canvas.current_plot_type = graph_type
+        self.request_plot_view(graph_type)
         self.log(f"Switched to {graph_type} view")
 
     def processing_error(self, err):
         self.process_btn.setEnabled(True)
+        self.preview_btn.setEnabled(True)
         self.log(f"Processing failed: {err}")
         QMessageBox.critical(self, "Error", f"Voice conversion failed:\n{err}")
 
@@ -363,57 +584,83 @@ class VoiceConversionApp(QMainWindow):
         """Open dialog to create TTS audio from text input"""
         dialog = TTSDialog(self)
         dialog.tts_generated.connect(self.handle_tts_generated)
+        dialog.stream_requested.connect(self.start_streaming)
         dialog.exec_()
         
-    def handle_tts_generated(self, tts_path):
+    def handle_tts_generated(self, tts_audio):
         """Handle when TTS is successfully generated"""
-        if tts_path and os.path.exists(tts_path):
-            # Clean up previous temp file if exists
-            if self.temp_tts_path and os.path.exists(self.temp_tts_path):
-                try:
-                    os.remove(self.temp_tts_path)
-                except Exception:
-                    pass
-                    
-            # Set new TTS path
-            self.temp_tts_path = tts_path
-            self.tts_path = tts_path
+        if tts_audio is not None:
+            self._set_audio("tts_audio", tts_audio)
             self.tts_label.setText(f"TTS: Generated TTS Audio")
             self.log(f"TTS audio generated and loaded")
             self.play_orig_btn.setEnabled(True)
             self.check_ready()
             
+    def _open_audio_output(self):
+        """Start the output named by MIMIC_AUDIO_OUTPUT (qt, pyaudio or null)"""
+        kind = os.environ.get("MIMIC_AUDIO_OUTPUT", "qt").lower()
+        try:
+            if kind == "qt":
+                from qt_audio_output import QtAudioOutput
+                output = QtAudioOutput(self.playback, self)
+            elif kind == "pyaudio":
+                output = PyAudioOutput(self.playback)
+            else:
+                output = NullOutput(self.playback)
+            output.start()
+        except Exception as e:
+            self.log(f"Audio output '{kind}' unavailable ({e}); playback is silent")
+            output = NullOutput(self.playback)
+            output.start()
+        return output
+
     def play_audio(self, mode):
-        if mode == "reference" and self.ref_path:
-            self.player.setMedia(QMediaContent(QUrl.fromLocalFile(self.ref_path)))
-            self.log("Playing reference audio")
-        elif mode == "original" and self.tts_path:
-            self.player.setMedia(QMediaContent(QUrl.fromLocalFile(self.tts_path)))
-            self.log("Playing original TTS audio")
-        elif mode == "processed" and self.output_path:
-            self.player.setMedia(QMediaContent(QUrl.fromLocalFile(self.output_path)))
-            self.log("Playing converted audio")
-        else:
+        messages = {
+            "reference": "Playing reference audio",
+            "original": "Playing original TTS audio",
+            "processed": "Playing converted audio",
+            "preview": "Playing preview",
+        }
+        if mode not in messages or not self.playback.has_source(mode):
             return
-        self.player.play()
+        # Switching while playing keeps the playhead, so sources can be A/B compared
+        switching = self.playback.playing and self.playback.current != mode
+        self.playback.play(mode)
+        if switching:
+            self.log(f"{messages[mode]} from {self.playback.position:.2f} s")
+        else:
+            self.log(messages[mode])
 
     def stop_audio(self):
-        self.player.stop()
+        self.playback.stop()
         self.log("Playback stopped")
 
-    def closeEvent(self, event):
-        # Clean up temporary TTS file
-        if self.temp_tts_path and os.path.exists(self.temp_tts_path):
-            try:
-                os.remove(self.temp_tts_path)
-            except Exception:
-                pass
-                
-        # Clean up temporary recorded reference file if it's in a temp directory
-        if self.ref_path and os.path.exists(self.ref_path) and ("tmp" in self.ref_path.lower() or "temp" in self.ref_path.lower()):
+    def export_processed(self):
+        """Write the converted audio to a user-chosen WAV file"""
+        if self.output_audio is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export Processed Audio", "converted.wav", "WAV Files (*.wav)"
+        )
+        if path:
             try:
-                os.remove(self.ref_path)
-            except Exception:
-                pass
+                self.output_audio.export(path)
+                self.log(f"Processed audio exported to: {os.path.basename(path)}")
+            except Exception as e:
+                QMessageBox.critical(self, "Export Error", f"Failed to export audio:\n{e}")
+
+    def _set_audio(self, attr, audio):
+        """Replace one of the held AudioBuffers and its playback source"""
+        previous = getattr(self, attr)
+        if previous is not None and previous is not audio:
+            previous.release()
+        setattr(self, attr, audio)
+        self.playback.set_source(self.PLAYBACK_SOURCES[attr], audio)
+
+    def closeEvent(self, event):
+        self.audio_output.close()
+        for audio in (self.ref_audio, self.tts_audio, self.output_audio, self.preview_audio):
+            if audio is not None:
+                audio.release()
                 
         event.accept()
@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+
+def _nbytes(value):
+    """Approximate memory held by a cached stage result"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return 64
+
+
+class StageCache:
+    """Bounded LRU cache for intermediate stage results.
+
+    Entries are evicted least-recently-used first once the total size of the
+    cached arrays exceeds ``max_bytes``. Results larger than the whole budget
+    are returned to the caller but never stored. All operations are thread
+    safe.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        size = _nbytes(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
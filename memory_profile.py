@@ -0,0 +1,221 @@
+"""Opt-in memory accounting for conversion runs.
+
+A ``MemoryProfiler`` records, for every stage run while it is active, the
+process RSS before and after, the RSS high-water mark, the tracemalloc peak
+and the allocation sites that grew the most. Code that builds large
+intermediates reports them with ``record_array`` (a no-op when no profiler is
+active), so the summary also lists frame matrices, STFTs and similar arrays
+with their shape, dtype and size.
+
+Usage::
+
+    with MemoryProfiler() as profiler:
+        pipeline.run(ref, tts, 16, 1024, 512)
+    profiler.write_json("memory.json")
+
+Setting ``MIMIC_MEMORY_PROFILE=<path>`` in the environment makes
+``AudioProcessor`` profile every run and write the summary to that path.
+"""
+import json
+import os
+import platform
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+SUMMARY_VERSION = 1
+DEFAULT_TOP_SITES = 5
+
+_active = None
+_lock = threading.Lock()
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """Process RSS high-water mark in bytes, or None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def active_profiler():
+    return _active
+
+
+def record_array(name, array):
+    """Report an intermediate array to the active profiler, if any"""
+    profiler = _active
+    if profiler is not None:
+        profiler.record_array(name, array)
+
+
+@contextmanager
+def profile_stage(name):
+    """Profile a block as stage ``name`` when a profiler is active"""
+    profiler = _active
+    if profiler is None:
+        yield
+    else:
+        with profiler.stage(name):
+            yield
+
+
+class MemoryProfiler:
+    """Collects per-stage memory statistics while active (see module docstring).
+
+    Only one profiler can be active at a time because tracemalloc and RSS are
+    process-wide. Nested stages are recorded separately; a parent stage's
+    figures include its children.
+    """
+
+    def __init__(self, top_sites=DEFAULT_TOP_SITES, frames=1):
+        self.top_sites = top_sites
+        self.frames = frames
+        self.stages = []
+        self.arrays = []
+        self._stack = []
+        self._started_tracing = False
+        self._start_time = None
+
+    # --- Activation ---
+
+    def start(self):
+        global _active
+        with _lock:
+            if _active is not None:
+                raise RuntimeError("Another MemoryProfiler is already active")
+            _active = self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._start_time = time.perf_counter()
+        self.rss_start = current_rss()
+        return self
+
+    def stop(self):
+        global _active
+        self.rss_end = current_rss()
+        self.peak_rss = peak_rss()
+        self.seconds = time.perf_counter() - self._start_time
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        with _lock:
+            if _active is self:
+                _active = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    # --- Recording ---
+
+    @contextmanager
+    def stage(self, name):
+        """Record memory statistics for the enclosed block"""
+        before = tracemalloc.take_snapshot()
+        traced_before, outer_peak = tracemalloc.get_traced_memory()
+        rss_before = current_rss()
+        # The tracemalloc peak is process-wide: keep the enclosing stage's
+        # peak so far before resetting it for this one
+        if self._stack:
+            self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], outer_peak)
+        tracemalloc.reset_peak()
+        entry = {"stage": name, "depth": len(self._stack), "_peak": 0}
+        self._stack.append(entry)
+        self.stages.append(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            self._stack.pop()
+            traced_after, traced_peak = tracemalloc.get_traced_memory()
+            traced_peak = max(traced_peak, entry.pop("_peak"))
+            if self._stack:
+                self._stack[-1]["_peak"] = max(self._stack[-1]["_peak"], traced_peak)
+            after = tracemalloc.take_snapshot()
+            entry.update({
+                "seconds": time.perf_counter() - start,
+                "rss_before": rss_before,
+                "rss_after": current_rss(),
+                "peak_rss": peak_rss(),
+                "traced_retained": traced_after - traced_before,
+                "traced_peak": traced_peak - traced_before,
+                "top_sites": self._top_sites(before, after),
+            })
+
+    def _top_sites(self, before, after):
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__)]
+        diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        sites = []
+        for stat in sorted(diff, key=lambda s: s.size_diff, reverse=True)[:self.top_sites]:
+            if stat.size_diff <= 0:
+                break
+            frame = stat.traceback[0]
+            sites.append({"file": os.path.basename(frame.filename), "line": frame.lineno,
+                          "size": stat.size_diff, "count": stat.count_diff})
+        return sites
+
+    def record_array(self, name, array):
+        array = np.asarray(array)
+        self.arrays.append({
+            "name": name,
+            "stage": self._stack[-1]["stage"] if self._stack else None,
+            "shape": list(array.shape),
+            "dtype": str(array.dtype),
+            "nbytes": int(array.nbytes),
+        })
+
+    # --- Reporting ---
+
+    def summary(self):
+        """Machine-readable summary (JSON-serializable dict)"""
+        return {
+            "version": SUMMARY_VERSION,
+            "seconds": getattr(self, "seconds", None),
+            "rss_start": getattr(self, "rss_start", None),
+            "rss_end": getattr(self, "rss_end", None),
+            "peak_rss": self.peak_rss if hasattr(self, "peak_rss") else peak_rss(),
+            "stages": self.stages,
+            "arrays": self.arrays,
+        }
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def format_table(self):
+        mb = lambda v: f"{v / 2**20:.1f}" if v is not None else "-"
+        lines = [f"{'stage':<40}{'seconds':>9}{'peak MB':>10}{'kept MB':>10}{'RSS MB':>10}"]
+        for entry in self.stages:
+            name = "  " * entry["depth"] + entry["stage"]
+            lines.append(f"{name:<40}{entry['seconds']:>9.3f}{mb(entry['traced_peak']):>10}"
+                         f"{mb(entry['traced_retained']):>10}{mb(entry['rss_after']):>10}")
+        if self.arrays:
+            lines.append("")
+            lines.append(f"{'array':<40}{'shape':>20}{'dtype':>10}{'MB':>10}")
+            for arr in sorted(self.arrays, key=lambda a: a["nbytes"], reverse=True):
+                lines.append(f"{arr['name']:<40}{str(tuple(arr['shape'])):>20}"
+                             f"{arr['dtype']:>10}{mb(arr['nbytes']):>10}")
+        return "\n".join(lines)
@@ -0,0 +1,153 @@
+"""Objective quality metrics for converted speech.
+
+Every metric works on whole frame matrices at once: frame-level inputs are
+shaped ``(..., n_frames, n_features)`` and signals ``(..., n_samples)``, and
+any leading axes are treated as a batch. The result has one value per batch
+item (a scalar for unbatched input). Mismatched lengths are truncated to the
+shorter input, matching how ``AudioProcessor`` pairs reference and TTS frames.
+"""
+import numpy as np
+import librosa
+
+_EPS = 1e-12
+# The usual MCD scaling is 10 / ln(10) * sqrt(2) on natural-log cepstra. The
+# cepstra from ``mel_cepstrum`` are already in dB (the DCT of a dB mel
+# spectrum), which carries the 10 / ln(10) factor, so only sqrt(2) remains
+_MCD_CONST = np.sqrt(2.0)
+
+
+def _align(a, b, axis):
+    """Truncate two arrays to a common length along ``axis``"""
+    n = min(a.shape[axis], b.shape[axis])
+    index = [slice(None)] * a.ndim
+    index[axis] = slice(0, n)
+    a = a[tuple(index)]
+    index = [slice(None)] * b.ndim
+    index[axis] = slice(0, n)
+    return a, b[tuple(index)]
+
+
+def mel_cepstral_distortion(cep_ref, cep_test, exclude_c0=True):
+    """Mean mel-cepstral distortion in dB between two cepstrum matrices.
+
+    Parameters
+    ----------
+    cep_ref, cep_test : numpy.ndarray [shape=(..., n_frames, n_coeffs)]
+        dB-scaled mel cepstra (see ``mel_cepstrum``), one row per frame
+    exclude_c0 : bool
+        Drop the energy coefficient before comparing
+
+    Returns
+    -------
+    mcd : float or numpy.ndarray
+        Mean MCD over frames for each batch item
+    """
+    cep_ref, cep_test = _align(np.asarray(cep_ref), np.asarray(cep_test), -2)
+    if exclude_c0:
+        cep_ref, cep_test = cep_ref[..., 1:], cep_test[..., 1:]
+    per_frame = _MCD_CONST * np.sqrt(np.sum((cep_ref - cep_test) ** 2, axis=-1))
+    return np.mean(per_frame, axis=-1)
+
+
+def log_spectral_distance(mag_ref, mag_test):
+    """Mean log-spectral distance in dB between magnitude spectra.
+
+    Parameters
+    ----------
+    mag_ref, mag_test : numpy.ndarray [shape=(..., n_frames, n_bins) or (n_bins,)]
+        Magnitude spectra or envelopes, one row per frame. A 1-D input is a
+        single spectrum (e.g. the mean envelope from ``extract_lpc_env``).
+
+    Returns
+    -------
+    lsd : float or numpy.ndarray
+        RMS dB difference per frame, averaged over frames
+    """
+    mag_ref, mag_test = np.asarray(mag_ref), np.asarray(mag_test)
+    if mag_ref.ndim > 1:
+        mag_ref, mag_test = _align(mag_ref, mag_test, -2)
+    diff = 20 * np.log10(mag_ref + _EPS) - 20 * np.log10(mag_test + _EPS)
+    per_frame = np.sqrt(np.mean(diff**2, axis=-1))
+    return per_frame if per_frame.ndim == 0 else np.mean(per_frame, axis=-1)
+
+
+def f0_rmse(f0_ref, f0_test, cents=False):
+    """RMS pitch error over frames voiced in both tracks.
+
+    Unvoiced frames are NaN (or non-positive), as returned by ``librosa.pyin``.
+    With ``cents=True`` the error is measured in cents instead of Hz. Items
+    with no jointly voiced frames return NaN.
+    """
+    f0_ref, f0_test = _align(np.asarray(f0_ref, dtype=float), np.asarray(f0_test, dtype=float), -1)
+    both = _voiced(f0_ref) & _voiced(f0_test)
+    if cents:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            diff = 1200 * np.log2(f0_test / f0_ref)
+    else:
+        diff = f0_test - f0_ref
+    sq = np.where(both, diff, 0.0) ** 2
+    count = np.sum(both, axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.sqrt(np.sum(sq, axis=-1) / count)
+
+
+def voicing_error(f0_ref, f0_test):
+    """Fraction of frames whose voiced/unvoiced decision differs"""
+    f0_ref, f0_test = _align(np.asarray(f0_ref, dtype=float), np.asarray(f0_test, dtype=float), -1)
+    return np.mean(_voiced(f0_ref) != _voiced(f0_test), axis=-1)
+
+
+def _voiced(f0):
+    return np.isfinite(f0) & (f0 > 0)
+
+
+def segmental_snr(y_ref, y_test, frame_length=1024, hop_length=512, min_db=-10.0, max_db=35.0):
+    """Segmental SNR in dB, with per-frame values clamped to ``[min_db, max_db]``.
+
+    Parameters
+    ----------
+    y_ref, y_test : numpy.ndarray [shape=(..., n_samples)]
+        Clean reference and test signals, time aligned
+    """
+    y_ref, y_test = _align(np.asarray(y_ref), np.asarray(y_test), -1)
+    frames_ref = librosa.util.frame(y_ref, frame_length=frame_length, hop_length=hop_length, axis=-1)
+    frames_err = librosa.util.frame(y_ref - y_test, frame_length=frame_length, hop_length=hop_length, axis=-1)
+    # librosa frames along a new last axis: (..., frame_length, n_frames)
+    signal = np.sum(frames_ref**2, axis=-2)
+    noise = np.sum(frames_err**2, axis=-2)
+    snr = 10 * np.log10((signal + _EPS) / (noise + _EPS))
+    return np.mean(np.clip(snr, min_db, max_db), axis=-1)
+
+
+def mel_cepstrum(y, sr, n_mfcc=25, n_fft=1024, hop_length=256):
+    """dB-scaled mel cepstrum matrix shaped ``(..., n_frames, n_mfcc)`` for MCD"""
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc, n_fft=n_fft, hop_length=hop_length)
+    return np.swapaxes(mfcc, -1, -2)
+
+
+def magnitude_frames(y, n_fft=1024, hop_length=256):
+    """STFT magnitude matrix shaped ``(..., n_frames, n_bins)`` for LSD"""
+    return np.swapaxes(np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length)), -1, -2)
+
+
+def compare_signals(y_ref, y_test, sr, n_fft=1024, hop_length=256):
+    """Compute all metrics between two signals sampled at ``sr``.
+
+    Returns a dict with ``mcd_db``, ``lsd_db``, ``f0_rmse_cents``,
+    ``voicing_error`` and ``segsnr_db``.
+    """
+    f0_kwargs = dict(fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+                     sr=sr, frame_length=n_fft, hop_length=hop_length)
+    f0_ref, _, _ = librosa.pyin(y_ref, **f0_kwargs)
+    f0_test, _, _ = librosa.pyin(y_test, **f0_kwargs)
+    return {
+        "mcd_db": float(mel_cepstral_distortion(
+            mel_cepstrum(y_ref, sr, n_fft=n_fft, hop_length=hop_length),
+            mel_cepstrum(y_test, sr, n_fft=n_fft, hop_length=hop_length))),
+        "lsd_db": float(log_spectral_distance(
+            magnitude_frames(y_ref, n_fft, hop_length),
+            magnitude_frames(y_test, n_fft, hop_length))),
+        "f0_rmse_cents": float(f0_rmse(f0_ref, f0_test, cents=True)),
+        "voicing_error": float(voicing_error(f0_ref, f0_test)),
+        "segsnr_db": float(segmental_snr(y_ref, y_test, n_fft, hop_length)),
+    }
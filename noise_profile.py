@@ -0,0 +1,111 @@
+"""Noise spectra captured once and reused by the STFT denoisers.
+
+A ``NoiseProfile`` holds the mean magnitude and mean power of a noise-only
+stretch of audio per STFT bin, with the sample rate and FFT size they were
+measured at. References recorded in the same room on the same microphone
+share their noise, so a profile captured from one take (or from a
+recording of the room tone) can be saved and applied to all of them
+instead of assuming every file starts with half a second of silence.
+
+Example::
+
+    python noise_profile.py room_tone.wav booth.npz
+    python noise_profile.py take1.wav booth.npz --seconds 0.5
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import librosa
+from audio_buffer import AudioBuffer
+
+PROFILE_VERSION = 1
+DEFAULT_N_FFT = 2048
+DEFAULT_HOP = 512
+# What the denoisers assume is noise when no profile is given
+LEADING_NOISE_SECONDS = 0.5
+
+
+class NoiseProfile:
+    """Per-bin noise magnitude and power at ``sr`` for an ``n_fft``-point STFT"""
+
+    def __init__(self, magnitude, power, sr, n_fft, name="noise"):
+        self.magnitude = np.asarray(magnitude, dtype=np.float64)
+        self.power = np.asarray(power, dtype=np.float64)
+        self.sr = int(sr)
+        self.n_fft = int(n_fft)
+        self.name = name
+
+    def __repr__(self):
+        return f"NoiseProfile({self.name}, {self.sr} Hz, n_fft={self.n_fft})"
+
+    @classmethod
+    def from_spectrogram(cls, mag, sr, n_fft, name="noise"):
+        """Profile from a magnitude spectrogram of noise, shaped ``(bins, frames)``"""
+        return cls(mag.mean(axis=1), np.square(mag).mean(axis=1), sr, n_fft, name)
+
+    @classmethod
+    def capture(cls, audio, seconds=None, n_fft=DEFAULT_N_FFT, hop_length=DEFAULT_HOP, name=None):
+        """Profile of an AudioBuffer: its first ``seconds``, or all of it for a room-tone recording.
+
+        The frames of all channels of a multi-channel buffer are pooled.
+        """
+        y = audio.samples
+        if seconds is not None:
+            y = y[..., :int(seconds * audio.sr)]
+        mag = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+        if mag.ndim > 2:
+            mag = np.concatenate(mag.reshape((-1,) + mag.shape[-2:]), axis=-1)
+        name = name or (audio.provenance[0] if audio.provenance else "noise")
+        return cls.from_spectrogram(mag, audio.sr, n_fft, name=name)
+
+    def for_stft(self, sr, n_fft):
+        """``(magnitude, power)`` column vectors on the bins of an ``n_fft``-point STFT at ``sr``.
+
+        Profiles measured on another grid are interpolated by frequency;
+        bins above the profile's Nyquist reuse its top bin.
+        """
+        if sr == self.sr and n_fft == self.n_fft:
+            return self.magnitude[:, None], self.power[:, None]
+        src = np.linspace(0, self.sr / 2, self.n_fft // 2 + 1)
+        dst = np.linspace(0, sr / 2, n_fft // 2 + 1)
+        # For the same noise, per-bin power grows with the window length and
+        # with the sample rate (the noise density per sample)
+        scale = (n_fft * sr) / (self.n_fft * self.sr)
+        mag = np.interp(dst, src, self.magnitude) * np.sqrt(scale)
+        power = np.interp(dst, src, self.power) * scale
+        return mag[:, None], power[:, None]
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, version=PROFILE_VERSION, magnitude=self.magnitude, power=self.power,
+                 sr=self.sr, n_fft=self.n_fft, name=self.name)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != PROFILE_VERSION:
+                raise ValueError(f"Unsupported noise profile version in {path}")
+            return cls(data["magnitude"], data["power"], int(data["sr"]), int(data["n_fft"]),
+                       str(data["name"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Capture a noise profile from an audio file")
+    parser.add_argument("audio", help="Room tone recording, or a take that starts with silence")
+    parser.add_argument("output", help="Profile file to write (.npz)")
+    parser.add_argument("--seconds", type=float, default=None,
+                        help="Only use the first SECONDS (default: the whole file)")
+    parser.add_argument("--n-fft", type=int, default=DEFAULT_N_FFT)
+    args = parser.parse_args(argv)
+
+    profile = NoiseProfile.capture(AudioBuffer.from_file(args.audio), args.seconds, args.n_fft)
+    profile.save(args.output)
+    level = 10 * np.log10(np.mean(profile.power) + 1e-20)
+    print(f"{profile}: mean bin power {level:.1f} dB, written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Headless parameter sweep for the LPC voice conversion.
+
+Evaluates a grid of ``lpc_order`` / ``frame_length`` / ``hop_length`` values
+in parallel and ranks the outputs by log-spectral distance between their LPC
+envelope and the reference envelope. Grid points sharing a frame/hop pair run
+in the same worker so decoding, framing and both pyin passes are computed once
+and reused for every LPC order through ``ConversionPipeline``'s stage cache.
+
+Example::
+
+    python param_sweep.py ref.wav tts.wav --lpc-order 12 16 20 \\
+        --frame-length 512 1024 --hop-length 256 512 --csv sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import soundfile as sf
+from audio_io import read_audio
+from audio_utils import extract_lpc_env
+from metrics import log_spectral_distance
+from pipeline import ConversionPipeline
+
+SCORE_LPC_ORDER = 16
+TABLE_COLUMNS = ["rank", "lpc_order", "frame_length", "hop_length", "lsd_db", "seconds", "output_path"]
+
+
+def _run_group(ref_path, tts_path, frame_length, hop_length, lpc_orders, ref_env,
+               score_order, output_dir):
+    """Convert every LPC order for one frame/hop pair, sharing the analysis stages"""
+    # Each sweep worker is already its own process: keep the pipeline serial
+    # so the grid does not fan out into nested pools
+    pipeline = ConversionPipeline(workers=1)
+    rows = []
+    for lpc_order in lpc_orders:
+        row = {"lpc_order": lpc_order, "frame_length": frame_length,
+               "hop_length": hop_length, "output_path": ""}
+        start = time.perf_counter()
+        try:
+            y_out, sr = pipeline.run(ref_path, tts_path, lpc_order, frame_length, hop_length)
+            _, env_out = extract_lpc_env(y_out, sr, score_order)
+            row["lsd_db"] = float(log_spectral_distance(ref_env, env_out))
+            if not math.isfinite(row["lsd_db"]):
+                raise ValueError(f"non-finite LSD ({row['lsd_db']})")
+            if output_dir:
+                name = f"sweep_o{lpc_order}_f{frame_length}_h{hop_length}.wav"
+                row["output_path"] = os.path.join(output_dir, name)
+                sf.write(row["output_path"], y_out, sr, subtype="PCM_16")
+        except Exception as e:
+            row["lsd_db"] = float("inf")
+            row["error"] = str(e)
+        row["seconds"] = time.perf_counter() - start
+        rows.append(row)
+    return rows
+
+
+def run_sweep(ref_path, tts_path, lpc_orders, frame_lengths, hop_lengths,
+              workers=None, output_dir=None, score_order=SCORE_LPC_ORDER):
+    """Evaluate the parameter grid and return rows ranked best (lowest LSD) first.
+
+    Combinations with ``hop_length > frame_length`` are skipped.
+    """
+    y_ref, sr = read_audio(ref_path)
+    _, ref_env = extract_lpc_env(y_ref, sr, score_order)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    groups = [(f, h) for f, h in itertools.product(frame_lengths, hop_lengths) if h <= f]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_group, ref_path, tts_path, f, h, list(lpc_orders),
+                        ref_env, score_order, output_dir)
+            for f, h in groups
+        ]
+        for future in as_completed(futures):
+            rows.extend(future.result())
+
+    # Failed rows score inf; NaN would leave the order undefined
+    rows.sort(key=lambda r: r["lsd_db"] if math.isfinite(r["lsd_db"]) else math.inf)
+    for rank, row in enumerate(rows, start=1):
+        row["rank"] = rank
+    return rows
+
+
+def format_table(rows):
+    """Render ranked sweep rows as a fixed-width text table"""
+    lines = [f"{'rank':>4} {'order':>5} {'frame':>6} {'hop':>5} {'LSD (dB)':>9} {'time (s)':>8}"]
+    for row in rows:
+        score = "failed" if "error" in row else f"{row['lsd_db']:.3f}"
+        lines.append(f"{row['rank']:>4} {row['lpc_order']:>5} {row['frame_length']:>6} "
+                     f"{row['hop_length']:>5} {score:>9} {row['seconds']:>8.2f}")
+    return "\n".join(lines)
+
+
+def write_csv(rows, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TABLE_COLUMNS + ["error"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep LPC conversion parameters and rank the results")
+    parser.add_argument("reference", help="Reference speaker audio")
+    parser.add_argument("tts", help="TTS audio to convert")
+    parser.add_argument("--lpc-order", type=int, nargs="+", default=[12, 16, 20])
+    parser.add_argument("--frame-length", type=int, nargs="+", default=[1024])
+    parser.add_argument("--hop-length", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output-dir", default=None, help="Also write each converted file here")
+    parser.add_argument("--csv", default=None, help="Write the ranked table to this CSV file")
+    args = parser.parse_args(argv)
+
+    rows = run_sweep(args.reference, args.tts, args.lpc_order, args.frame_length,
+                     args.hop_length, workers=args.workers, output_dir=args.output_dir)
+    print(format_table(rows))
+    if args.csv:
+        write_csv(rows, args.csv)
+    return 0 if rows and "error" not in rows[0] and math.isfinite(rows[0]["lsd_db"]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
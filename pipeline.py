@@ -0,0 +1,569 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import librosa
+from audio_buffer import AudioBuffer
+from audio_io import cached_resample, file_key, read_audio
+from audio_utils import (PRECISIONS, istft_frames, load_audio, lpc_color, lpc_whiten,
+                         overlap_add, scale_frequency_frames, spectral_energy, stft_frames)
+from kernels import allpole_filter_frames, allzero_filter_frames, lpc_autocorrelation
+from memo_cache import DEFAULT_CACHE_BYTES, StageCache
+from memory_profile import active_profiler, profile_stage, record_array
+from task_graph import TaskGraph
+from vad import VAD_THRESHOLD_DB, active_runs, detect_activity, trim_bounds
+
+# Stage name -> conversion parameters the stage depends on directly.
+# A stage's cache key is built from these parameters plus the keys of the
+# stages feeding it, so changing a parameter only invalidates the stages
+# downstream of the first stage that uses it.
+STAGE_PARAMS = OrderedDict([
+    ("decode", ()),
+    ("resample", ()),
+    ("frame", ("frame_length", "hop_length")),
+    ("vad", ("frame_length", "hop_length")),
+    ("pitch", ("frame_length", "hop_length")),
+    ("lpc", ("frame_length", "hop_length", "lpc_order")),
+    ("resynthesis", ("frame_length", "hop_length", "lpc_order")),
+    ("normalize", ()),
+])
+
+# "time": per-frame residual filtering, librosa pitch shifting and overlap-add.
+# "stft": the same envelope swap done on one batched STFT (see spectral_resynthesis).
+ENGINES = ("time", "stft")
+
+PREVIEW_SR = 16000
+MIN_PREVIEW_LPC_ORDER = 8
+# pyin's Viterbi cost grows with the square of its pitch bin count, so a
+# coarser grid (in semitones) makes previews several times faster
+PITCH_RESOLUTION = 0.1
+PREVIEW_PITCH_RESOLUTION = 0.5
+
+# Frames of audio pyin sees on each side of an active region when VAD is on
+PITCH_CONTEXT_FRAMES = 8
+
+# Concurrent analysis branches; a single core gains nothing from them
+DEFAULT_WORKERS = min(2, os.cpu_count() or 1)
+
+_pitch_pools = {}
+_pitch_pools_lock = threading.Lock()
+
+
+def track_pitch(y, sr, frame_length, hop_length, resolution=PITCH_RESOLUTION):
+    """pyin f0 track of ``y`` (NaN where unvoiced)"""
+    f0, _, _ = librosa.pyin(
+        y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+        sr=sr, frame_length=frame_length, hop_length=hop_length, resolution=resolution)
+    return f0
+
+
+def pitch_pool(workers):
+    """Process pool for ``track_pitch``, shared by every pipeline in this process.
+
+    pyin's Viterbi pass holds the GIL, so concurrent pitch tracks need
+    processes rather than threads. Workers are spawned (not forked) so the
+    pool is safe to start from a process that already runs threads.
+    """
+    with _pitch_pools_lock:
+        pool = _pitch_pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pitch_pools[workers] = pool
+        return pool
+
+
+def discard_pitch_pool(workers, pool):
+    """Drop a broken ``pool`` so the next ``pitch_pool(workers)`` starts afresh"""
+    with _pitch_pools_lock:
+        if _pitch_pools.get(workers) is pool:
+            del _pitch_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def preview_params(sr, lpc_order, frame_length, hop_length, preview_sr=PREVIEW_SR):
+    """Scale ``(lpc_order, frame_length, hop_length)`` from ``sr`` to ``preview_sr``.
+
+    Frame and hop keep their duration in seconds (frames are rounded to an
+    even length) and the LPC order shrinks with the bandwidth, since roughly
+    one resonance pair per kHz needs modelling.
+    """
+    scale = preview_sr / sr
+    frame = max(2 * int(round(frame_length * scale / 2)), 64)
+    hop = min(max(int(round(hop_length * scale)), 16), frame)
+    order = min(max(int(round(lpc_order * scale)), MIN_PREVIEW_LPC_ORDER), lpc_order)
+    return order, frame, hop
+
+
+class ConversionPipeline:
+    """LPC residual substitution split into memoized stages.
+
+    The stages are decode, resample, frame, VAD, pitch, LPC, resynthesis and
+    normalize (see ``STAGE_PARAMS``). Keeping one pipeline alive between runs
+    means a re-run only recomputes the stages whose inputs changed: a new
+    ``lpc_order`` reuses the decoded audio, the frame matrices and both pyin
+    pitch tracks.
+
+    ``precision`` selects the floating point type from framing onwards:
+    "float64" matches the original implementation, "float32" keeps the
+    frames, LPC coefficients, filtering and overlap-add in single precision
+    and halves the memory of every intermediate matrix.
+
+    With ``vad`` enabled, frames the energy/zero-crossing detector in ``vad``
+    marks as silent skip the expensive work: pyin only runs over the active
+    regions of each signal, and output frames where the reference is silent
+    are left at zero instead of being fitted, filtered and pitch shifted.
+    ``trim_silence`` additionally cuts the leading and trailing silence of
+    the reference from the output.
+
+    ``engine`` selects the resynthesis stage, see ``ENGINES``.
+
+    Audio with several channels (``AudioBuffer`` samples shaped ``(channels,
+    n)``, or files decoded with ``mono=False``) is converted channel by
+    channel in the same pass: the channels are a leading batch axis of the
+    frame matrices ``(channels, n_frames, frame_length)``, LPC coefficients,
+    pitch tracks and spectra, so every stage runs once for all of them. The
+    output has the larger channel count of the two inputs: a mono TTS drives
+    every reference channel and a mono reference is applied to every TTS
+    channel. Any other channel mismatch raises ``ValueError``. VAD marks a
+    frame active when any channel is.
+
+    With ``workers`` > 1 the reference and TTS analysis branches (see
+    ``analysis_graph``) run concurrently on a thread pool and pyin runs in
+    a shared process pool (``pitch_pool``), so the analysis takes about as
+    long as its slower branch. Pass ``workers=1`` where the caller already
+    runs conversions in parallel processes.
+    """
+
+    def __init__(self, cache_bytes=DEFAULT_CACHE_BYTES, resample_quality="hq", lpc_method="burg",
+                 precision="float64", vad=False, vad_threshold_db=VAD_THRESHOLD_DB,
+                 trim_silence=False, engine="time", workers=DEFAULT_WORKERS, mono=True):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown conversion engine: {engine}")
+        self.cache = StageCache(cache_bytes)
+        self.resample_quality = resample_quality
+        # "burg" (librosa.lpc) or "autocorrelation" (batched Levinson in kernels)
+        self.lpc_method = lpc_method
+        self.precision = precision
+        self.vad = vad
+        self.vad_threshold_db = vad_threshold_db
+        self.trim_silence = trim_silence
+        self.engine = engine
+        self.workers = workers
+        # Whether file paths are downmixed when decoded (buffers keep their channels)
+        self.mono = mono
+        self._threads = None
+        self.stats = {name: {"hits": 0, "misses": 0, "seconds": 0.0} for name in STAGE_PARAMS}
+        self._stats_lock = threading.Lock()
+
+    def _stage(self, name, key, compute):
+        key = (name,) + tuple(key)
+        value = self.cache.get(key)
+        if value is None:
+            start = time.perf_counter()
+            with profile_stage(name):
+                value = compute()
+            elapsed = time.perf_counter() - start
+            self.cache.put(key, value)
+            with self._stats_lock:
+                self.stats[name]["misses"] += 1
+                self.stats[name]["seconds"] += elapsed
+        else:
+            with self._stats_lock:
+                self.stats[name]["hits"] += 1
+        return key, value
+
+    def clone(self, cache_bytes=DEFAULT_CACHE_BYTES):
+        """A pipeline with the same settings and a stage cache of its own"""
+        return ConversionPipeline(
+            cache_bytes, self.resample_quality, self.lpc_method, self.precision, self.vad,
+            self.vad_threshold_db, self.trim_silence, self.engine, self.workers, self.mono)
+
+    def reset_stats(self):
+        for counts in self.stats.values():
+            counts["hits"] = counts["misses"] = 0
+            counts["seconds"] = 0.0
+
+    # --- Stages ---
+
+    def decode(self, source):
+        # In-memory buffers are already decoded; only their key is needed
+        if isinstance(source, AudioBuffer):
+            return self._stage("decode", (source.key,), lambda: (source.samples, source.sr))
+        mono = self.mono
+        return self._stage("decode", (file_key(source, mono),), lambda: read_audio(source, mono=mono))
+
+    def resample(self, decoded, target_sr):
+        dec_key, (y, sr) = decoded
+        # dec_key[1] is the source's content key, shared with AudioBuffer.resample
+        return self._stage(
+            "resample", (dec_key, target_sr, self.resample_quality),
+            lambda: cached_resample(dec_key[1], y, sr, target_sr, self.resample_quality))
+
+    def frame(self, signal, frame_length, hop_length):
+        sig_key, y = signal
+        precision = self.precision
+
+        def compute():
+            dtype = PRECISIONS[precision]
+            frames = np.swapaxes(
+                librosa.util.frame(y, frame_length=frame_length, hop_length=hop_length), -1, -2)
+            wframes = frames.astype(dtype) * np.hamming(frame_length).astype(dtype)
+            record_array("frames", wframes)
+            return wframes
+
+        return self._stage("frame", (sig_key, frame_length, hop_length, precision), compute)
+
+    def activity(self, frames):
+        frames_key, wframes = frames
+        threshold_db = self.vad_threshold_db
+        return self._stage(
+            "vad", (frames_key, threshold_db),
+            lambda: detect_activity(wframes, threshold_db=threshold_db))
+
+    def pitch(self, signal, sr, frame_length, hop_length, activity=None,
+              resolution=PITCH_RESOLUTION):
+        sig_key, y = signal
+        act_key, active = activity if activity is not None else (None, None)
+
+        def pyin(segments):
+            # Allocations in pool processes would escape the memory profiler
+            if self.workers <= 1 or active_profiler() is not None:
+                return [track_pitch(s, sr, frame_length, hop_length, resolution) for s in segments]
+            # pyin decodes the channels one after another, so every channel
+            # is a task of its own
+            channels = [s.reshape(-1, s.shape[-1]) for s in segments]
+            tracks = [c for segment in channels for c in segment]
+            n = len(tracks)
+            pool = pitch_pool(self.workers)
+            try:
+                f0 = list(pool.map(
+                    track_pitch, tracks, [sr] * n, [frame_length] * n, [hop_length] * n, [resolution] * n))
+            except BrokenProcessPool:
+                # A worker died (or the platform could not spawn one): drop
+                # the pool and track in this process instead
+                discard_pitch_pool(self.workers, pool)
+                f0 = [track_pitch(t, sr, frame_length, hop_length, resolution) for t in tracks]
+            results = []
+            for segment, segment_channels in zip(segments, channels):
+                stacked = np.stack(f0[:len(segment_channels)])
+                f0 = f0[len(segment_channels):]
+                results.append(stacked.reshape(segment.shape[:-1] + stacked.shape[-1:]))
+            return results
+
+        def compute():
+            if active is None:
+                return pyin([y])[0]
+            # Track each active region on its own. pyin pads (center=True),
+            # so its frame i is centred on sample i * hop_length, half a
+            # frame before frame matrix row i, exactly as in a full-signal
+            # pass. A segment cut at sample lo * hop_length keeps that grid:
+            # its frame j is full-signal frame lo + j
+            f0 = np.full(y.shape[:-1] + (1 + y.shape[-1] // hop_length,), np.nan)
+            # A little context either side keeps pyin's voicing decisions
+            # at the run edges close to those of a full-signal pass
+            spans = [(start, stop, max(start - PITCH_CONTEXT_FRAMES, 0), stop + PITCH_CONTEXT_FRAMES)
+                     for start, stop in active_runs(active)]
+            f0_runs = pyin([y[..., lo * hop_length:(hi - 1) * hop_length + frame_length]
+                            for _, _, lo, hi in spans])
+            for (start, stop, lo, _), f0_run in zip(spans, f0_runs):
+                n = min(stop, f0.shape[-1], lo + f0_run.shape[-1]) - start
+                f0[..., start:start + n] = f0_run[..., start - lo:start - lo + n]
+            return f0
+
+        return self._stage("pitch", (sig_key, frame_length, hop_length, act_key, resolution), compute)
+
+    def lpc(self, frames, lpc_order, activity=None):
+        frames_key, wframes = frames
+        act_key, active = activity if activity is not None else (None, None)
+        method = self.lpc_method
+
+        def fit(x):
+            # One fit over the frames of every channel; librosa.lpc is much
+            # faster on a 2-D matrix than with extra leading axes
+            flat = x.reshape(-1, x.shape[-1])
+            if method == "autocorrelation":
+                a = lpc_autocorrelation(flat, lpc_order)
+            else:
+                # Burg's recursion loses stability in single precision (even
+                # loud voiced frames get poles outside the unit circle), so
+                # it always runs in float64; only the coefficients are cast
+                # back to the working precision
+                a = librosa.lpc(flat.astype(np.float64), order=lpc_order, axis=-1).astype(x.dtype)
+            return a.reshape(x.shape[:-1] + a.shape[-1:])
+
+        def compute():
+            if active is None:
+                return fit(wframes)
+            # The mask may come from the other signal's frames; rows it does
+            # not cover are never used. Skipped rows get a = [1, 0, ..., 0].
+            rows = np.flatnonzero(active[:wframes.shape[-2]])
+            a = np.zeros(wframes.shape[:-1] + (lpc_order + 1,), dtype=wframes.dtype)
+            a[..., 0] = 1.0
+            if len(rows):
+                a[..., rows, :] = fit(wframes[..., rows, :])
+            return a
+
+        return self._stage("lpc", (frames_key, lpc_order, method, act_key), compute)
+
+    def resynthesis(self, frames_ref, lpc_ref, lpc_tts, f0_ref, f0_tts, sr, hop_length,
+                    activity_ref=None, progress=None):
+        act_key, active = activity_ref if activity_ref is not None else (None, None)
+        key = (frames_ref[0], lpc_ref[0], lpc_tts[0], f0_ref[0], f0_tts[0], sr, hop_length, act_key)
+
+        def compute():
+            a_ref, a_tts = lpc_ref[1], lpc_tts[1]
+            pitch_ref, pitch_tts = f0_ref[1], f0_tts[1]
+            n_frames = min(a_ref.shape[-2], a_tts.shape[-2])
+            wframes_ref = frames_ref[1][..., :n_frames, :]
+
+            # Time-varying filtering of all frames (of all channels) in one
+            # batched call each
+            if active is None:
+                residual_ref = allzero_filter_frames(wframes_ref, a_ref[..., :n_frames, :])
+                processed_frames = allpole_filter_frames(residual_ref, a_tts[..., :n_frames, :])
+            else:
+                # Frames where the reference is silent stay zero
+                rows = np.flatnonzero(active[:n_frames])
+                residual_ref = allzero_filter_frames(wframes_ref[..., rows, :], a_ref[..., rows, :])
+                processed = allpole_filter_frames(residual_ref, a_tts[..., rows, :])
+                processed_frames = np.zeros(processed.shape[:-2] + wframes_ref.shape[-2:],
+                                            dtype=processed.dtype)
+                processed_frames[..., rows, :] = processed
+            record_array("residual_ref", residual_ref)
+            record_array("processed_frames", processed_frames)
+
+            # --- PITCH MATCHING ---
+            n_pitch = min(n_frames, pitch_ref.shape[-1], pitch_tts.shape[-1])
+            # Pitch pairs per output channel; a mono track is shared by every channel
+            shape = processed_frames.shape[:-2] + (n_pitch,)
+            ref_pitch = np.broadcast_to(pitch_ref[..., :n_pitch], shape)
+            tts_pitch = np.broadcast_to(pitch_tts[..., :n_pitch], shape)
+            is_voiced = (~np.isnan(ref_pitch) & ~np.isnan(tts_pitch)
+                         & (ref_pitch > 0) & (tts_pitch > 0))
+            if active is not None:
+                is_voiced &= active[:n_pitch]
+            voiced = [tuple(index) for index in np.argwhere(is_voiced)]
+            for j, i in enumerate(voiced):
+                n_steps = 12 * np.log2(ref_pitch[i] / tts_pitch[i])
+                processed_frames[i] = librosa.effects.pitch_shift(processed_frames[i], sr=sr, n_steps=n_steps)
+                if progress and j % max(1, len(voiced) // 20) == 0:
+                    progress(j / len(voiced))
+            # else: unvoiced frames are kept as is
+
+            # --- ENERGY NORMALIZATION ---
+            energy_r = np.sqrt(np.mean(wframes_ref**2, axis=-1, keepdims=True)) + 1e-7
+            energy_synth = np.sqrt(np.mean(processed_frames**2, axis=-1, keepdims=True)) + 1e-7
+            processed_frames *= energy_r / energy_synth
+
+            return overlap_add(processed_frames, hop_length)
+
+        return self._stage("resynthesis", key, compute)
+
+    def spectral_resynthesis(self, frames_ref, lpc_ref, lpc_tts, f0_ref, f0_tts, sr, hop_length,
+                             activity_ref=None, progress=None):
+        """Frequency-domain counterpart of ``resynthesis``.
+
+        The windowed reference frames go through one batched FFT, are whitened
+        by their own LPC response and recoloured with the TTS one. Pitch is
+        matched by scaling the frequency axis of the whitened excitation, so
+        unlike the time engine the TTS formants stay in place. Frame energies
+        are matched in the spectral domain and one ISTFT rebuilds the signal.
+        """
+        act_key, active = activity_ref if activity_ref is not None else (None, None)
+        key = ("stft", frames_ref[0], lpc_ref[0], lpc_tts[0], f0_ref[0], f0_tts[0], sr,
+               hop_length, act_key)
+
+        def compute():
+            a_ref, a_tts = lpc_ref[1], lpc_tts[1]
+            pitch_ref, pitch_tts = f0_ref[1], f0_tts[1]
+            n_frames = min(a_ref.shape[-2], a_tts.shape[-2])
+            wframes_ref = frames_ref[1][..., :n_frames, :]
+            n_fft = wframes_ref.shape[-1]
+            rows = np.arange(n_frames) if active is None else np.flatnonzero(active[:n_frames])
+
+            spec_ref = stft_frames(wframes_ref[..., rows, :])
+            excitation = lpc_whiten(spec_ref, a_ref[..., rows, :], n_fft)
+            record_array("stft", spec_ref)
+            if progress:
+                progress(0.3)
+
+            # --- PITCH MATCHING ---
+            n_pitch = min(n_frames, pitch_ref.shape[-1], pitch_tts.shape[-1])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ratio = pitch_ref[..., :n_pitch] / pitch_tts[..., :n_pitch]
+            ratios = np.ones(ratio.shape[:-1] + (n_frames,))
+            voiced = np.isfinite(ratio) & (ratio > 0)
+            ratios[..., :n_pitch][voiced] = ratio[voiced]
+            ratios = ratios[..., rows]
+            if excitation.shape[:-1] != ratios.shape:
+                # A mono reference shifted by the pitch of every TTS channel
+                excitation = np.broadcast_to(excitation, ratios.shape + excitation.shape[-1:]).copy()
+            shifted = ratios != 1
+            if shifted.any():
+                excitation[shifted] = scale_frequency_frames(excitation[shifted], ratios[shifted])
+            if progress:
+                progress(0.6)
+
+            spec_out = lpc_color(excitation, a_tts[..., rows, :], n_fft)
+
+            # --- ENERGY NORMALIZATION ---
+            gain = np.sqrt((spectral_energy(spec_ref, n_fft) + 1e-12) /
+                           (spectral_energy(spec_out, n_fft) + 1e-12))
+            spec_out *= gain.astype(spec_out.real.dtype)[..., None]
+
+            full = np.zeros(spec_out.shape[:-2] + (n_frames, spec_out.shape[-1]), dtype=spec_out.dtype)
+            full[..., rows, :] = spec_out
+            window = np.hamming(n_fft).astype(wframes_ref.dtype)
+            return istft_frames(full, hop_length, window)
+
+        return self._stage("resynthesis", key, compute)
+
+    def normalize(self, signal, peak=0.95):
+        sig_key, y = signal
+
+        def compute():
+            # Normalize output to avoid clipping
+            maxv = np.max(np.abs(y))
+            return y / maxv * peak if maxv > 0 else y
+
+        return self._stage("normalize", (sig_key, peak), compute)
+
+    # --- Driver ---
+
+    def preview(self, ref, tts, lpc_order, frame_length, hop_length, preview_sr=PREVIEW_SR,
+                max_seconds=None, pitch_resolution=PREVIEW_PITCH_RESOLUTION, progress=None):
+        """Fast low-rate rendering of ``run`` for judging settings by ear.
+
+        Both inputs are resampled to ``preview_sr`` (never upsampled) and
+        optionally cut to their first ``max_seconds``; frame, hop and LPC
+        order are scaled with ``preview_params`` and pitch is tracked on a
+        coarser ``pitch_resolution`` grid. The preview buffers are
+        cached like any resampled buffer, so repeated previews only redo the
+        stages whose settings changed. Returns ``(y_out, preview_sr)``.
+        """
+        ref, tts = load_audio(ref), load_audio(tts)
+        sr = min(preview_sr, ref.sr)
+        params = preview_params(ref.sr, lpc_order, frame_length, hop_length, sr)
+
+        def prepare(audio):
+            audio = audio.resample(sr, self.resample_quality)
+            if max_seconds is not None and audio.duration > max_seconds:
+                audio = audio.derive(audio.samples[..., :int(max_seconds * sr)], f"head({max_seconds}s)")
+            return audio
+
+        return self.run(prepare(ref), prepare(tts), *params, progress=progress,
+                        pitch_resolution=pitch_resolution)
+
+    def run(self, ref, tts, lpc_order, frame_length, hop_length, progress=None,
+            pitch_resolution=PITCH_RESOLUTION):
+        """Convert ``tts`` towards ``ref`` and return ``(y_out, sr)``.
+
+        ``ref`` and ``tts`` are file paths or ``AudioBuffer`` objects.
+        ``progress`` is an optional callable receiving a percentage (0-100).
+        ``pitch_resolution`` is pyin's pitch grid in semitones.
+        """
+        synth, act_ref, sr = self.synthesize(ref, tts, lpc_order, frame_length, hop_length,
+                                             progress, pitch_resolution)
+
+        _, y_out = self.normalize(synth)
+        if self.trim_silence:
+            if act_ref is None:
+                ref_key, (y_ref, _) = self.decode(ref)
+                act_ref = self.activity(self.frame((ref_key, y_ref), frame_length, hop_length))
+            start, stop = trim_bounds(act_ref[1], frame_length, hop_length, y_out.shape[-1])
+            y_out = y_out[..., start:stop]
+        return y_out, sr
+
+    def analysis_graph(self, ref, tts, lpc_order, frame_length, hop_length,
+                       pitch_resolution=PITCH_RESOLUTION, progress=None):
+        """The analysis stages of ``synthesize`` as a ``TaskGraph``.
+
+        Reference and TTS each get a branch (framing, VAD, pitch) that only
+        meet at the LPC fits, which use the reference activity for both.
+        ``progress`` receives 5-50% as tasks finish.
+        """
+        graph = TaskGraph()
+        tracker = {"done": 0}
+        lock = threading.Lock()
+
+        def task(name, fn, deps=()):
+            def run(*args):
+                result = fn(*args)
+                if progress:
+                    with lock:
+                        tracker["done"] += 1
+                        done = tracker["done"]
+                    progress(5 + 45 * done // len(graph))
+                return result
+            return graph.add(name, run, deps)
+
+        task("ref_decoded", lambda: self.decode(ref))
+        task("tts_decoded", lambda: self.decode(tts))
+        task("ref", lambda dec: (dec[0], dec[1][0]), ("ref_decoded",))
+        def tts_signal(dec_ref, dec_tts):
+            ref_channels = int(np.prod(dec_ref[1][0].shape[:-1]))
+            tts_channels = int(np.prod(dec_tts[1][0].shape[:-1]))
+            if ref_channels > 1 and tts_channels > 1 and ref_channels != tts_channels:
+                raise ValueError(
+                    f"Cannot pair a {ref_channels}-channel reference with a "
+                    f"{tts_channels}-channel TTS; one of them must be mono or "
+                    f"both must have the same channels")
+            return self.resample(dec_tts, dec_ref[1][1])
+
+        task("tts", tts_signal, ("ref_decoded", "tts_decoded"))
+        for side in ("ref", "tts"):
+            task(f"frames_{side}", lambda signal: self.frame(signal, frame_length, hop_length), (side,))
+            act = ()
+            if self.vad:
+                act = (task(f"act_{side}", self.activity, (f"frames_{side}",)),)
+            task(f"f0_{side}",
+                 lambda signal, dec_ref, activity=None: self.pitch(
+                     signal, dec_ref[1][1], frame_length, hop_length, activity, pitch_resolution),
+                 (side, "ref_decoded") + act)
+
+        # Output frames are only synthesized where the reference is active,
+        # so that is where both envelopes are needed
+        act_ref = ("act_ref",) if self.vad else ()
+        for side in ("ref", "tts"):
+            task(f"lpc_{side}", lambda frames, activity=None: self.lpc(frames, lpc_order, activity),
+                 (f"frames_{side}",) + act_ref)
+        return graph
+
+    def _executor(self):
+        """Thread pool for the analysis branches, or None to run them serially"""
+        # The memory profiler attributes allocations to one stage at a time
+        if self.workers <= 1 or active_profiler() is not None:
+            return None
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(self.workers, thread_name_prefix="pipeline")
+        return self._threads
+
+    def synthesize(self, ref, tts, lpc_order, frame_length, hop_length, progress=None,
+                   pitch_resolution=PITCH_RESOLUTION):
+        """Everything in ``run`` up to (not including) normalization.
+
+        Returns ``(synth, activity_ref, sr)`` where ``synth`` is the ``(key,
+        samples)`` pair of the resynthesized signal and ``activity_ref`` the
+        reference VAD stage result (None without VAD).
+        """
+        report = progress or (lambda value: None)
+        report(5)
+        results = self.analysis_graph(ref, tts, lpc_order, frame_length, hop_length,
+                                      pitch_resolution, progress=report).run(self._executor())
+        sr = results["ref_decoded"][1][1]
+        frames_ref, lpc_ref, lpc_tts = results["frames_ref"], results["lpc_ref"], results["lpc_tts"]
+        f0_ref, f0_tts, act_ref = results["f0_ref"], results["f0_tts"], results.get("act_ref")
+        report(50)
+
+        resynthesis = self.spectral_resynthesis if self.engine == "stft" else self.resynthesis
+        synth = resynthesis(
+            frames_ref, lpc_ref, lpc_tts, f0_ref, f0_tts, sr, hop_length, act_ref,
+            progress=lambda frac: report(50 + int(40 * frac)))
+        report(90)
+        return synth, act_ref, sr
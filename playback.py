@@ -0,0 +1,277 @@
+"""In-memory playback with a shared playhead for instant A/B switching.
+
+``PlaybackEngine`` holds every source as float32 samples at one output rate
+and renders blocks on demand from the selected source at a single playhead.
+Selecting another source while playing continues from the same position;
+the first few milliseconds crossfade from the old source so the switch has
+neither a gap nor a click. A source can also grow while it plays
+(``extend_source``/``finish_source``), e.g. while a script is converted
+sentence by sentence. Output backends pull blocks from the engine:
+
+- ``PyAudioOutput``: a PyAudio callback stream
+- ``NullOutput``: no device, for headless use and tests; blocks are pulled
+  manually with ``pull`` or by a background thread in real time
+- ``qt_audio_output.QtAudioOutput``: QAudioOutput in pull mode
+"""
+import threading
+import time
+import numpy as np
+import soxr
+
+try:
+    import pyaudio
+    PYAUDIO_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    pyaudio = None
+    PYAUDIO_AVAILABLE = False
+
+PLAYBACK_SR = 44100
+CROSSFADE_SECONDS = 0.005
+DEFAULT_BLOCK = 512
+
+
+def _block(y, start, n):
+    """``n`` samples of ``y`` from ``start``, zero padded past the end"""
+    out = np.zeros(n, dtype=np.float32)
+    if start < len(y):
+        chunk = y[start:start + n]
+        out[:len(chunk)] = chunk
+    return out
+
+
+class PlaybackEngine:
+    """Sources, selection and playhead shared by the output backends.
+
+    All methods are thread safe: the GUI selects and seeks while the audio
+    callback thread calls ``render``.
+    """
+
+    def __init__(self, sr=PLAYBACK_SR, crossfade=CROSSFADE_SECONDS):
+        self.sr = sr
+        self.volume = 1.0
+        self._sources = {}
+        # Growing sources -> their streaming resampler (None at the output rate)
+        self._open = {}
+        self._current = None
+        self._fade_from = None
+        self._fade_len = max(int(crossfade * sr), 1)
+        self._position = 0
+        self._playing = False
+        self._lock = threading.Lock()
+
+    # --- Sources ---
+
+    def set_source(self, name, audio):
+        """Add or replace source ``name`` from an AudioBuffer (None removes it).
+
+        Multi-channel audio is downmixed; the engine plays one channel.
+        """
+        if audio is None:
+            self.remove_source(name)
+            return
+        samples = np.ascontiguousarray(audio.to_mono().resample(self.sr).samples, dtype=np.float32)
+        with self._lock:
+            self._sources[name] = samples
+            self._open.pop(name, None)
+
+    def extend_source(self, name, samples, sr):
+        """Append ``samples`` at rate ``sr`` to source ``name``, creating it if needed.
+
+        The source stays open until ``finish_source``: while open, playback
+        that catches up with the end waits (outputs silence) for more audio
+        instead of stopping. ``(channels, n)`` samples are downmixed.
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=0)
+        if name not in self._open:
+            resampler = soxr.ResampleStream(sr, self.sr, 1) if sr != self.sr else None
+            with self._lock:
+                self._open[name] = resampler
+                self._sources[name] = np.zeros(0, dtype=np.float32)
+        resampler = self._open[name]
+        if resampler is not None:
+            samples = resampler.resample_chunk(samples)
+        with self._lock:
+            self._sources[name] = np.concatenate([self._sources[name], samples])
+
+    def finish_source(self, name):
+        """Mark a source built with ``extend_source`` as complete"""
+        resampler = self._open.get(name)
+        tail = (resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)
+                if resampler is not None else np.zeros(0, dtype=np.float32))
+        with self._lock:
+            if name in self._sources:
+                self._sources[name] = np.concatenate([self._sources[name], tail])
+            self._open.pop(name, None)
+
+    def remove_source(self, name):
+        with self._lock:
+            self._sources.pop(name, None)
+            self._open.pop(name, None)
+            if self._current == name:
+                self._current = None
+                self._playing = False
+            if self._fade_from == name:
+                self._fade_from = None
+
+    def has_source(self, name):
+        return name in self._sources
+
+    @property
+    def current(self):
+        return self._current
+
+    # --- Transport ---
+
+    def select(self, name):
+        """Make ``name`` the audible source, keeping the playhead"""
+        with self._lock:
+            if name not in self._sources:
+                raise KeyError(name)
+            if self._playing and self._current not in (None, name):
+                self._fade_from = self._current
+            self._current = name
+
+    def play(self, name=None):
+        """Start (or continue) playing; restarts from zero if at the end"""
+        if name is not None:
+            self.select(name)
+        with self._lock:
+            if self._current is None:
+                return
+            if (self._position >= len(self._sources[self._current])
+                    and self._current not in self._open):
+                self._position = 0
+            self._playing = True
+
+    def pause(self):
+        with self._lock:
+            self._playing = False
+            self._fade_from = None
+
+    def stop(self):
+        with self._lock:
+            self._playing = False
+            self._fade_from = None
+            self._position = 0
+
+    def seek(self, seconds):
+        with self._lock:
+            self._position = max(int(seconds * self.sr), 0)
+            self._fade_from = None
+
+    @property
+    def playing(self):
+        return self._playing
+
+    @property
+    def position(self):
+        """Playhead in seconds"""
+        return self._position / self.sr
+
+    @property
+    def duration(self):
+        """Length of the selected source in seconds"""
+        y = self._sources.get(self._current)
+        return 0.0 if y is None else len(y) / self.sr
+
+    # --- Rendering ---
+
+    def render(self, n):
+        """Next ``n`` output samples (silence when stopped); advances the playhead"""
+        with self._lock:
+            if not self._playing or self._current is None:
+                return np.zeros(n, dtype=np.float32)
+            y = self._sources[self._current]
+            out = _block(y, self._position, n)
+            if self._fade_from is not None:
+                m = min(self._fade_len, n)
+                old = _block(self._sources[self._fade_from], self._position, m)
+                ramp = np.linspace(0.0, 1.0, m, endpoint=False, dtype=np.float32)
+                out[:m] = old * (1 - ramp) + out[:m] * ramp
+                self._fade_from = None
+            if self._current in self._open:
+                # Still being produced: wait at the end for more samples
+                self._position += min(n, max(len(y) - self._position, 0))
+            else:
+                self._position += n
+            if self._position >= len(y) and self._current not in self._open:
+                self._position = len(y)
+                self._playing = False
+            if self.volume != 1.0:
+                out *= self.volume
+            return out
+
+
+class NullOutput:
+    """Output that discards audio; pulls blocks manually or on a real-time thread"""
+
+    def __init__(self, engine, block=DEFAULT_BLOCK, realtime=True, capture=False):
+        self.engine = engine
+        self.block = block
+        self.realtime = realtime
+        self.captured = [] if capture else None
+        self._thread = None
+        self._running = False
+
+    def pull(self, n=None):
+        data = self.engine.render(n or self.block)
+        if self.captured is not None:
+            self.captured.append(data)
+        return data
+
+    def start(self):
+        if not self.realtime or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = self.block / self.engine.sr
+        next_time = time.perf_counter()
+        while self._running:
+            self.pull()
+            next_time += period
+            time.sleep(max(next_time - time.perf_counter(), 0))
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    close = stop
+
+
+class PyAudioOutput:
+    """Mono float32 PyAudio stream fed from the engine's callback"""
+
+    def __init__(self, engine, block=DEFAULT_BLOCK):
+        if not PYAUDIO_AVAILABLE:
+            raise RuntimeError("PyAudio is not installed")
+        self.engine = engine
+        self.block = block
+        self._pa = pyaudio.PyAudio()
+        self._stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        return self.engine.render(frame_count).tobytes(), pyaudio.paContinue
+
+    def start(self):
+        if self._stream is None:
+            self._stream = self._pa.open(
+                format=pyaudio.paFloat32, channels=1, rate=self.engine.sr, output=True,
+                frames_per_buffer=self.block, stream_callback=self._callback)
+        self._stream.start_stream()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        self._pa.terminate()
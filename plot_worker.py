@@ -0,0 +1,72 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import numpy as np
+from audio_utils import extract_lpc_env, N_FFT
+from spectral_plot import spectrogram_image, SPEC_N_FFT, SPEC_HOP
+from waveform_pyramid import WaveformPyramid
+
+PLOT_VIEWS = ("envelopes", "waveforms", "spectrograms")
+
+
+def prepare_signals(ref_audio, tts_audio, output_audio, resample_quality="hq"):
+    """The three signals at the reference rate (downmixed), with keys identifying them"""
+    ref_audio, tts_audio, output_audio = (a.to_mono() for a in (ref_audio, tts_audio, output_audio))
+    sr = ref_audio.sr
+    y_tts = tts_audio.resample(sr, resample_quality).samples
+    keys = (ref_audio.key, tts_audio.key, output_audio.key)
+    return (ref_audio.samples, y_tts, output_audio.samples), sr, keys
+
+
+def compute_envelopes(signals, sr, lpc_order):
+    """Mean LPC envelopes of the three signals on a common frequency grid"""
+    freq_grid = np.linspace(0, sr / 2, N_FFT // 2 + 1)
+    envs = []
+    for y in signals:
+        w, env = extract_lpc_env(y, sr, lpc_order)
+        envs.append(np.interp(np.clip(freq_grid, w.min(), w.max()), w, env))
+    return freq_grid, envs
+
+
+class PlotDataWorker(QThread):
+    """Prepares the data for one plot view off the GUI thread.
+
+    Emits ``finished(view, data)`` where ``data`` holds the signals, their
+    keys and the view-specific results (envelopes, waveform pyramids or
+    spectrogram images). ``cached`` passes in results the plot already has
+    so they are not recomputed.
+    """
+    finished = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, view, ref_audio, tts_audio, output_audio, lpc_order,
+                 resample_quality="hq", cached=None, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.ref_audio = ref_audio
+        self.tts_audio = tts_audio
+        self.output_audio = output_audio
+        self.lpc_order = lpc_order
+        self.resample_quality = resample_quality
+        self.cached = cached or {}
+
+    def run(self):
+        try:
+            signals, sr, keys = prepare_signals(
+                self.ref_audio, self.tts_audio, self.output_audio, self.resample_quality)
+            data = {"signals": signals, "sr": sr, "keys": keys}
+            if self.view == "envelopes":
+                data["freqs"], data["envelopes"] = compute_envelopes(signals, sr, self.lpc_order)
+            elif self.view == "waveforms":
+                data["pyramids"] = {
+                    (key, sr): self.cached.get((key, sr)) or WaveformPyramid(y, sr)
+                    for key, y in zip(keys, signals)
+                }
+            elif self.view == "spectrograms":
+                images = {}
+                for key, y in zip(keys, signals):
+                    spec_key = ((key, sr), SPEC_N_FFT, SPEC_HOP)
+                    image = self.cached.get(spec_key)
+                    images[spec_key] = image if image is not None else spectrogram_image(y)
+                data["spectrograms"] = images
+            self.finished.emit(self.view, data)
+        except Exception as e:
+            self.error.emit(self.view, str(e))
@@ -0,0 +1,136 @@
+"""Compare float32 and float64 processing on the same input.
+
+Runs the conversion pipeline and the STFT denoisers at each precision and
+reports wall time, peak traced memory and how far the float32 output is from
+the float64 one (max absolute difference and SNR in dB). Without input files
+synthetic speech of ``--seconds`` length is used for both voices.
+
+Example::
+
+    python precision_check.py ref.wav tts.wav
+    python precision_check.py --seconds 120
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import numpy as np
+from audio_buffer import AudioBuffer
+from audio_utils import PRECISIONS, reduce_noise_median_filter, reduce_noise_spectral_subtraction
+from pipeline import ConversionPipeline
+from synthetic_corpus import synthetic_speech
+
+DEFAULT_TOLERANCE_DB = 60.0
+
+
+def synthetic_voice(seconds, sr=22050, f0=120.0, seed=0):
+    """Synthetic speech (see ``synthetic_corpus``) as an AudioBuffer"""
+    return AudioBuffer(synthetic_speech(seconds, sr, f0=f0, seed=seed), sr,
+                       provenance=[f"synthetic_speech({seconds}s, f0={f0}, seed={seed})"])
+
+
+def _measure(fn):
+    """Run ``fn`` twice: untraced for the wall time, then under tracemalloc for peak memory"""
+    start = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def snr_db(reference, test):
+    """SNR of ``test`` against ``reference`` in dB (inf when identical)"""
+    n = min(len(reference), len(test))
+    ref = np.asarray(reference[:n], dtype=np.float64)
+    err = ref - np.asarray(test[:n], dtype=np.float64)
+    noise = np.sum(err**2)
+    if noise == 0:
+        return float("inf")
+    return float(10 * np.log10(np.sum(ref**2) / noise))
+
+
+def compare_precisions(ref, tts, lpc_order=16, frame_length=1024, hop_length=512):
+    """Time and compare each task at float64 and float32.
+
+    Returns a list of rows with ``task``, ``precision``, ``seconds``,
+    ``peak_mb``, ``dtype``, ``finite`` (no NaN or inf in the output) and,
+    for float32, ``max_abs_diff`` and ``snr_db`` against the float64 result.
+    """
+    tasks = {
+        "conversion": lambda p: ConversionPipeline(precision=p).run(
+            ref, tts, lpc_order, frame_length, hop_length)[0],
+        "spectral_subtraction": lambda p: reduce_noise_spectral_subtraction(
+            ref.samples, ref.sr, dtype=PRECISIONS[p]),
+        "median_filter": lambda p: reduce_noise_median_filter(
+            ref.samples, ref.sr, dtype=PRECISIONS[p]),
+    }
+    rows = []
+    for task, fn in tasks.items():
+        results = {}
+        for precision in ("float64", "float32"):
+            out, elapsed, peak = _measure(lambda: fn(precision))
+            results[precision] = out
+            row = {"task": task, "precision": precision, "seconds": elapsed,
+                   "peak_mb": peak / 2**20, "dtype": str(out.dtype),
+                   "finite": bool(np.isfinite(out).all())}
+            if precision == "float32":
+                n = min(len(out), len(results["float64"]))
+                row["max_abs_diff"] = float(np.max(np.abs(
+                    out[:n].astype(np.float64) - results["float64"][:n]))) if n else 0.0
+                row["snr_db"] = snr_db(results["float64"], out)
+            rows.append(row)
+    return rows
+
+
+def format_table(rows):
+    lines = [f"{'task':<22}{'precision':<10}{'dtype':<9}{'seconds':>9}{'peak MB':>10}{'max diff':>11}{'SNR dB':>9}"]
+    for row in rows:
+        diff = f"{row['max_abs_diff']:.2e}" if "max_abs_diff" in row else "-"
+        snr = f"{row['snr_db']:.1f}" if "snr_db" in row else "-"
+        lines.append(f"{row['task']:<22}{row['precision']:<10}{row['dtype']:<9}"
+                     f"{row['seconds']:>9.3f}{row['peak_mb']:>10.1f}{diff:>11}{snr:>9}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("ref", nargs="?", help="Reference voice file")
+    parser.add_argument("tts", nargs="?", help="TTS file to convert")
+    parser.add_argument("--seconds", type=float, default=30.0,
+                        help="Length of the synthetic input when no files are given")
+    parser.add_argument("--lpc-order", type=int, default=16)
+    parser.add_argument("--frame-length", type=int, default=1024)
+    parser.add_argument("--hop-length", type=int, default=512)
+    parser.add_argument("--tolerance-db", type=float, default=DEFAULT_TOLERANCE_DB,
+                        help="Minimum SNR of float32 against float64 output")
+    args = parser.parse_args(argv)
+
+    if args.ref and args.tts:
+        ref, tts = AudioBuffer.from_file(args.ref), AudioBuffer.from_file(args.tts)
+    else:
+        ref = synthetic_voice(args.seconds, f0=110.0, seed=0)
+        tts = synthetic_voice(args.seconds, f0=180.0, seed=1)
+
+    rows = compare_precisions(ref, tts, args.lpc_order, args.frame_length, args.hop_length)
+    print(format_table(rows))
+    status = 0
+    broken = [f"{row['task']} ({row['precision']})" for row in rows if not row["finite"]]
+    if broken:
+        print(f"Non-finite output: {', '.join(broken)}", file=sys.stderr)
+        status = 1
+    # A NaN SNR compares false against the tolerance, so it is checked explicitly
+    failed = [row["task"] for row in rows
+              if not row.get("snr_db", np.inf) >= args.tolerance_db]
+    if failed:
+        print(f"float32 output below {args.tolerance_db} dB SNR: {', '.join(failed)}", file=sys.stderr)
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+from PyQt5.QtCore import QIODevice
+from PyQt5.QtMultimedia import QAudio, QAudioDeviceInfo, QAudioFormat, QAudioOutput
+import numpy as np
+
+# About 40 ms of 16-bit mono audio at 44.1 kHz
+DEFAULT_BUFFER_BYTES = 4096
+
+
+class _EngineDevice(QIODevice):
+    """Read-only QIODevice rendering 16-bit PCM from a PlaybackEngine"""
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+
+    def readData(self, maxlen):
+        n = maxlen // 2
+        if n == 0:
+            return b""
+        samples = np.clip(self.engine.render(n), -1.0, 1.0)
+        return (samples * 32767).astype("<i2").tobytes()
+
+    def writeData(self, data):
+        return -1
+
+    def bytesAvailable(self):
+        # An endless stream: silence when the engine is stopped
+        return 1 << 20
+
+    def isSequential(self):
+        return True
+
+
+class QtAudioOutput:
+    """QAudioOutput in pull mode fed from a PlaybackEngine.
+
+    The device is opened once and keeps pulling (silence while stopped), so
+    play, pause and source switches take effect within one small buffer.
+    """
+
+    def __init__(self, engine, parent=None, buffer_bytes=DEFAULT_BUFFER_BYTES):
+        self.engine = engine
+        fmt = QAudioFormat()
+        fmt.setSampleRate(engine.sr)
+        fmt.setChannelCount(1)
+        fmt.setSampleSize(16)
+        fmt.setSampleType(QAudioFormat.SignedInt)
+        fmt.setByteOrder(QAudioFormat.LittleEndian)
+        fmt.setCodec("audio/pcm")
+        if not QAudioDeviceInfo.defaultOutputDevice().isFormatSupported(fmt):
+            raise RuntimeError(f"The default output device does not support {engine.sr} Hz 16-bit mono")
+        self.output = QAudioOutput(fmt, parent)
+        self.output.setBufferSize(buffer_bytes)
+        self.device = _EngineDevice(engine, parent)
+
+    def start(self):
+        if self.output.state() in (QAudio.StoppedState, QAudio.IdleState):
+            self.device.open(QIODevice.ReadOnly)
+            self.output.start(self.device)
+
+    def stop(self):
+        self.output.stop()
+        self.device.close()
+
+    close = stop
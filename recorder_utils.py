@@ -1,9 +1,14 @@
 import pyaudio
+import queue
 import wave
 import threading
 import time
 import numpy as np
 
+# Live-monitor backlog kept for a slow GUI, in seconds of audio; older
+# chunks are dropped from the monitor (never from the recording) beyond it
+MONITOR_BUFFER_SECONDS = 5.0
+
 class AudioRecorder:
     def __init__(self, channels=1, rate=44100, chunk=1024, format_=pyaudio.paInt16):
         self.channels = channels
@@ -13,12 +18,18 @@ class AudioRecorder:
         self.audio = pyaudio.PyAudio()
         self.stream = None
         self.frames = []
+        # Raw chunks for live monitoring; drained by the GUI so the
+        # recording thread never waits on drawing
+        self.chunk_queue = self._monitor_queue()
+        self.dropped_chunks = 0
         self.is_recording = False
         self.recorder_thread = None
         
     def start_recording(self):
         """Start recording audio from the default microphone"""
         self.frames = []
+        self.chunk_queue = self._monitor_queue()
+        self.dropped_chunks = 0
         self.is_recording = True
         
         # Start recording in a separate thread
@@ -26,6 +37,22 @@ class AudioRecorder:
         self.recorder_thread.daemon = True
         self.recorder_thread.start()
         
+    def _monitor_queue(self):
+        return queue.Queue(maxsize=max(1, int(MONITOR_BUFFER_SECONDS * self.rate / self.chunk)))
+
+    def _monitor(self, data):
+        """Queue a chunk for the live monitor, dropping the oldest one when it lags"""
+        while True:
+            try:
+                self.chunk_queue.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    self.chunk_queue.get_nowait()
+                    self.dropped_chunks += 1
+                except queue.Empty:
+                    pass
+
     def stop_recording(self):
         """Stop the ongoing recording"""
         self.is_recording = False
@@ -44,8 +71,9 @@ class AudioRecorder:
             )
             
             while self.is_recording:
-                data = self.stream.read(self.chunk)
+                data = self.stream.read(self.chunk, exception_on_overflow=False)
                 self.frames.append(data)
+                self._monitor(data)
                 
         except Exception as e:
             print(f"Error during recording: {e}")
@@ -72,6 +100,26 @@ class AudioRecorder:
             print(f"Error saving recording: {e}")
             return False
             
+    def drain_chunks(self):
+        """Return all chunks captured since the last call as one float32 array (mono)"""
+        chunks = []
+        while True:
+            try:
+                chunks.append(self.chunk_queue.get_nowait())
+            except queue.Empty:
+                break
+        if not chunks:
+            return np.zeros(0, dtype=np.float32)
+        data = np.frombuffer(b''.join(chunks), dtype=np.int16).astype(np.float32) / 32768.0
+        return data.reshape(-1, self.channels).mean(axis=1)
+        
+    def get_samples(self):
+        """Return the recording as a float32 array in [-1, 1] (channels interleaved)"""
+        if not self.frames:
+            return np.zeros(0, dtype=np.float32)
+        data = np.frombuffer(b''.join(self.frames), dtype=np.int16)
+        return data.astype(np.float32) / 32768.0
+            
     def close(self):
         """Clean up resources"""
         if self.stream:
@@ -0,0 +1,219 @@
+"""Library of reference voices indexed by a compact acoustic descriptor.
+
+Each voice is summarized at ``DESCRIPTOR_SR`` by
+
+- its mean LPC envelope (``extract_lpc_env``) in dB, pooled to
+  ``ENVELOPE_BANDS`` bands and level-normalized,
+- f0 statistics from pyin: median in semitones re 55 Hz, spread in
+  semitones and voiced fraction,
+- the mean mel cepstrum (``metrics.mel_cepstrum``) without c0.
+
+All descriptors live in one contiguous float32 matrix. A query scales every
+dimension by the library-wide spread and a per-block weight, so each block
+contributes equally however many dimensions it has, and returns the k
+smallest Euclidean distances with one broadcast and an ``argpartition``.
+
+Example::
+
+    python reference_library.py voices.npz add speakers/*.wav
+    python reference_library.py voices.npz query prompt.wav -k 3
+    python reference_library.py voices.npz convert prompt.wav out.wav
+"""
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import librosa
+from audio_buffer import AudioBuffer
+from audio_io import file_hash
+from audio_utils import extract_lpc_env, load_audio
+from metrics import mel_cepstrum
+from pipeline import ConversionPipeline
+
+DESCRIPTOR_SR = 16000
+ENVELOPE_BANDS = 48
+N_MFCC = 20
+DESCRIPTOR_LPC_ORDER = 16
+
+# Descriptor layout: block name -> (slice, weight)
+BLOCKS = {
+    "envelope": (slice(0, ENVELOPE_BANDS), 1.0),
+    "f0": (slice(ENVELOPE_BANDS, ENVELOPE_BANDS + 3), 1.0),
+    "cepstrum": (slice(ENVELOPE_BANDS + 3, ENVELOPE_BANDS + 3 + N_MFCC - 1), 1.0),
+}
+DESCRIPTOR_SIZE = ENVELOPE_BANDS + 3 + N_MFCC - 1
+
+
+def voice_descriptor(audio):
+    """Descriptor vector (float32, ``DESCRIPTOR_SIZE``) of an AudioBuffer or file"""
+    audio = load_audio(audio).to_mono()
+    y = audio.resample(DESCRIPTOR_SR).samples
+    sr = DESCRIPTOR_SR
+
+    _, env = extract_lpc_env(y, sr, DESCRIPTOR_LPC_ORDER)
+    env_db = 20 * np.log10(env + 1e-9)
+    bands = np.array([b.mean() for b in np.array_split(env_db, ENVELOPE_BANDS)])
+    bands -= bands.mean()
+
+    f0, voiced, _ = librosa.pyin(y, fmin=librosa.note_to_hz('C2'), fmax=librosa.note_to_hz('C7'),
+                                 sr=sr, frame_length=1024, hop_length=256)
+    semitones = 12 * np.log2(f0[voiced] / 55.0) if np.any(voiced) else np.zeros(1)
+    f0_stats = [np.median(semitones), np.std(semitones), np.mean(voiced)]
+
+    cepstrum = mel_cepstrum(y, sr, n_mfcc=N_MFCC).mean(axis=0)[1:]
+    return np.concatenate([bands, f0_stats, cepstrum]).astype(np.float32)
+
+
+class ReferenceLibrary:
+    """Reference voices and their descriptors, with nearest-neighbour search.
+
+    ``entries[i]`` describes the voice whose descriptor is ``matrix[i]``:
+    its ``id`` (content hash of the file), ``path``, ``name`` and median f0.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._matrix = np.empty((0, DESCRIPTOR_SIZE), dtype=np.float32)
+        self._n = 0
+        self._weights = None
+
+    @property
+    def matrix(self):
+        return self._matrix[:self._n]
+
+    def __len__(self):
+        return self._n
+
+    def ids(self):
+        return [entry["id"] for entry in self.entries]
+
+    # --- Editing ---
+
+    def add(self, path, name=None):
+        """Analyze the reference file at ``path`` and store it; returns its entry"""
+        voice_id = file_hash(path)
+        for entry in self.entries:
+            if entry["id"] == voice_id:
+                return entry
+        descriptor = voice_descriptor(path)
+        if self._n == len(self._matrix):
+            # Grow geometrically so adding many voices stays linear overall
+            grown = np.empty((max(2 * self._n, 16), DESCRIPTOR_SIZE), dtype=np.float32)
+            grown[:self._n] = self.matrix
+            self._matrix = grown
+        self._matrix[self._n] = descriptor
+        self._n += 1
+        entry = {"id": voice_id, "path": os.path.abspath(path),
+                 "name": name or os.path.splitext(os.path.basename(path))[0],
+                 "f0_median_hz": float(55.0 * 2 ** (descriptor[ENVELOPE_BANDS] / 12))}
+        self.entries.append(entry)
+        self._weights = None
+        return entry
+
+    def remove(self, voice_id):
+        i = self.ids().index(voice_id)
+        self._matrix[i:self._n - 1] = self._matrix[i + 1:self._n]
+        self._n -= 1
+        del self.entries[i]
+        self._weights = None
+
+    # --- Queries ---
+
+    def _dimension_weights(self):
+        if self._weights is None:
+            spread = self.matrix.std(axis=0) if self._n > 1 else np.ones(DESCRIPTOR_SIZE)
+            spread = np.where(spread > 1e-6, spread, 1.0)
+            weights = np.empty(DESCRIPTOR_SIZE, dtype=np.float32)
+            for block, weight in BLOCKS.values():
+                size = block.stop - block.start
+                weights[block] = weight / (spread[block] * np.sqrt(size))
+            self._weights = weights
+        return self._weights
+
+    def nearest_to_descriptor(self, descriptor, k=1):
+        """``[(entry, distance)]`` of the ``k`` closest voices, closest first"""
+        if self._n == 0:
+            return []
+        k = min(k, self._n)
+        w = self._dimension_weights()
+        dist = np.sqrt(np.sum(np.square((self.matrix - descriptor) * w), axis=1))
+        top = np.argpartition(dist, k - 1)[:k] if k < self._n else np.arange(self._n)
+        top = top[np.argsort(dist[top])]
+        return [(self.entries[i], float(dist[i])) for i in top]
+
+    def nearest(self, audio, k=1):
+        """Closest stored voices to an AudioBuffer or audio file"""
+        return self.nearest_to_descriptor(voice_descriptor(audio), k)
+
+    def select(self, tts_audio):
+        """The closest reference as an AudioBuffer, ready for ``ConversionPipeline.run``"""
+        matches = self.nearest(tts_audio, k=1)
+        if not matches:
+            raise LookupError("The reference library is empty")
+        return AudioBuffer.from_file(matches[0][0]["path"])
+
+    # --- Persistence ---
+
+    def save(self, path):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, matrix=self.matrix, entries=json.dumps(self.entries))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        library = cls()
+        with np.load(path) as data:
+            matrix = np.ascontiguousarray(data["matrix"], dtype=np.float32)
+            library.entries = json.loads(str(data["entries"]))
+        library._matrix = matrix
+        library._n = len(matrix)
+        return library
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage and query a reference voice library")
+    parser.add_argument("library", help="Library file (.npz); created by 'add' if missing")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Analyze and store reference voices")
+    add.add_argument("paths", nargs="+")
+    query = sub.add_parser("query", help="List the closest references for a TTS clip")
+    query.add_argument("tts")
+    query.add_argument("-k", type=int, default=5)
+    convert = sub.add_parser("convert", help="Convert a TTS clip with its closest reference")
+    convert.add_argument("tts")
+    convert.add_argument("output")
+    convert.add_argument("--lpc-order", type=int, default=16)
+    convert.add_argument("--frame-length", type=int, default=1024)
+    convert.add_argument("--hop-length", type=int, default=512)
+    sub.add_parser("list", help="List the stored references")
+    args = parser.parse_args(argv)
+
+    exists = os.path.exists(args.library)
+    if not exists and args.command != "add":
+        print(f"No library at {args.library}", file=sys.stderr)
+        return 2
+    library = ReferenceLibrary.load(args.library) if exists else ReferenceLibrary()
+
+    if args.command == "add":
+        for path in args.paths:
+            entry = library.add(path)
+            print(f"{entry['id']}  {entry['name']}  (median f0 {entry['f0_median_hz']:.0f} Hz)")
+        library.save(args.library)
+    elif args.command == "list":
+        for entry in library.entries:
+            print(f"{entry['id']}  {entry['name']}  {entry['path']}")
+    elif args.command == "query":
+        for entry, dist in library.nearest(args.tts, args.k):
+            print(f"{dist:8.3f}  {entry['name']}  {entry['path']}")
+    elif args.command == "convert":
+        tts = AudioBuffer.from_file(args.tts)
+        ref = library.select(tts)
+        print(f"Using reference {ref.provenance[0] if ref.provenance else ref.key}")
+        y_out, sr = ConversionPipeline().run(ref, tts, args.lpc_order, args.frame_length, args.hop_length)
+        tts.derive(y_out, "lpc_conversion(nearest_reference)", sr=sr, inputs=[ref]).export(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,46 @@
+from collections import OrderedDict
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import numpy as np
 import librosa
-import librosa.display
+from waveform_pyramid import WaveformPyramid
+
+SPEC_N_FFT = 2048
+SPEC_HOP = 512
+# Pixel budget for one rendered spectrogram (time columns x frequency rows)
+SPEC_MAX_COLS = 1600
+SPEC_MAX_ROWS = 512
+SPEC_CACHE_ENTRIES = 24
+# Vertical offsets of the reference, TTS and processed waveforms
+WAVE_OFFSETS = (2, 0, -2)
+WAVE_STYLES = (("b", "Reference"), ("r", "TTS"), ("m", "Processed"))
+ZOOM_STEP = 1.25
+
+
+def _max_pool(a, factor, axis):
+    """Downsample non-negative ``a`` by the maximum over blocks of ``factor`` along ``axis``"""
+    if factor <= 1:
+        return a
+    a = np.moveaxis(a, axis, 0)
+    pad = -a.shape[0] % factor
+    if pad:
+        a = np.concatenate([a, np.zeros((pad,) + a.shape[1:], dtype=a.dtype)])
+    a = a.reshape((a.shape[0] // factor, factor) + a.shape[1:]).max(axis=1)
+    return np.moveaxis(a, 0, axis)
+
+
+def spectrogram_image(y, n_fft=SPEC_N_FFT, hop_length=SPEC_HOP,
+                      max_cols=SPEC_MAX_COLS, max_rows=SPEC_MAX_ROWS):
+    """STFT magnitude in dB, max-pooled down to at most ``max_rows x max_cols``.
+
+    Max pooling keeps short transients and narrow harmonics visible after
+    downsampling. Returns a float32 array shaped (freq rows, time columns).
+    """
+    mag = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+    mag = _max_pool(mag, int(np.ceil(mag.shape[1] / max_cols)), axis=1)
+    mag = _max_pool(mag, int(np.ceil(mag.shape[0] / max_rows)), axis=0)
+    return librosa.amplitude_to_db(mag, ref=np.max).astype(np.float32)
+
 
 class SpectralPlot(FigureCanvas):
     def __init__(self, parent=None):
@@ -21,17 +59,64 @@ class SpectralPlot(FigureCanvas):
             'y_ref': None,
             'y_tts': None,
             'y_proc': None,
-            'sr': None
+            'sr': None,
+            'keys': None
         }
         
         self.current_plot_type = "envelopes"
+        # (signal key, n_fft, hop) -> downsampled dB spectrogram
+        self.spec_cache = OrderedDict()
+        # signal key -> WaveformPyramid, plus state for interactive pan/zoom
+        self.pyramid_cache = OrderedDict()
+        self._wave_artists = []
+        self._pan_start = None
+        self.mpl_connect('scroll_event', self._on_scroll)
+        self.mpl_connect('button_press_event', self._on_press)
+        self.mpl_connect('motion_notify_event', self._on_motion)
+        self.mpl_connect('button_release_event', self._on_release)
+
+    def store_audio_data(self, y_ref, y_tts, y_proc, sr, keys=None):
+        """Store audio waveform data for plotting.
 
-    def store_audio_data(self, y_ref, y_tts, y_proc, sr):
-        """Store audio waveform data for plotting"""
+        ``keys`` optionally identifies the three signals (e.g. AudioBuffer
+        keys) so cached pyramids and spectrograms survive re-runs with
+        unchanged inputs.
+        """
         self.stored_data['y_ref'] = y_ref
         self.stored_data['y_tts'] = y_tts
         self.stored_data['y_proc'] = y_proc
         self.stored_data['sr'] = sr
+        if keys is None:
+            keys = tuple(("array", id(y), len(y)) for y in (y_ref, y_tts, y_proc))
+        self.stored_data['keys'] = tuple((k, sr) for k in keys)
+
+    def spec_keys(self):
+        """Spectrogram cache keys of the stored signals"""
+        return [(k, SPEC_N_FFT, SPEC_HOP) for k in self.stored_data['keys']]
+
+    def add_spectrograms(self, images):
+        """Add precomputed spectrogram images (cache key -> dB image)"""
+        self._add_cached(self.spec_cache, images)
+
+    def add_pyramids(self, pyramids):
+        """Add precomputed waveform pyramids (signal key -> WaveformPyramid)"""
+        self._add_cached(self.pyramid_cache, pyramids)
+
+    @staticmethod
+    def _add_cached(cache, items):
+        for key, value in items.items():
+            cache[key] = value
+            cache.move_to_end(key)
+        while len(cache) > SPEC_CACHE_ENTRIES:
+            cache.popitem(last=False)
+
+    def show_message(self, text):
+        """Replace the plot with a centred message (e.g. while data is computed)"""
+        self.fig.clear()
+        self.ax1 = self.fig.add_subplot(111)
+        self.ax1.text(0.5, 0.5, text, transform=self.ax1.transAxes, ha='center', va='center')
+        self.ax1.set_axis_off()
+        self.draw()
 
     def switch_plot_type(self, plot_type):
         """Switch between different plot types"""
@@ -89,8 +174,21 @@ class SpectralPlot(FigureCanvas):
         self.fig.subplots_adjust(top=0.9, bottom=0.15, left=0.1, right=0.95)
         self.draw()
 
+    def _pyramids(self):
+        """Min/max pyramids of the three stored signals, built here if not added already"""
+        signals = (self.stored_data['y_ref'], self.stored_data['y_tts'], self.stored_data['y_proc'])
+        pyramids = []
+        for key, y in zip(self.stored_data['keys'], signals):
+            if key not in self.pyramid_cache:
+                self.pyramid_cache[key] = WaveformPyramid(y, self.stored_data['sr'])
+            self.pyramid_cache.move_to_end(key)
+            pyramids.append(self.pyramid_cache[key])
+        while len(self.pyramid_cache) > SPEC_CACHE_ENTRIES:
+            self.pyramid_cache.popitem(last=False)
+        return pyramids
+
     def plot_waveforms(self):
-        """Plot time domain waveforms"""
+        """Plot time domain waveforms of the whole files (scroll to zoom, drag to pan)"""
         if (self.stored_data['y_ref'] is None or self.stored_data['y_tts'] is None or 
             self.stored_data['y_proc'] is None or self.stored_data['sr'] is None):
             return
@@ -98,31 +196,22 @@ class SpectralPlot(FigureCanvas):
         # Clear the figure and recreate single subplot
         self.fig.clear()
         self.ax1 = self.fig.add_subplot(111)
+        self._wave_artists = []
         
-        y_ref = self.stored_data['y_ref']
-        y_tts = self.stored_data['y_tts']
-        y_proc = self.stored_data['y_proc']
-        sr = self.stored_data['sr']
-        
-        # Limit to first 3 seconds for better visualization
-        max_samples = min(len(y_ref), len(y_tts), len(y_proc), int(3 * sr))
-        time_axis = np.linspace(0, max_samples / sr, max_samples)
+        pyramids = self._pyramids()
+        duration = max(p.duration for p in pyramids)
         
-        # Normalize for better comparison
-        y_ref_norm = y_ref[:max_samples] / (np.max(np.abs(y_ref[:max_samples])) + 1e-8)
-        y_tts_norm = y_tts[:max_samples] / (np.max(np.abs(y_tts[:max_samples])) + 1e-8)
-        y_proc_norm = y_proc[:max_samples] / (np.max(np.abs(y_proc[:max_samples])) + 1e-8)
+        # Legend proxies; the actual traces are redrawn for every view
+        for color, label in WAVE_STYLES:
+            self.ax1.plot([], [], color=color, label=label)
         
-        # Offset for visualization
-        self.ax1.plot(time_axis, y_ref_norm + 2, "b-", label="Reference", alpha=0.8, linewidth=1)
-        self.ax1.plot(time_axis, y_tts_norm, "r-", label="TTS", alpha=0.8, linewidth=1)
-        self.ax1.plot(time_axis, y_proc_norm - 2, "m-", label="Processed", alpha=0.8, linewidth=1)
-        
-        self.ax1.set_title("Time Domain Waveforms (First 3 seconds)", fontsize=12, pad=10)
+        self.ax1.set_title("Time Domain Waveforms (scroll to zoom, drag to pan, double-click to reset)",
+                           fontsize=12, pad=10)
         self.ax1.set_xlabel("Time (s)")
         self.ax1.set_ylabel("Normalized Amplitude")
-        self.ax1.legend()
+        self.ax1.legend(loc="upper right")
         self.ax1.grid(True, alpha=0.3)
+        self.ax1.set_xlim(0, duration)
         self.ax1.set_ylim(-3.5, 3.5)
         
         # Add horizontal lines to separate waveforms
@@ -130,51 +219,90 @@ class SpectralPlot(FigureCanvas):
         self.ax1.axhline(y=-1, color='gray', linestyle='--', alpha=0.5)
         
         self.fig.subplots_adjust(top=0.9, bottom=0.15, left=0.1, right=0.95)
-        self.draw()
+        self._update_waveform_view()
+        self.ax1.callbacks.connect('xlim_changed', lambda ax: self._update_waveform_view())
+
+    def _update_waveform_view(self):
+        """Redraw the waveform traces for the current x range from the pyramids"""
+        if self.current_plot_type != "waveforms" or self.ax1 is None:
+            return
+        for artist in self._wave_artists:
+            artist.remove()
+        self._wave_artists = []
+        
+        t0, t1 = self.ax1.get_xlim()
+        n_pixels = max(int(self.ax1.bbox.width), 1)
+        for pyramid, offset, (color, _) in zip(self._pyramids(), WAVE_OFFSETS, WAVE_STYLES):
+            # Normalize for better comparison
+            scale = 1.0 / (pyramid.peak + 1e-8)
+            times, lower, upper = pyramid.view(t0, t1, n_pixels)
+            if lower is upper:
+                artists = self.ax1.plot(times, lower * scale + offset, color=color, alpha=0.8, linewidth=1)
+            else:
+                artists = [self.ax1.fill_between(times, lower * scale + offset, upper * scale + offset,
+                                                 color=color, alpha=0.8, linewidth=0)]
+            self._wave_artists.extend(artists)
+        self.draw_idle()
+
+    def _waveform_event(self, event):
+        return (self.current_plot_type == "waveforms" and self.ax1 is not None
+                and event.inaxes is self.ax1)
+
+    def _on_scroll(self, event):
+        if not self._waveform_event(event):
+            return
+        t0, t1 = self.ax1.get_xlim()
+        scale = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        x = event.xdata
+        self.ax1.set_xlim(x - (x - t0) * scale, x + (t1 - x) * scale)
+
+    def _on_press(self, event):
+        if not self._waveform_event(event):
+            return
+        if event.dblclick:
+            self.ax1.set_xlim(0, max(p.duration for p in self._pyramids()))
+            return
+        if event.button == 1:
+            self._pan_start = (event.x, self.ax1.get_xlim())
+
+    def _on_motion(self, event):
+        if self._pan_start is None or self.current_plot_type != "waveforms" or self.ax1 is None:
+            return
+        x_start, (t0, t1) = self._pan_start
+        shift = (event.x - x_start) / max(self.ax1.bbox.width, 1) * (t1 - t0)
+        self.ax1.set_xlim(t0 - shift, t1 - shift)
+
+    def _on_release(self, event):
+        self._pan_start = None
 
     def plot_spectrograms(self):
-        """Plot spectrograms"""
+        """Plot spectrograms from the cache of background-computed images"""
         if (self.stored_data['y_ref'] is None or self.stored_data['y_tts'] is None or 
             self.stored_data['y_proc'] is None or self.stored_data['sr'] is None):
             return
             
         # Clear the figure and create three subplots
-        self.fig.clear()
         sr = self.stored_data['sr']
+        images = [self.spec_cache.get(key) for key in self.spec_keys()]
+        if any(image is None for image in images):
+            # Images come from a PlotDataWorker; it redraws once they are added
+            self.show_message('Computing spectrograms...')
+            return
         
+        self.fig.clear()
         try:
-            ax1 = self.fig.add_subplot(311)
-            ax2 = self.fig.add_subplot(312)
-            ax3 = self.fig.add_subplot(313)
-            
-            # Parameters for spectrograms
-            hop_length = 512
-            n_fft = 2048
-            
-            # Reference spectrogram
-            S_ref = librosa.stft(self.stored_data['y_ref'], hop_length=hop_length, n_fft=n_fft)
-            S_ref_db = librosa.amplitude_to_db(np.abs(S_ref), ref=np.max)
-            librosa.display.specshow(S_ref_db, y_axis='hz', x_axis='time', 
-                                   sr=sr, hop_length=hop_length, ax=ax1, cmap='viridis')
-            ax1.set_title('Reference Spectrogram', fontsize=10)
-            ax1.set_ylabel('Frequency (Hz)')
-            
-            # TTS spectrogram
-            S_tts = librosa.stft(self.stored_data['y_tts'], hop_length=hop_length, n_fft=n_fft)
-            S_tts_db = librosa.amplitude_to_db(np.abs(S_tts), ref=np.max)
-            librosa.display.specshow(S_tts_db, y_axis='hz', x_axis='time', 
-                                   sr=sr, hop_length=hop_length, ax=ax2, cmap='viridis')
-            ax2.set_title('TTS Spectrogram', fontsize=10)
-            ax2.set_ylabel('Frequency (Hz)')
-            
-            # Processed spectrogram
-            S_proc = librosa.stft(self.stored_data['y_proc'], hop_length=hop_length, n_fft=n_fft)
-            S_proc_db = librosa.amplitude_to_db(np.abs(S_proc), ref=np.max)
-            librosa.display.specshow(S_proc_db, y_axis='hz', x_axis='time', 
-                                   sr=sr, hop_length=hop_length, ax=ax3, cmap='viridis')
-            ax3.set_title('Processed Spectrogram', fontsize=10)
-            ax3.set_ylabel('Frequency (Hz)')
-            ax3.set_xlabel('Time (s)')
+            titles = ('Reference Spectrogram', 'TTS Spectrogram', 'Processed Spectrogram')
+            signals = (self.stored_data['y_ref'], self.stored_data['y_tts'], self.stored_data['y_proc'])
+            axes = []
+            for i, (image, title, y) in enumerate(zip(images, titles, signals)):
+                ax = self.fig.add_subplot(3, 1, i + 1)
+                # One downsampled image per signal instead of a full-resolution mesh
+                ax.imshow(image, origin='lower', aspect='auto', cmap='viridis',
+                          interpolation='nearest', extent=(0, len(y) / sr, 0, sr / 2))
+                ax.set_title(title, fontsize=10)
+                ax.set_ylabel('Frequency (Hz)')
+                axes.append(ax)
+            axes[-1].set_xlabel('Time (s)')
             
             self.fig.subplots_adjust(top=0.95, bottom=0.1, left=0.1, right=0.95, hspace=0.4)
             
@@ -190,4 +318,4 @@ class SpectralPlot(FigureCanvas):
                          transform=self.ax1.transAxes, ha='center', va='center')
             self.ax1.set_title("Spectrogram Error")
             self.fig.subplots_adjust(top=0.9, bottom=0.15, left=0.1, right=0.95)
-            self.draw()
\ No newline at end of file
+            self.draw()
@@ -0,0 +1,293 @@
+"""Pipelined text -> TTS -> conversion -> playback, one sentence at a time.
+
+``stream_script`` splits the text into sentences and synthesizes them on a
+background thread while the calling thread converts each finished sentence
+with ``StreamingConverter`` and hands the converted samples to a callback
+(e.g. ``PlaybackEngine.extend_source``). The first sentence can play while
+later ones are still being synthesized, so the wait before audio starts is
+one sentence of TTS and conversion instead of the whole script.
+
+``StreamingConverter`` carries the conversion state across segment
+boundaries. The TTS segments are appended to one continuous signal on the
+reference's frame grid, so frame positions and reference alignment are the
+same as for a whole-file run. Each new span is converted together with
+``context`` frames before it, which gives pyin (and VAD) the same lead-in
+and rebuilds the overlap-add of frames that straddle the boundary. Only
+output samples whose every overlapping frame has been synthesized are
+emitted. Whole-file normalization needs the complete output, so streamed
+output is normalized by the running peak instead: the first chunk (usually
+a whole sentence) sets the gain, and a later chunk with a higher peak
+lowers it from that chunk on, so the output never clips.
+
+Example::
+
+    python streaming.py reference.wav script.txt converted.wav --compare
+"""
+import argparse
+import queue
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from audio_buffer import AudioBuffer
+from audio_utils import load_audio
+from pipeline import PITCH_CONTEXT_FRAMES, PITCH_RESOLUTION, ConversionPipeline
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# Sentences shorter than this are merged with the next one, since every
+# TTS call has a fixed start-up cost
+MIN_SENTENCE_CHARS = 20
+OUTPUT_PEAK = 0.95
+
+
+def split_sentences(text, min_chars=MIN_SENTENCE_CHARS):
+    """Sentences of ``text`` (very short ones merged forward), in order"""
+    sentences, pending = [], ""
+    for part in SENTENCE_END.split(text):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        if len(pending) >= min_chars:
+            sentences.append(pending)
+            pending = ""
+    if pending:
+        if sentences and len(pending) < min_chars:
+            sentences[-1] = f"{sentences[-1]} {pending}"
+        else:
+            sentences.append(pending)
+    return sentences
+
+
+class StreamingConverter:
+    """Converts a TTS signal that arrives in segments against one reference.
+
+    ``push`` appends a segment and returns the output samples that are now
+    final; ``flush`` returns the rest once the last segment has been pushed.
+    Concatenating everything returned matches ``ConversionPipeline.run`` on
+    the concatenated segments up to pyin differences at segment ends and the
+    output scaling (see the module docstring).
+    """
+
+    def __init__(self, ref, lpc_order, frame_length, hop_length, pipeline=None,
+                 pitch_resolution=PITCH_RESOLUTION, context=PITCH_CONTEXT_FRAMES, peak=OUTPUT_PEAK):
+        ref = load_audio(ref)
+        # Every span is converted once, so its stage results are never
+        # reused. A private, uncached copy of the pipeline keeps them from
+        # evicting the shared pipeline's whole-file results and lets a
+        # stream run alongside a regular render on that pipeline.
+        pipeline = pipeline if pipeline is not None else ConversionPipeline()
+        self.pipeline = pipeline.clone(cache_bytes=0)
+        self.sr = ref.sr
+        self.lpc_order = lpc_order
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        self.pitch_resolution = pitch_resolution
+        # Enough frames to rebuild every overlap-add sum at the boundary
+        self.context = max(context, -(-frame_length // hop_length) - 1)
+        self.peak = peak
+        self._max = 0.0
+        self._ref = ref.samples
+        self._tts = np.zeros(0, dtype=np.float32)
+        self._frames_done = 0
+        self._emitted = 0
+
+    @property
+    def exhausted(self):
+        """True once the TTS is as long as the reference; later audio is dropped as in ``run``"""
+        return len(self._tts) >= self._ref.shape[-1]
+
+    def _n_frames(self):
+        n = min(len(self._tts), self._ref.shape[-1])
+        return 0 if n < self.frame_length else 1 + (n - self.frame_length) // self.hop_length
+
+    def push(self, segment):
+        """Append a TTS segment (AudioBuffer or path); returns newly final output samples"""
+        y = load_audio(segment).resample(self.sr, self.pipeline.resample_quality).samples
+        self._tts = np.concatenate([self._tts, y])
+        return self._convert(final=False)
+
+    def flush(self):
+        """Output samples still held back after the last segment"""
+        return self._convert(final=True)
+
+    def _convert(self, final):
+        n_frames = self._n_frames()
+        if n_frames == 0 or (n_frames == self._frames_done and not final):
+            return np.zeros(0, dtype=np.float32)
+        first = max(self._frames_done - self.context, 0)
+        start = first * self.hop_length
+        stop = (n_frames - 1) * self.hop_length + self.frame_length
+        ref = AudioBuffer(self._ref[..., start:stop], self.sr)
+        tts = AudioBuffer(self._tts[start:stop], self.sr)
+        (_, synth), _, _ = self.pipeline.synthesize(
+            ref, tts, self.lpc_order, self.frame_length, self.hop_length,
+            pitch_resolution=self.pitch_resolution)
+
+        # Samples before n_frames * hop get no contribution from later frames
+        end = stop if final else n_frames * self.hop_length
+        out = synth[..., self._emitted - start:end - start]
+        self._emitted = end
+        self._frames_done = n_frames
+        self._max = max(self._max, float(np.max(np.abs(out), initial=0.0)))
+        gain = self.peak / self._max if self._max > 0 else 1.0
+        return (out * gain).astype(np.float32)
+
+
+@contextmanager
+def _com_apartment():
+    """Initialize COM on this thread for the SAPI5 TTS driver (Windows only)"""
+    if sys.platform != "win32":
+        yield
+        return
+    import comtypes
+    comtypes.CoInitialize()
+    try:
+        yield
+    finally:
+        comtypes.CoUninitialize()
+
+
+def _synthesize_sentences(sentences, synthesize, segments):
+    try:
+        # pyttsx3's SAPI5 driver makes COM calls, which fail on a thread
+        # that has not initialized COM
+        with _com_apartment():
+            for sentence in sentences:
+                segments.put(synthesize(sentence))
+    except Exception as e:
+        segments.put(e)
+    finally:
+        segments.put(None)
+
+
+def stream_script(text, ref, lpc_order, frame_length, hop_length, pipeline=None,
+                  synthesize=None, on_audio=None, pitch_resolution=PITCH_RESOLUTION):
+    """Synthesize, convert and deliver ``text`` sentence by sentence.
+
+    Parameters
+    ----------
+    text : str
+    ref : AudioBuffer or str
+        Reference voice
+    lpc_order, frame_length, hop_length : int
+        Conversion parameters, as for ``ConversionPipeline.run``
+    pipeline : ConversionPipeline, optional
+        Settings to convert with; its stage cache is left untouched
+    synthesize : callable, optional
+        ``sentence -> AudioBuffer``; defaults to ``tts_utils.text_to_speech``
+    on_audio : callable, optional
+        Called as ``on_audio(samples, sr)`` with each converted chunk as soon
+        as it is final; chunks are ``(channels, n)`` for a multi-channel
+        reference
+
+    Returns
+    -------
+    tts : AudioBuffer
+        The synthesized script
+    output : AudioBuffer
+        The converted script
+    report : dict
+        ``sentences``, ``time_to_first_audio`` (seconds from the call until
+        the first ``on_audio``), ``total_seconds`` and ``audio_seconds``
+    """
+    if synthesize is None:
+        from tts_utils import text_to_speech
+        synthesize = text_to_speech
+    sentences = split_sentences(text)
+    if not sentences:
+        raise ValueError("No text to synthesize")
+    ref = load_audio(ref)
+    converter = StreamingConverter(ref, lpc_order, frame_length, hop_length, pipeline,
+                                   pitch_resolution)
+
+    start = time.perf_counter()
+    first_audio = None
+    segments = queue.Queue()
+    producer = threading.Thread(target=_synthesize_sentences,
+                                args=(sentences, synthesize, segments), daemon=True)
+    producer.start()
+
+    tts_parts, chunks = [], []
+
+    def deliver(chunk):
+        nonlocal first_audio
+        if len(chunk) == 0:
+            return
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+        chunks.append(chunk)
+        if on_audio:
+            on_audio(chunk, converter.sr)
+
+    while True:
+        segment = segments.get()
+        if segment is None:
+            break
+        if isinstance(segment, Exception):
+            raise segment
+        tts_parts.append(segment.resample(converter.sr, converter.pipeline.resample_quality))
+        if not converter.exhausted:
+            deliver(converter.push(segment))
+    deliver(converter.flush())
+    producer.join()
+
+    tts = AudioBuffer(np.concatenate([p.samples for p in tts_parts]), converter.sr,
+                      provenance=[f"tts:streamed({len(sentences)} sentences)"])
+    y_out = np.concatenate(chunks, axis=-1) if chunks else np.zeros(0, dtype=np.float32)
+    output = tts.derive(y_out, (f"lpc_conversion_streamed(lpc_order={lpc_order}, "
+                                f"frame_length={frame_length}, hop_length={hop_length})"),
+                        inputs=[ref])
+    report = {
+        "sentences": len(sentences),
+        "time_to_first_audio": first_audio,
+        "total_seconds": time.perf_counter() - start,
+        "audio_seconds": y_out.shape[-1] / converter.sr,
+    }
+    return tts, output, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a text script sentence by sentence and report time to first audio")
+    parser.add_argument("reference", help="Reference voice audio file")
+    parser.add_argument("script", help="Text file with the script")
+    parser.add_argument("output", help="Converted WAV to write")
+    parser.add_argument("--rate", type=int, default=200, help="TTS speaking rate")
+    parser.add_argument("--gender", choices=["male", "female"], default=None)
+    parser.add_argument("--lpc-order", type=int, default=16)
+    parser.add_argument("--frame-length", type=int, default=1024)
+    parser.add_argument("--hop-length", type=int, default=512)
+    parser.add_argument("--engine", choices=["time", "stft"], default="time")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also time the whole-file TTS + conversion for comparison")
+    args = parser.parse_args(argv)
+
+    from tts_utils import text_to_speech
+
+    with open(args.script, encoding="utf-8") as f:
+        text = f.read()
+    ref = AudioBuffer.from_file(args.reference)
+    synthesize = lambda sentence: text_to_speech(sentence, args.rate, args.gender)
+
+    _, output, report = stream_script(
+        text, ref, args.lpc_order, args.frame_length, args.hop_length,
+        pipeline=ConversionPipeline(engine=args.engine), synthesize=synthesize)
+    output.export(args.output)
+    print(f"Streamed {report['sentences']} sentences, {report['audio_seconds']:.1f} s of audio")
+    print(f"  time to first audio: {report['time_to_first_audio']:.2f} s")
+    print(f"  total:               {report['total_seconds']:.2f} s")
+
+    if args.compare:
+        start = time.perf_counter()
+        tts = synthesize(text)
+        ConversionPipeline(engine=args.engine).run(
+            ref, tts, args.lpc_order, args.frame_length, args.hop_length)
+        print(f"Whole-file TTS + conversion before any audio: {time.perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Minimal dependency graph of tasks, run serially or on an executor.
+
+Tasks are added with the names of the tasks whose results they take as
+arguments, so a graph is always built in a valid order. ``run`` without an
+executor calls the tasks one after another in that order; with an executor
+(e.g. a ``ThreadPoolExecutor``) every task is submitted as soon as all its
+inputs are ready, so independent branches run concurrently.
+
+Example::
+
+    graph = TaskGraph()
+    graph.add("a", load_a)
+    graph.add("b", load_b)
+    graph.add("sum", lambda a, b: a + b, deps=("a", "b"))
+    results = graph.run(executor)
+"""
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class TaskGraph:
+    def __init__(self):
+        self._tasks = OrderedDict()
+
+    def add(self, name, fn, deps=()):
+        """Add task ``name`` computing ``fn(*results of deps)``; returns ``name``"""
+        if name in self._tasks:
+            raise ValueError(f"Duplicate task: {name}")
+        missing = [d for d in deps if d not in self._tasks]
+        if missing:
+            raise ValueError(f"Task {name} depends on unknown tasks: {', '.join(missing)}")
+        self._tasks[name] = (fn, tuple(deps))
+        return name
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def run(self, executor=None):
+        """Run every task and return ``{name: result}``.
+
+        The first exception raised by a task is re-raised once the tasks
+        already running have finished; tasks not yet started are skipped.
+        """
+        results = {}
+        if executor is None:
+            for name, (fn, deps) in self._tasks.items():
+                results[name] = fn(*(results[d] for d in deps))
+            return results
+
+        pending = OrderedDict(self._tasks)
+        running = {}
+        error = None
+        while pending or running:
+            if error is None:
+                for name, (fn, deps) in list(pending.items()):
+                    if all(d in results for d in deps):
+                        del pending[name]
+                        running[executor.submit(fn, *(results[d] for d in deps))] = name
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                else:
+                    results[name] = future.result()
+        if error is not None:
+            raise error
+        return results
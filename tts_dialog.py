@@ -6,13 +6,14 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from tts_utils import text_to_speech
 
 class TTSDialog(QDialog):
-    tts_generated = pyqtSignal(str)  # Signal to emit when TTS is generated
+    tts_generated = pyqtSignal(object)  # Emits the generated AudioBuffer
+    stream_requested = pyqtSignal(str, int, str)  # Text, rate and gender for streamed conversion
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Text-to-Speech Generator")
         self.setMinimumSize(500, 300)
-        self.tts_path = None
+        self.tts_audio = None
         self.setup_ui()
         self.load_available_voices()
         
@@ -47,10 +48,14 @@ class TTSDialog(QDialog):
         button_layout = QHBoxLayout()
         self.generate_btn = QPushButton("Generate Speech")
         self.generate_btn.clicked.connect(self.generate_speech)
+        self.stream_btn = QPushButton("Stream Through Conversion")
+        self.stream_btn.setToolTip("Synthesize, convert and play sentence by sentence")
+        self.stream_btn.clicked.connect(self.stream_speech)
         self.cancel_btn = QPushButton("Cancel")
         self.cancel_btn.clicked.connect(self.reject)
         
         button_layout.addWidget(self.generate_btn)
+        button_layout.addWidget(self.stream_btn)
         button_layout.addWidget(self.cancel_btn)
         layout.addLayout(button_layout)
         
@@ -66,6 +71,16 @@ class TTSDialog(QDialog):
         # No need to do anything as we're only using gender selection now
         pass
     
+    def stream_speech(self):
+        """Hand the text to the main window for pipelined TTS and conversion"""
+        text = self.text_input.toPlainText().strip()
+        if not text:
+            QMessageBox.warning(self, "Empty Text", "Please enter some text to synthesize.")
+            return
+        self.stream_requested.emit(text, self.speed_combo.currentData(),
+                                   self.gender_combo.currentText().lower())
+        self.accept()
+
     def generate_speech(self):
         """Generate TTS from the entered text"""
         text = self.text_input.toPlainText().strip()
@@ -83,9 +98,9 @@ class TTSDialog(QDialog):
         
         try:
             # Generate speech with selected gender and rate
-            tts_path = text_to_speech(text, rate, selected_gender)
-            self.tts_path = tts_path
-            self.tts_generated.emit(tts_path)
+            tts_audio = text_to_speech(text, rate, selected_gender)
+            self.tts_audio = tts_audio
+            self.tts_generated.emit(tts_audio)
             self.accept()  # Close dialog when done
             
         except Exception as e:
@@ -1,11 +1,11 @@
 import tempfile
 import os
-import soundfile as sf
 import pyttsx3
+from audio_buffer import AudioBuffer
 
 def text_to_speech(text, rate=200, gender=None):
     """
-    Convert text to speech using pyttsx3 (system voices) and save as wav file
+    Convert text to speech using pyttsx3 (system voices)
     
     Args:
         text (str): Text to convert to speech
@@ -13,7 +13,7 @@ def text_to_speech(text, rate=200, gender=None):
         gender (str): Gender ('male' or 'female')
     
     Returns:
-        str: Path to the generated audio file
+        AudioBuffer: The generated speech, decoded in memory
     """
     try:
         # Initialize TTS engine
@@ -43,15 +43,21 @@ def text_to_speech(text, rate=200, gender=None):
         # Set rate
         engine.setProperty('rate', rate)
         
-        # Create a temporary WAV file
+        # pyttsx3 can only render to a file, so use a scratch WAV and
+        # remove it as soon as it has been decoded
         tmp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
         tmp_wav.close()
         
-        # Generate and save speech
-        engine.save_to_file(text, tmp_wav.name)
-        engine.runAndWait()
-            
-        return tmp_wav.name
+        try:
+            # Generate and save speech
+            engine.save_to_file(text, tmp_wav.name)
+            engine.runAndWait()
+            speech = AudioBuffer.from_file(tmp_wav.name)
+        finally:
+            os.remove(tmp_wav.name)
+        
+        return AudioBuffer(speech.samples, speech.sr,
+                           provenance=[f"tts:pyttsx3(rate={rate}, gender={gender})"])
     
     except Exception as e:
         raise Exception(f"TTS generation failed: {str(e)}")
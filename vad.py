@@ -0,0 +1,76 @@
+"""Frame-level voice activity detection from energy and zero-crossing rate.
+
+Everything works on the ``(n_frames, frame_length)`` frame matrices used by
+the conversion (or a stack of them, one per channel), one vectorized pass
+per feature. A frame is active when its energy is within ``threshold_db``
+of the loudest frame, or when it is at most ``ZCR_MARGIN_DB`` quieter than
+that and crosses zero often enough to be an unvoiced consonant. Active
+regions are then widened by ``hangover`` frames on both sides so onsets
+and decays are not clipped.
+"""
+import numpy as np
+from scipy.ndimage import maximum_filter1d
+
+VAD_THRESHOLD_DB = -45.0
+VAD_ZCR_THRESHOLD = 0.25
+VAD_HANGOVER = 2
+ZCR_MARGIN_DB = 10.0
+ENERGY_FLOOR_DB = -100.0
+
+
+def frame_energy_db(frames):
+    """Mean power of every frame in dB"""
+    power = np.mean(np.square(frames, dtype=np.float64), axis=-1)
+    return 10 * np.log10(np.maximum(power, 10 ** (ENERGY_FLOOR_DB / 10)))
+
+
+def zero_crossing_rate(frames):
+    """Fraction of adjacent sample pairs in every frame that change sign"""
+    signs = np.signbit(frames)
+    return np.count_nonzero(signs[..., 1:] != signs[..., :-1], axis=-1) / max(frames.shape[-1] - 1, 1)
+
+
+def detect_activity(frames, threshold_db=VAD_THRESHOLD_DB, zcr_threshold=VAD_ZCR_THRESHOLD,
+                    hangover=VAD_HANGOVER):
+    """Boolean mask of active (non-silent) frames, shaped ``(n_frames,)``.
+
+    Parameters
+    ----------
+    frames : numpy.ndarray [shape=(..., n_frames, frame_length)]
+        Frame matrix, or one per channel; a frame is active when it is
+        active in any channel, relative to the loudest frame of all of them
+    threshold_db : float
+        Energy threshold relative to the loudest frame
+    zcr_threshold : float
+        Zero-crossing rate above which a quieter frame still counts as speech
+    hangover : int
+        Number of frames active regions are extended by on each side
+    """
+    frames = np.asarray(frames)
+    if frames.shape[-2] == 0:
+        return np.zeros(0, dtype=bool)
+    energy = frame_energy_db(frames)
+    level = energy - energy.max()
+    active = level > threshold_db
+    active |= (level > threshold_db - ZCR_MARGIN_DB) & (zero_crossing_rate(frames) > zcr_threshold)
+    # A digitally silent signal has no loudest frame to compare against
+    active &= energy > ENERGY_FLOOR_DB
+    if active.ndim > 1:
+        active = active.reshape(-1, active.shape[-1]).any(axis=0)
+    if hangover > 0:
+        active = maximum_filter1d(active.astype(np.uint8), size=2 * hangover + 1, mode="constant") > 0
+    return active
+
+
+def active_runs(active):
+    """``(start, stop)`` frame index pairs of the contiguous active regions"""
+    edges = np.diff(np.concatenate(([0], np.asarray(active, dtype=np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def trim_bounds(active, frame_length, hop_length, n_samples):
+    """Sample range ``(start, stop)`` spanning the first to the last active frame"""
+    idx = np.flatnonzero(active)
+    if len(idx) == 0:
+        return 0, 0
+    return int(idx[0] * hop_length), int(min(idx[-1] * hop_length + frame_length, n_samples))
@@ -8,7 +8,11 @@ from PyQt5.QtWidgets import (
     QLabel, QMessageBox, QProgressBar
 )
 from PyQt5.QtCore import Qt, QTimer, pyqtSignal
-from PyQt5.QtMultimedia import QAudioRecorder, QAudioEncoderSettings, QMultimedia
+from PyQt5.QtMultimedia import (
+    QAudioRecorder, QAudioEncoderSettings, QMultimedia, QAudioProbe, QAudioFormat
+)
+from audio_buffer import AudioBuffer
+from live_spectrogram import LiveSpectrogramView, chunk_levels, meter_percent
 
 # Import recorder utils but handle import error
 try:
@@ -18,16 +22,17 @@ except ImportError:
     PYAUDIO_AVAILABLE = False
 
 class VoiceRecorderDialog(QDialog):
-    recording_complete = pyqtSignal(str)  # Signal to emit when recording is completed
+    recording_complete = pyqtSignal(object)  # Emits the recorded AudioBuffer
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Record Your Voice")
-        self.setMinimumSize(400, 250)
-        self.recorded_path = None
+        self.setMinimumSize(500, 450)
+        self.recorded_audio = None
         self.max_duration = 60 
         self.recorder = QAudioRecorder()
         self.is_recording = False  
+        self._probe_chunks = []
         self.setup_ui()
         self.setup_recorder()
         
@@ -52,12 +57,23 @@ class VoiceRecorderDialog(QDialog):
         self.time_label.setStyleSheet("font-size: 18pt; font-weight: bold;")
         layout.addWidget(self.time_label)
         
-        # Volume level indicator
+        # Live rolling spectrogram of the incoming audio
+        self.live_view = LiveSpectrogramView(self)
+        layout.addWidget(self.live_view)
+        
+        # Volume level indicators (RMS and peak, -60..0 dBFS)
         self.level_bar = QProgressBar()
         self.level_bar.setRange(0, 100)
         self.level_bar.setValue(0)
+        self.level_bar.setFormat("RMS %v%")
         layout.addWidget(self.level_bar)
         
+        self.peak_bar = QProgressBar()
+        self.peak_bar.setRange(0, 100)
+        self.peak_bar.setValue(0)
+        self.peak_bar.setFormat("Peak %v%")
+        layout.addWidget(self.peak_bar)
+        
         # Buttons
         button_layout = QHBoxLayout()
         
@@ -103,11 +119,17 @@ class VoiceRecorderDialog(QDialog):
             self.recorder.setEncodingSettings(audio_settings)
             self.recorder.setOutputLocation(Qt.QUrl.fromLocalFile(self.output_file))
             
+            # Tap the recorder's buffers for the live view and level meter
+            self.probe = QAudioProbe(self)
+            self.probe.audioBufferProbed.connect(self._on_probe_buffer)
+            self.probe.setSource(self.recorder)
+            
         except Exception:
             # Fall back to PyAudio if QAudioRecorder fails
             if PYAUDIO_AVAILABLE:
                 self.use_pyaudio = True
                 self.pyaudio_recorder = AudioRecorder()
+                self.live_view.configure(self.pyaudio_recorder.rate)
             else:
                 QMessageBox.critical(self, "Recording Error", 
                                   "Audio recording is not available. Please install PyAudio.")
@@ -126,6 +148,9 @@ class VoiceRecorderDialog(QDialog):
         # Reset UI
         self.time_label.setText("00:00")
         self.level_bar.setValue(0)
+        self.peak_bar.setValue(0)
+        self._probe_chunks = []
+        self.live_view.reset()
         self.status_label.setText("Recording... Press 'Stop Recording' when finished")
         self.record_btn.setText("Stop Recording")
         self.listen_btn.setEnabled(False)
@@ -155,22 +180,34 @@ class VoiceRecorderDialog(QDialog):
         self.is_recording = False
         
         self.timer.stop()
+        self.level_bar.setValue(0)
+        self.peak_bar.setValue(0)
         self.status_label.setText("Recording complete!")
+        dropped = self.pyaudio_recorder.dropped_chunks if self.use_pyaudio else 0
+        if dropped:
+            # Only the live view fell behind; the recording itself is complete
+            seconds = dropped * self.pyaudio_recorder.chunk / self.pyaudio_recorder.rate
+            self.status_label.setText(f"Recording complete! (live view skipped {seconds:.1f} s)")
         self.record_btn.setText("Record Again")
         
-        # Process recorded audio to ensure PCM WAV format
+        # Keep the recording in memory as a mono float32 buffer
         try:
-            # Create a permanent file copy
-            tmp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-            self.recorded_path = tmp_wav.name
+            if self.recorded_audio is not None:
+                self.recorded_audio.release()
             
             if self.use_pyaudio:
-                # Save PyAudio recording
-                self.pyaudio_recorder.save_recording(self.recorded_path)
+                rec = self.pyaudio_recorder
+                data = rec.get_samples().reshape(-1, rec.channels).mean(axis=1)
+                sr = rec.rate
             else:
-                # Convert Qt recording to standard format using soundfile
-                data, sr = sf.read(self.output_file)
-                sf.write(self.recorded_path, data, sr, subtype="PCM_16")
+                # Decode the Qt recording, then drop its scratch file
+                data, sr = sf.read(self.output_file, dtype="float32", always_2d=True)
+                data = data.mean(axis=1)
+                os.remove(self.output_file)
+            
+            if len(data) == 0:
+                raise ValueError("No audio was captured")
+            self.recorded_audio = AudioBuffer(data, sr, provenance=["recording"])
             
             # Enable buttons only if recording was successful
             self.listen_btn.setEnabled(True)
@@ -195,47 +232,80 @@ class VoiceRecorderDialog(QDialog):
         seconds = total_seconds % 60
         self.time_label.setText(f"{minutes:02d}:{seconds:02d}")
         
-        # Update audio level indicator
-        if self.use_pyaudio and hasattr(self, 'pyaudio_recorder'):
-            try:
-                # Get audio level from PyAudio recorder
-                level = int(self.pyaudio_recorder.get_rms_levels() * 100)
-                self.level_bar.setValue(level)
-            except Exception:
-                # Fallback if get_rms_levels fails
-                import random
-                self.level_bar.setValue(random.randint(10, 80))
-        else:
-            # For QAudioRecorder, we can't easily get the audio level
-            # Use random values for visual feedback
-            import random
-            self.level_bar.setValue(random.randint(10, 80))
+        # Feed everything captured since the last tick to the live view
+        # and level meters; one redraw per tick regardless of chunk count
+        self._update_live_view()
             
         # If we've reached the maximum duration (for safety), warn the user
         if total_seconds >= self.max_duration:
             self.status_label.setText("Maximum recording length reached!")
             # But don't auto-stop, let the user decide
             
+    def _on_probe_buffer(self, buffer):
+        """Convert a probed QAudioBuffer to mono float32 and queue it for the live view"""
+        fmt = buffer.format()
+        data = buffer.constData()
+        data.setsize(buffer.byteCount())
+        raw = bytes(data)
+        if fmt.sampleType() == QAudioFormat.Float:
+            samples = np.frombuffer(raw, dtype=np.float32)
+        elif fmt.sampleSize() == 8:
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+        elif fmt.sampleSize() == 32:
+            samples = np.frombuffer(raw, dtype=np.int32).astype(np.float32) / 2147483648.0
+        else:
+            samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        channels = max(fmt.channelCount(), 1)
+        samples = samples[:len(samples) // channels * channels]
+        if fmt.sampleRate() > 0 and fmt.sampleRate() != self.live_view.spectrogram.sr:
+            self.live_view.configure(fmt.sampleRate())
+        self._probe_chunks.append(samples.reshape(-1, channels).mean(axis=1))
+        
+    def _update_live_view(self):
+        if self.use_pyaudio and hasattr(self, 'pyaudio_recorder'):
+            chunk = self.pyaudio_recorder.drain_chunks()
+        else:
+            chunk = np.concatenate(self._probe_chunks) if self._probe_chunks else np.zeros(0, np.float32)
+            self._probe_chunks = []
+        if len(chunk) == 0:
+            return
+        rms_db, peak_db = chunk_levels(chunk)
+        self.level_bar.setValue(meter_percent(rms_db))
+        self.peak_bar.setValue(meter_percent(peak_db))
+        if self.live_view.push(chunk):
+            self.live_view.refresh()
+            
     def listen_recording(self):
-        if self.recorded_path and os.path.exists(self.recorded_path):
-            # Use the parent's audio player if available
-            if hasattr(self.parent(), 'player'):
-                from PyQt5.QtCore import QUrl
-                from PyQt5.QtMultimedia import QMediaContent
-                
-                self.parent().player.setMedia(QMediaContent(QUrl.fromLocalFile(self.recorded_path)))
-                self.parent().player.play()
+        if self.recorded_audio is not None:
+            # Play through the parent's playback engine if available
+            playback = getattr(self.parent(), 'playback', None)
+            if playback is not None:
+                playback.set_source("recording", self.recorded_audio)
+                playback.play("recording")
             else:
                 QMessageBox.information(self, "Playback Not Available", 
                                       "Audio playback is not available in this dialog.")
+
+    def _remove_playback_source(self):
+        playback = getattr(self.parent(), 'playback', None)
+        if playback is not None:
+            playback.remove_source("recording")
         
     def use_recording(self):
-        if self.recorded_path and os.path.exists(self.recorded_path):
-            self.recording_complete.emit(self.recorded_path)
+        if self.recorded_audio is not None:
+            self._remove_playback_source()
+            self.recording_complete.emit(self.recorded_audio)
             self.accept()
         else:
             QMessageBox.warning(self, "No Recording", "No recording available to use.")
     
+    def reject(self):
+        # A recording that was not used is discarded with its playback source
+        self._remove_playback_source()
+        if self.recorded_audio is not None:
+            self.recorded_audio.release()
+        super().reject()
+    
     def closeEvent(self, event):
         # Stop recording if it's still in progress
         if self.is_recording:
@@ -245,6 +315,10 @@ class VoiceRecorderDialog(QDialog):
         if self.use_pyaudio:
             self.pyaudio_recorder.close()
         
-        # Don't delete the recorded_path file as it might be used by the parent
-        # It will be managed by the parent window
+        # A used recording belongs to the parent window from here on;
+        # only the scratch directory is ours to remove
+        try:
+            os.rmdir(self.temp_dir)
+        except OSError:
+            pass
         event.accept()
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class WaveformPyramid:
+    """Min/max level-of-detail summary of a signal for fast waveform plots.
+
+    Level 0 holds the minimum and maximum of every ``base_block`` samples and
+    each further level reduces the previous one by ``factor``. A view of any
+    time range is then drawn from the coarsest level that still has at least
+    one block per screen pixel, so the cost depends on the plot width rather
+    than on the number of samples. Building the pyramid is a single O(n) pass
+    and takes about ``2 / (base_block - 1)`` of the signal's memory.
+    """
+
+    def __init__(self, y, sr, base_block=16, factor=4):
+        self.y = np.asarray(y)
+        self.sr = sr
+        self.block_sizes = []
+        self.levels = []  # [(mins, maxs)] per level
+
+        block = base_block
+        mins, maxs = self._reduce(self.y, self.y, base_block)
+        while True:
+            self.block_sizes.append(block)
+            self.levels.append((mins, maxs))
+            if len(mins) <= factor:
+                break
+            mins, maxs = self._reduce(mins, maxs, factor)
+            block *= factor
+
+    @staticmethod
+    def _reduce(mins, maxs, factor):
+        """Combine consecutive groups of ``factor`` entries (the last group may be shorter)"""
+        n_full = len(mins) // factor * factor
+        lo = mins[:n_full].reshape(-1, factor).min(axis=1)
+        hi = maxs[:n_full].reshape(-1, factor).max(axis=1)
+        if n_full < len(mins):
+            lo = np.append(lo, mins[n_full:].min())
+            hi = np.append(hi, maxs[n_full:].max())
+        return lo, hi
+
+    @property
+    def duration(self):
+        return len(self.y) / self.sr
+
+    @property
+    def peak(self):
+        mins, maxs = self.levels[-1]
+        return float(max(np.max(np.abs(mins)), np.max(np.abs(maxs)))) if len(mins) else 0.0
+
+    def view(self, t0, t1, n_pixels):
+        """Data to draw ``[t0, t1]`` seconds at ``n_pixels`` horizontal resolution.
+
+        Returns ``(times, lower, upper)``. When the range holds few enough
+        samples to draw directly, ``lower`` and ``upper`` are both the raw
+        samples; otherwise they are per-block minima and maxima.
+        """
+        n_pixels = max(int(n_pixels), 1)
+        i0 = int(np.clip(np.floor(t0 * self.sr), 0, len(self.y)))
+        i1 = int(np.clip(np.ceil(t1 * self.sr), i0, len(self.y)))
+        n_samples = i1 - i0
+        if n_samples <= 2 * n_pixels:
+            samples = self.y[i0:i1]
+            return np.arange(i0, i1) / self.sr, samples, samples
+
+        level = 0
+        for k, block in enumerate(self.block_sizes):
+            if n_samples / block >= n_pixels:
+                level = k
+        block = self.block_sizes[level]
+        mins, maxs = self.levels[level]
+        b0, b1 = i0 // block, min(-(-i1 // block), len(mins))
+        times = (np.arange(b0, b1) + 0.5) * block / self.sr
+        return times, mins[b0:b1], maxs[b0:b1]